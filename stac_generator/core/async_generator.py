@@ -0,0 +1,350 @@
+# encoding: utf-8
+"""
+Async Generator
+---------------
+
+Generator engine running many events at once on a single asyncio event loop.
+Synchronous inputs and outputs are wrapped in adapters which run them in the
+loop's executor and extraction methods are run in worker threads.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import asyncio
+import logging
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from stac_generator.core.bulk_output import (
+    AsyncBulkOutput,
+    BulkOutput,
+    SyncBulkOutputAdapter,
+)
+from stac_generator.core.input import AsyncInput, Input, SyncInputAdapter
+from stac_generator.core.output import AsyncOutput, Output, SyncOutputAdapter
+
+from .baker import Recipe
+from .executor import Executor, SerialExecutor
+from .generator import Generator
+from .metrics import EVENTS
+
+LOGGER = logging.getLogger(__name__)
+
+
+def to_async_input(input_plugin: Input) -> AsyncInput:
+    """
+    Wrap a synchronous input for the event loop.
+
+    :param input_plugin: input plugin
+
+    :return: asynchronous input
+    """
+    if isinstance(input_plugin, AsyncInput):
+        return input_plugin
+
+    return SyncInputAdapter(input_plugin)
+
+
+def to_async_output(output: Output) -> AsyncOutput | AsyncBulkOutput:
+    """
+    Wrap a synchronous output or bulk output for the event loop.
+
+    :param output: output plugin
+
+    :return: asynchronous output
+    """
+    if isinstance(output, (AsyncOutput, AsyncBulkOutput)):
+        return output
+
+    if isinstance(output, BulkOutput):
+        return SyncBulkOutputAdapter(output)
+
+    return SyncOutputAdapter(output)
+
+
+class AsyncGenerator(Generator):
+    """
+    Asynchronous generator class
+
+    ``concurrency`` in the generator configuration limits the number of
+    events in flight at once.
+    """
+
+    def __init__(self, conf: dict):
+        super().__init__(conf)
+
+        self.concurrency = conf.get("concurrency", 100)
+
+        self.inputs = [to_async_input(input_plugin) for input_plugin in self.inputs]
+        self.outputs = [to_async_output(output) for output in self.outputs]
+        self.failed_outputs = [to_async_output(output) for output in self.failed_outputs]
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.failures: set[Future] = set()
+
+    def create_executor(self, conf: dict) -> Executor:
+        """
+        Events are extracted on the event loop's default executor, limited
+        by ``concurrency``, so no worker pool is created for the configured
+        executor.
+
+        :param conf: generator configuration
+
+        :return: executor
+        """
+        if "executor" in conf or "workers" in conf:
+            LOGGER.warning("The async generator ignores executor and workers, set concurrency")
+
+        return SerialExecutor(self)
+
+    async def aoutput(self, body: dict, outputs: list[AsyncOutput], recipe: Recipe, **kwargs):
+        """
+        Run all configured outputs concurrently.
+
+        :param body: data to be output
+        :param outputs: outputs to run
+        :param recipe: recipe used for the extraction
+        :param kwargs:
+        """
+        await asyncio.gather(*(output.run(body, recipe, **kwargs) for output in outputs))
+
+    def output_failed(self, data: dict, error: str) -> None:
+        """
+        Send a record an output reported as failed to the failed outputs.
+        Outputs may report failures from worker threads so the failed
+        outputs are scheduled on the event loop and awaited by ``afinished``.
+
+        :param data: record which failed
+        :param error: description of the failure
+        """
+        if self.incremental is not None:
+            self.incremental.forget(self.incremental.uris(data.get("id")))
+
+        future = asyncio.run_coroutine_threadsafe(
+            self.aoutput(data | {"ERROR": error}, self.failed_outputs, None, **self.kwargs),
+            self.loop,
+        )
+        self.failures.add(future)
+        future.add_done_callback(self.failures.discard)
+        EVENTS.inc(status="output_failed")
+
+    async def afinished(self) -> None:
+        """
+        Run clear cache of remaining data for bulk outputs and wait for
+        outputs to complete their exports. In incremental mode the URIs
+        output before the flush are then committed.
+        """
+        if self.incremental is not None:
+            self.incremental.prepare()
+
+        await asyncio.gather(
+            *(
+                output.clear_cache()
+                for output in self.outputs + self.failed_outputs
+                if isinstance(output, AsyncBulkOutput)
+            )
+        )
+
+        await asyncio.gather(*(output.finish() for output in self.outputs + self.failed_outputs))
+
+        # Failures reported while the outputs finished
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in list(self.failures)))
+
+        if self.incremental is not None:
+            self.incremental.commit()
+
+        if self.extraction_cache is not None:
+            self.extraction_cache.flush()
+
+    async def aoutput_result(
+        self,
+        body: dict,
+        recipe: Recipe,
+        failed: bool = False,
+        fingerprint: str | None = None,
+        unchanged: bool = False,
+        uri: str | None = None,
+    ) -> None:
+        """
+        Output the result of an extraction.
+
+        :param body: extracted body for object
+        :param recipe: recipe used for the extraction
+        :param failed: whether the extraction failed
+        :param fingerprint: fingerprint of the source to record in incremental mode
+        :param unchanged: whether the event was skipped as unchanged
+        :param uri: URI of the event to record in incremental mode
+        """
+        if unchanged:
+            self.incremental.skip()
+            EVENTS.inc(status="unchanged")
+            return
+
+        status = "extraction_failed" if failed else "success"
+
+        if not failed:
+            try:
+                await self.aoutput(body, self.outputs, recipe, **self.kwargs)
+                self.record(uri, recipe, fingerprint, body.get("id"))
+                EVENTS.inc(status=status)
+                return
+
+            except Exception:
+                body["ERROR"] = traceback.format_exc()
+                status = "output_failed"
+
+        await self.aoutput(body, self.failed_outputs, recipe, **self.kwargs)
+        EVENTS.inc(status=status)
+
+    async def aprocess_event(self, body: dict | list[dict]) -> None:
+        """
+        Run event, the extraction methods are run in a worker thread. A list
+        of events is extracted as a batch and its results output concurrently.
+
+        :param body: initial body for object or a list of them
+        """
+        if isinstance(body, list):
+            results = await asyncio.to_thread(self.extract_batch, body)
+            await asyncio.gather(*(self.aoutput_result(*result) for result in results))
+            return
+
+        await self.aoutput_result(*await asyncio.to_thread(self.extract, body))
+
+    async def aprocess_limited(self, body: dict | list[dict]) -> None:
+        """
+        Run event once fewer than ``concurrency`` events are in flight.
+
+        :param body: initial body for object or a list of them
+        """
+        async with self.slots:
+            await self.aprocess_event(body)
+
+    async def arun_input(self, input_plugin: AsyncInput) -> None:
+        """
+        Run input, keeping at most ``concurrency`` events in flight across
+        all inputs. The first error raised by an event stops the input and
+        is raised once the events still in flight are cancelled.
+
+        :param input_plugin: Input plugin to be run
+        """
+        if input_plugin.blocking:
+            await input_plugin.run(self.aprocess_limited)
+            return
+
+        tasks = set()
+        errors = []
+
+        def done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            self.slots.release()
+
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+
+        try:
+            async for body in input_plugin.run():
+                await self.slots.acquire()
+
+                task = asyncio.create_task(self.aprocess_event(body))
+                tasks.add(task)
+                task.add_done_callback(done)
+
+                if errors:
+                    raise errors[0]
+
+                if self.checkpoints is not None and self.checkpoints.due():
+                    checkpoint = input_plugin.checkpoint
+                    await asyncio.gather(*tasks)
+                    await self.afinished()
+                    self.checkpoints.save({input_plugin.checkpoint_key: checkpoint})
+
+            await asyncio.gather(*tasks)
+
+            if errors:
+                raise errors[0]
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def save_checkpoints(self, inputs: list[AsyncInput]) -> None:
+        """
+        Save the checkpoints of finished inputs.
+
+        :param inputs: finished input plugins
+        """
+        if self.checkpoints is not None:
+            self.checkpoints.save(
+                {input_plugin.checkpoint_key: input_plugin.checkpoint for input_plugin in inputs}
+            )
+
+    async def arun(self) -> None:
+        """
+        Run generator on the running event loop.
+        """
+        LOGGER.info("Running async generator: %s", self.conf)
+
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.loop = asyncio.get_running_loop()
+
+        # Extraction and adapted plugins run in the default executor
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="stac-generator")
+        )
+
+        self.start_metrics()
+        self.start_checkpoints()
+        self.start_recipe_watcher()
+
+        if self.profiler is not None:
+            self.profiler.start()
+
+        try:
+            if self.conf.get("concurrent_inputs", False):
+                await asyncio.gather(
+                    *(self.arun_input(input_plugin) for input_plugin in self.inputs)
+                )
+                await self.afinished()
+                self.save_checkpoints(self.inputs)
+
+            else:
+                for input_plugin in self.inputs:
+                    await self.arun_input(input_plugin)
+                    await self.afinished()
+                    self.save_checkpoints([input_plugin])
+
+        finally:
+            self.stop_metrics()
+            self.stop_checkpoints()
+            self.stop_recipe_watcher()
+
+            if self.profiler is not None:
+                self.profiler.stop()
+                self.profiler.write()
+
+        LOGGER.info("Pipeline cache: %s", self.pipelines.stats())
+
+        if self.incremental is not None:
+            LOGGER.info("Incremental: %s", self.incremental.stats())
+            self.incremental.close()
+
+        if self.extraction_cache is not None:
+            LOGGER.info("Extraction cache: %s", self.extraction_cache.stats())
+            self.extraction_cache.close()
+
+        LOGGER.info("Resources: %s", self.resources.stats())
+        self.resources.close()
+
+        self.timings.write_report(pipeline_cache=self.pipelines.stats())
+
+    def run(self) -> None:
+        """
+        Run generator.
+        """
+        asyncio.run(self.arun())
@@ -5,8 +5,6 @@ STAC Baker
 """
 from __future__ import annotations
 
-from itertools import chain
-
 __author__ = "Rhys Evans"
 __date__ = "01 August 2023"
 __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
@@ -15,19 +13,45 @@ __contact__ = "rhys.r.evans@stfc.ac.uk"
 
 import hashlib
 import logging
+import os
+import pickle
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
 
 # Python imports
-from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import yaml
 from extraction_methods.core.extraction_method import ExtractionMethodConf
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer
+
+from .recipe_index import RecipeIndex
 
 LOGGER = logging.getLogger(__name__)
 
+# Bump when the cached recipe format or ``Recipe.key`` changes
+RECIPE_CACHE_VERSION = 1
+
+# Number of stale recipes worth starting worker processes for
+PARALLEL_THRESHOLD = 256
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class MemoizeConf(BaseModel):
+    """Extraction method marked as cacheable by a recipe."""
+
+    method: str = Field(
+        description="Name of the extraction method to memoize.",
+    )
+    key: str = Field(
+        description="Template of the cache key, ``$name`` is replaced with the body's value.",
+    )
+
 
 class Recipe(BaseModel):
     """Recipe model."""
@@ -36,6 +60,7 @@ class Recipe(BaseModel):
     type: str
     paths: Optional[list[Path]] = []
     extraction_methods: Optional[list[ExtractionMethodConf]] = []
+    memoize: Optional[list[MemoizeConf]] = []
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -49,7 +74,8 @@ class Recipe(BaseModel):
 
     def set_key(self):
         """Fuction to set recipe key"""
-        recipe_json = self.model_dump_json()
+        # Recipes without memoization keep the key they had before it was added
+        recipe_json = self.model_dump_json(exclude=None if self.memoize else {"memoize"})
         # Using hash for key as it is independent of storage location
         self._key = hashlib.md5(recipe_json.encode("utf-8")).hexdigest()
 
@@ -65,74 +91,372 @@ class Recipe(BaseModel):
 Recipe.model_rebuild()
 
 
+class RecipeEntry(NamedTuple):
+    """
+    Parsed recipe file kept in the compiled recipe cache.
+    """
+
+    mtime: int
+    size: int
+    key: str
+    type: str
+    paths: list[str]
+    data: dict
+
+
+def parse_recipe(file: str, stat: tuple[int, int]) -> RecipeEntry:
+    """
+    Parse and validate a recipe file. Run in worker processes when many
+    recipes need parsing.
+
+    :param file: Path to the yaml file
+    :param stat: mtime in nanoseconds and size of the file
+
+    :return: cache entry for the recipe
+    """
+    with open(file, "r", encoding="utf-8") as reader:
+        data = yaml.load(reader, Loader=SafeLoader)
+
+    recipe = Recipe(**data)
+
+    return RecipeEntry(
+        stat[0],
+        stat[1],
+        recipe.key,
+        recipe.type,
+        [str(path) for path in data.get("paths") or []],
+        data,
+    )
+
+
+class RecipeMaps(NamedTuple):
+    """
+    Snapshot of the recipe maps, replaced as a whole when recipes change.
+    """
+
+    # Recipes by type and key, None until first looked up
+    recipes: dict
+    paths_map: dict
+    location_map: dict
+    indexes: dict
+
+
 class Recipes:
     """
     Holds references to all the recipes files and returns an :py:obj:`STACRecipe`
+
+    Parsed recipes can be kept in an on-disk ``cache`` so only files whose
+    mtime or size changed are parsed again on start up. ``Recipe`` objects
+    are only built the first time they are looked up.
+
+    ``refresh`` reloads changed recipe files, swapping in new maps so lookups
+    in progress are never blocked or see a partial update.
     """
 
-    def __init__(self, root_path: str):
+    def __init__(self, root_path: str, cache: str | None = None, workers: int | None = None):
         """
         :param root_path: Path to the root of the yaml files
+        :param cache: Path of the compiled recipe cache
+        :param workers: Number of processes used to parse recipes, defaults to the CPU count
         """
-        self.recipes = defaultdict(dict)
-        self.paths_map = defaultdict(dict)
-        self.location_map = {}
+        self.root_path = root_path
+        self.cache = cache
+        self.workers = workers
+
+        self.maps = RecipeMaps(defaultdict(dict), defaultdict(dict), {}, defaultdict(RecipeIndex))
+        self.entries: dict[str, RecipeEntry] = {}
+
+        # mtime and size of the files which failed to parse on refresh
+        self.failed: dict[str, tuple[int, int]] = {}
+
+        # Parsed data of the recipes not built yet by key
+        self.pending: dict[str, dict] = {}
+        self.lock = threading.RLock()
 
-        for file_path in Path(root_path).rglob("*.y*ml"):
-            _ = self._load_data(file_path)
+        self.load()
+
+    @property
+    def recipes(self) -> dict:
+        """Recipes by type and key"""
+        return self.maps.recipes
+
+    @property
+    def paths_map(self) -> dict:
+        """Recipe key by type and path"""
+        return self.maps.paths_map
+
+    @property
+    def location_map(self) -> dict:
+        """Recipe key and type by file"""
+        return self.maps.location_map
 
-    def _load_data(self, file: Path) -> Recipe:
+    @property
+    def indexes(self) -> dict:
+        """Path index by type"""
+        return self.maps.indexes
+
+    def scan(self) -> dict[str, tuple[int, int]]:
         """
-        Loads the yaml files from the root path and builds the recipe dictionary and map of
-        the recipes applicaple paths and their locations.
+        Find the recipe files under the root path.
 
-        :param root_path: Path to root of yaml files
+        :return: mtime in nanoseconds and size by file path
         """
-        if file in self.location_map.keys():
-            location_map_file = self.location_map[file]
-            return self.recipes[location_map_file["type"]][location_map_file["key"]]
+        files = {}
+
+        for directory, _, names in os.walk(self.root_path):
+            for name in sorted(names):
+                if fnmatch(name, "*.y*ml"):
+                    file = os.path.join(directory, name)
+                    stat = os.stat(file)
+                    files[file] = (stat.st_mtime_ns, stat.st_size)
 
-        with open(file, "r", encoding="utf-8") as reader:
-            data = yaml.safe_load(reader)
+        return files
 
-        recipe = Recipe(**data)
+    def read_cache(self) -> dict[str, RecipeEntry]:
+        """
+        Read the compiled recipe cache.
 
-        self.recipes[recipe.type][recipe.key] = recipe
-        self.location_map[file] = {"key": recipe.key, "type": recipe.type}
+        :return: cache entries by file path
+        """
+        if not self.cache or not os.path.exists(self.cache):
+            return {}
 
-        for path in recipe.paths:
-            self.paths_map[recipe.type][Path(path)] = recipe.key
+        try:
+            with open(self.cache, "rb") as reader:
+                cache = pickle.load(reader)
 
-        return recipe
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.warning("Unable to read recipe cache %s, rebuilding it", self.cache)
+            return {}
 
-    @lru_cache(100)
-    def load_recipe(self, key: str, recipe_type: str) -> Recipe:
+        if cache.get("version") != RECIPE_CACHE_VERSION:
+            return {}
+
+        return cache["entries"]
+
+    def write_cache(self) -> None:
+        """
+        Write the compiled recipe cache, replacing it atomically.
         """
-        Load the links from recipes member for ID generation.
+        temporary = f"{self.cache}.{os.getpid()}.tmp"
 
-        :param recipe: Recipe for links to be loaded for
+        with open(temporary, "wb") as writer:
+            pickle.dump({"version": RECIPE_CACHE_VERSION, "entries": self.entries}, writer)
+
+        os.replace(temporary, self.cache)
+
+    def parse(self, files: dict[str, tuple[int, int]]) -> dict[str, RecipeEntry]:
         """
-        recipe = self.recipes[recipe_type][key]
+        Parse recipe files, in parallel if there are many of them.
+
+        :param files: mtime in nanoseconds and size by file path
+
+        :return: cache entries by file path
+        """
+        if len(files) < PARALLEL_THRESHOLD or self.workers == 1:
+            return {file: parse_recipe(file, stat) for file, stat in files.items()}
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            entries = pool.map(parse_recipe, files, files.values(), chunksize=64)
+
+            return dict(zip(files, entries))
+
+    def load(self) -> None:
+        """
+        Load the recipes under the root path, parsing only the files which
+        aren't in the cache or have changed since it was written.
+        """
+        start = time.perf_counter()
+        files = self.scan()
+        cached = self.read_cache()
+
+        stale = {
+            file: stat
+            for file, stat in files.items()
+            if file not in cached or (cached[file].mtime, cached[file].size) != stat
+        }
+        parsed = self.parse(stale)
+
+        with self.lock:
+            self.entries = {file: parsed.get(file) or cached[file] for file in files}
+            self.maps = self.build(self.entries)
+
+        if self.cache and (parsed or len(cached) != len(files)):
+            self.write_cache()
+
+        LOGGER.info(
+            "Loaded %s recipes in %.2fs, %s parsed and %s from cache",
+            len(files),
+            time.perf_counter() - start,
+            len(parsed),
+            len(files) - len(parsed),
+        )
+
+    def build(self, entries: dict[str, RecipeEntry], files: set[str] | None = None) -> RecipeMaps:
+        """
+        Build new maps from the entries, must be called with the lock held.
+        Only the types of recipe in ``files`` are rebuilt, the maps of other
+        types and built recipes whose key is unchanged are reused.
+
+        :param entries: entries of every recipe file
+        :param files: files added, changed or removed since the current maps
+            were built, None to build everything
+
+        :return: recipe maps
+        """
+        previous = self.maps
+        recipes = defaultdict(dict)
+        paths_map = defaultdict(dict)
+        indexes = defaultdict(RecipeIndex)
+
+        if files is None:
+            types = None
+            location_map = {}
+
+        else:
+            types = {self.entries[file].type for file in files if file in self.entries}
+            types.update(entries[file].type for file in files if file in entries)
+
+            for recipe_type in set(previous.recipes) - types:
+                recipes[recipe_type] = previous.recipes[recipe_type]
+                paths_map[recipe_type] = previous.paths_map[recipe_type]
+                indexes[recipe_type] = previous.indexes[recipe_type]
+
+            location_map = dict(previous.location_map)
+
+            for file in files:
+                location_map.pop(Path(file), None)
+
+        for file, entry in entries.items():
+            if types is not None and entry.type not in types:
+                continue
+
+            built = previous.recipes.get(entry.type, {}).get(entry.key)
+
+            if recipes[entry.type].setdefault(entry.key, built) is None:
+                self.pending.setdefault(entry.key, entry.data)
+
+            if files is None or file in files:
+                location_map[Path(file)] = {"key": entry.key, "type": entry.type}
+
+            for path in entry.paths:
+                paths_map[entry.type][Path(path)] = entry.key
+
+                # Index the paths as written, ``Path`` collapses the ``//`` of remote URIs
+                indexes[entry.type].add(path, entry.key)
+
+        return RecipeMaps(recipes, paths_map, location_map, indexes)
+
+    def refresh(self) -> set[str]:
+        """
+        Reload recipe files added, changed or removed since they were loaded.
+        Files are parsed before the maps are swapped so lookups carry on
+        meanwhile, a file that fails to parse keeps its previous recipe and
+        isn't parsed again until it changes.
+
+        :return: keys of the recipes which no longer exist
+        """
+        files = self.scan()
+        entries = self.entries
+
+        changed = {
+            file: stat
+            for file, stat in files.items()
+            if (file not in entries or (entries[file].mtime, entries[file].size) != stat)
+            and self.failed.get(file) != stat
+        }
+        removed = set(entries) - set(files)
+
+        for file in set(self.failed) - set(files):
+            del self.failed[file]
+
+        if not changed and not removed:
+            return set()
+
+        parsed = {}
+
+        for file, stat in changed.items():
+            try:
+                parsed[file] = parse_recipe(file, stat)
+                self.failed.pop(file, None)
+
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOGGER.exception("Unable to load recipe %s, keeping the previous version", file)
+                self.failed[file] = stat
+
+        if not parsed and not removed:
+            return set()
+
+        updated = {
+            file: parsed.get(file) or entries[file]
+            for file in files
+            if file in parsed or file in entries
+        }
+
+        with self.lock:
+            previous_keys = {entry.key for entry in self.entries.values()}
+            self.maps = self.build(updated, set(parsed) | removed)
+            self.entries = updated
+
+        if self.cache:
+            self.write_cache()
+
+        stale_keys = previous_keys - {entry.key for entry in updated.values()}
+
+        LOGGER.info(
+            "Reloaded recipes: %s changed, %s removed, %s keys replaced",
+            len(parsed),
+            len(removed),
+            len(stale_keys),
+        )
+
+        return stale_keys
+
+    def load_recipe(self, key: str, recipe_type: str, maps: RecipeMaps | None = None) -> Recipe:
+        """
+        Get a recipe by key, building it on first use.
+
+        :param key: ``Recipe.key`` of the recipe
+        :param recipe_type: Type of recipe to return
+        :param maps: maps to look the recipe up in, defaults to the current maps
+        """
+        recipes = (maps or self.maps).recipes.get(recipe_type, {})
+        recipe = recipes[key]
+
+        if recipe is None:
+            with self.lock:
+                recipe = recipes[key]
+
+                if recipe is None and key in self.pending:
+                    recipe = recipes[key] = Recipe(**self.pending.pop(key))
+
+                elif recipe is None:
+                    # Built meanwhile into maps swapped in by ``refresh``
+                    recipe = self.maps.recipes.get(recipe_type, {})[key]
 
         return recipe
 
     def get(self, path: str, recipe_type: str) -> Recipe:
         """
-        Get the most relevant recipe for a given path.
+        Get the recipe with the longest path containing ``path``, or the
+        recipe whose key is ``path``.
 
         :param path: Path for which to retrieve the recipe
         :param recipe_type: Type of recipe to return
         """
-        if path in self.recipes[recipe_type]:
-            return self.load_recipe(path, recipe_type)
+        # Read without touching the defaultdicts so concurrent lookups don't mutate them
+        maps = self.maps
+
+        if path in maps.recipes.get(recipe_type, {}):
+            return self.load_recipe(path, recipe_type, maps)
 
-        for parent in chain([path], Path(path).parents):
-            if parent in self.paths_map[recipe_type]:
-                key = self.paths_map[recipe_type][parent]
+        index = maps.indexes.get(recipe_type)
+        key = index.find(str(path)) if index is not None else None
 
-                return self.load_recipe(key, recipe_type)
+        if key is None:
+            raise ValueError(f"No Recipe found for path: {path}")
 
-        raise ValueError(f"No Recipe found for path: {path}")
+        return self.load_recipe(key, recipe_type, maps)
 
     def get_maps(self):
         return self.paths_map, self.location_map
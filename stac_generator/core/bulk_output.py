@@ -6,23 +6,35 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import asyncio
+import threading
+import time
 from abc import abstractmethod
 
 from cachetools import Cache
 from pydantic import BaseModel, Field
 
-from stac_generator.core.process_config import SetConfig
+from stac_generator.core.baker import Recipe
+from stac_generator.core.metrics import (
+    BULK_BUFFER,
+    BULK_BUFFER_FILL,
+    BULK_FLUSH_RECORDS,
+    BULK_FLUSH_SECONDS,
+    OUTPUT_ERRORS,
+    OUTPUT_SECONDS,
+)
+from stac_generator.core.output import Output
 
 
 class BulkOutputConf(BaseModel):
     """Elasticsearch config model."""
 
-    cache_max_size: str = Field(
+    cache_max_size: int = Field(
         description="Max size of cache.",
     )
 
 
-class BulkOutput(SetConfig):
+class BulkOutput(Output):
     """
     Base class to define an bulk output
     """
@@ -38,6 +50,7 @@ class BulkOutput(SetConfig):
         super().__init__(**kwargs)
 
         self.data_cache = Cache(maxsize=self.conf.cache_max_size + 1)
+        self.cache_lock = threading.RLock()
 
     def __del__(self):
         self.clear_cache()
@@ -66,21 +79,194 @@ class BulkOutput(SetConfig):
         """
         return {data["id"]: data}
 
-    def run(self, data: dict) -> None:
+    def run(self, body: dict, recipe: Recipe | None = None, **kwargs) -> None:
         """
         Add data to cache and if cache is full export data.
 
-        :param data: data to be exported
+        :param body: data to be exported
+        :param recipe: recipe used to generate the body
+        :param kwargs:
         """
-        # add to cache
-        self.data_cache.update(self.data_to_cache(data))
+        name = type(self).__name__
+        run_start = time.perf_counter()
 
-        if self.data_cache.currsize >= self.conf.cache_max_size:
-            self.clear_cache()
+        try:
+            data = self.data_to_cache(self.map(body, recipe, **kwargs))
+            start = time.perf_counter()
+
+            # add to cache
+            with self.cache_lock:
+                self.data_cache.update(data)
+                self.observe_cache()
+
+                if self.data_cache.currsize < self.conf.cache_max_size:
+                    data_list = None
+
+                else:
+                    data_list = self.pop_cache()
+
+            if data_list is not None:
+                self.flush(data_list)
+
+        except Exception:
+            OUTPUT_ERRORS.inc(output=name)
+            raise
+
+        end = time.perf_counter()
+        self.timings.add("export", name, end - start)
+        OUTPUT_SECONDS.observe(end - run_start, output=name)
+
+    def run_batch(self, bodies: list[dict], recipe: Recipe | None = None, **kwargs) -> None:
+        """
+        Add a batch of data to the cache, exporting whenever it fills.
+
+        :param bodies: data to be exported
+        :param recipe: recipe used to generate the bodies
+        :param kwargs:
+        """
+        name = type(self).__name__
+        run_start = time.perf_counter()
+
+        try:
+            data = {}
+            for body in bodies:
+                data.update(self.data_to_cache(self.map(body, recipe, **kwargs)))
+
+            start = time.perf_counter()
+            data_lists = []
+
+            with self.cache_lock:
+                for key, value in data.items():
+                    self.data_cache[key] = value
+
+                    if self.data_cache.currsize >= self.conf.cache_max_size:
+                        data_lists.append(self.pop_cache())
+
+                self.observe_cache()
+
+            for data_list in data_lists:
+                self.flush(data_list)
+
+        except Exception:
+            OUTPUT_ERRORS.inc(output=name)
+            raise
+
+        end = time.perf_counter()
+        self.timings.add("export", name, end - start)
+        OUTPUT_SECONDS.observe(end - run_start, output=name)
+
+    def observe_cache(self) -> None:
+        """
+        Record how full the cache is.
+        """
+        name = type(self).__name__
+        BULK_BUFFER.set(self.data_cache.currsize, output=name)
+        BULK_BUFFER_FILL.set(self.data_cache.currsize / self.conf.cache_max_size, output=name)
+
+    def pop_cache(self) -> list:
+        """
+        Take the data out of the cache, leaving it empty.
+        """
+        with self.cache_lock:
+            data_list = list(self.data_list)
+            self.data_cache.clear()
+            self.observe_cache()
+
+        return data_list
+
+    def flush(self, data_list: list) -> None:
+        """
+        Export data taken from the cache.
+
+        :param data_list: list of data to be exported
+        """
+        name = type(self).__name__
+        start = time.perf_counter()
+
+        with self.export_lock:
+            self.export(data_list)
+
+        duration = time.perf_counter() - start
+        self.timings.add("bulk_flush", name, duration)
+        BULK_FLUSH_SECONDS.observe(duration, output=name)
+        BULK_FLUSH_RECORDS.inc(len(data_list), output=name)
 
     def clear_cache(self) -> None:
         """
         Run after input is finished to clear remaining data.
         """
-        self.export(self.data_list)
-        self.data_cache.clear()
+        self.flush(self.pop_cache())
+
+
+class AsyncBulkOutput(BulkOutput):
+    """
+    Base class to define a bulk output run on the asyncio event loop
+    """
+
+    def __del__(self):
+        # Remaining data must be cleared from the event loop with ``await clear_cache()``
+        pass
+
+    @abstractmethod
+    async def export(self, data_list: list) -> None:
+        """
+        Output the data.
+
+        :param data: list of data from processor to be output.
+        """
+
+    async def run(self, body: dict, recipe: Recipe | None = None, **kwargs) -> None:
+        """
+        Add data to cache and if cache is full export data.
+
+        :param body: data to be exported
+        :param recipe: recipe used to generate the body
+        :param kwargs:
+        """
+        self.data_cache.update(self.data_to_cache(self.map(body, recipe, **kwargs)))
+        self.observe_cache()
+
+        if self.data_cache.currsize >= self.conf.cache_max_size:
+            await self.clear_cache()
+
+    async def clear_cache(self) -> None:
+        """
+        Run after input is finished to clear remaining data.
+        """
+        data_list = self.pop_cache()
+        start = time.perf_counter()
+
+        await self.export(data_list)
+
+        BULK_FLUSH_SECONDS.observe(time.perf_counter() - start, output=type(self).__name__)
+        BULK_FLUSH_RECORDS.inc(len(data_list), output=type(self).__name__)
+
+    async def finish(self) -> None:
+        """
+        Complete any exports still in progress.
+        """
+
+
+class SyncBulkOutputAdapter(AsyncBulkOutput):
+    """
+    Run a synchronous bulk output in a thread so it can be used by the
+    asynchronous generator.
+    """
+
+    def __init__(self, output: BulkOutput):
+        """
+        :param output: synchronous bulk output plugin to wrap
+        """
+        self.output = output
+
+    async def export(self, data_list: list) -> None:
+        await asyncio.to_thread(self.output.export, data_list)
+
+    async def run(self, body: dict, recipe: Recipe | None = None, **kwargs) -> None:
+        await asyncio.to_thread(self.output.run, body, recipe, **kwargs)
+
+    async def clear_cache(self) -> None:
+        await asyncio.to_thread(self.output.clear_cache)
+
+    async def finish(self) -> None:
+        await asyncio.to_thread(self.output.finish)
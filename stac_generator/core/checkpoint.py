@@ -0,0 +1,212 @@
+# encoding: utf-8
+"""
+Checkpoints
+-----------
+
+Resumable runs. Inputs record a resume token for the position after the last
+event they yielded and the generator commits those tokens to a checkpoint
+store once everything before them has been output. A restarted run hands each
+input its last committed token so it continues from that point.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CheckpointStore(ABC):
+    """
+    Base class to define a checkpoint store
+    """
+
+    @abstractmethod
+    def load(self, key: str) -> Any:
+        """
+        Load the resume token for an input.
+
+        :param key: checkpoint key of the input
+
+        :return: resume token or None
+        """
+
+    @abstractmethod
+    def save(self, tokens: dict[str, Any]) -> None:
+        """
+        Save resume tokens.
+
+        :param tokens: resume tokens by checkpoint key
+        """
+
+    def close(self) -> None:
+        """
+        Release the store.
+        """
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Keep resume tokens in a JSON file which is replaced atomically on save.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Path of the JSON file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.tokens = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as reader:
+                self.tokens = json.load(reader)
+
+    def load(self, key: str) -> Any:
+        return self.tokens.get(key)
+
+    def save(self, tokens: dict[str, Any]) -> None:
+        with self.lock:
+            self.tokens.update(tokens)
+
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as writer:
+                json.dump(self.tokens, writer)
+                writer.flush()
+                os.fsync(writer.fileno())
+
+            os.replace(temporary, self.path)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Keep resume tokens in a SQLite database.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Path of the database
+        """
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints "
+            "(key TEXT PRIMARY KEY, token TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def load(self, key: str) -> Any:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT token FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def save(self, tokens: dict[str, Any]) -> None:
+        updated = time.time()
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO checkpoints (key, token, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET token = excluded.token, updated = excluded.updated",
+                [(key, json.dumps(token), updated) for key, token in tokens.items()],
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+CHECKPOINT_STORES = {
+    "file": FileCheckpointStore,
+    "sqlite": SQLiteCheckpointStore,
+}
+
+
+class Checkpointer:
+    """
+    Commit input resume tokens at most every ``interval`` seconds. Before a
+    commit the generator's executor is drained and bulk outputs are flushed so
+    every event before the committed positions has been output.
+    """
+
+    def __init__(
+        self,
+        generator,
+        store: str = "file",
+        path: str = "checkpoints.json",
+        interval: float = 60,
+    ):
+        """
+        :param generator: Generator the inputs are run by
+        :param store: Checkpoint store: ``file`` or ``sqlite``
+        :param path: Path of the checkpoint store
+        :param interval: Minimum seconds between commits
+        """
+        self.generator = generator
+        self.store = CHECKPOINT_STORES[store](path)
+        self.interval = interval
+        self.last_commit = time.monotonic()
+
+    def resume(self, inputs: list) -> None:
+        """
+        Give each input its last committed resume token.
+
+        :param inputs: input plugins
+        """
+        for index, input_plugin in enumerate(inputs):
+            if input_plugin.checkpoint_key is None:
+                input_plugin.checkpoint_key = f"{index}:{type(input_plugin).__name__}"
+
+            input_plugin.resume_token = self.store.load(input_plugin.checkpoint_key)
+
+            if input_plugin.resume_token is not None:
+                LOGGER.info(
+                    "Resuming %s from %s", input_plugin.checkpoint_key, input_plugin.resume_token
+                )
+
+    def due(self) -> bool:
+        """
+        Whether the interval since the last commit has passed.
+        """
+        return time.monotonic() - self.last_commit >= self.interval
+
+    def save(self, tokens: dict[str, Any]) -> None:
+        """
+        Save resume tokens for positions that have already been output.
+
+        :param tokens: resume tokens by checkpoint key
+        """
+        if tokens := {key: token for key, token in tokens.items() if token is not None}:
+            self.store.save(tokens)
+            LOGGER.debug("Checkpoint committed: %s", tokens)
+
+        self.last_commit = time.monotonic()
+
+    def commit(self, tokens: dict[str, Any]) -> None:
+        """
+        Wait for submitted events to be output then save resume tokens.
+
+        :param tokens: resume tokens by checkpoint key
+        """
+        self.generator.executor.drain()
+        self.generator.finished()
+        self.save(tokens)
+
+    def close(self) -> None:
+        """
+        Release the checkpoint store.
+        """
+        self.store.close()
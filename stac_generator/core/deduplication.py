@@ -0,0 +1,151 @@
+# encoding: utf-8
+"""
+Deduplication
+-------------
+
+Memory bounded strategies for inputs to drop events they have already
+yielded, keyed on the event's URI.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import hashlib
+import logging
+import math
+import sys
+from abc import ABC, abstractmethod
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Deduplicator(ABC):
+    """
+    Base class to define a deduplication strategy
+    """
+
+    @abstractmethod
+    def seen(self, key: str) -> bool:
+        """
+        Check a key and remember it.
+
+        :param key: key of the event, usually its URI
+
+        :return: True if the key has been seen before
+        """
+
+    @abstractmethod
+    def memory(self) -> int:
+        """
+        Approximate memory used in bytes.
+        """
+
+
+class NoDeduplication(Deduplicator):
+    """
+    Keep every event.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    def seen(self, key: str) -> bool:
+        return False
+
+    def memory(self) -> int:
+        return 0
+
+
+class ExactDeduplication(Deduplicator):
+    """
+    Set of 64 bit hashes of the keys. Collisions are possible but negligible
+    below billions of keys.
+    """
+
+    def __init__(self, **kwargs):
+        self.hashes = set()
+
+    def seen(self, key: str) -> bool:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        digest = int.from_bytes(digest, "big")
+
+        if digest in self.hashes:
+            return True
+
+        self.hashes.add(digest)
+        return False
+
+    def memory(self) -> int:
+        # The set's table plus one int object per hash
+        return sys.getsizeof(self.hashes) + len(self.hashes) * sys.getsizeof(2**63)
+
+
+class BloomDeduplication(Deduplicator):
+    """
+    Bloom filter sized for ``capacity`` keys at ``false_positive_rate``. A
+    false positive drops an event that has not been seen, the rate rises
+    above the configured one once more than ``capacity`` keys are added.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, false_positive_rate: float = 0.001, **kwargs):
+        """
+        :param capacity: Expected number of distinct keys
+        :param false_positive_rate: Probability of dropping an unseen key at capacity
+        """
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def seen(self, key: str) -> bool:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+
+        seen = True
+
+        # Double hashing to derive the bit positions
+        for index in range(self.hashes):
+            position = (first + index * second) % self.size
+            byte, bit = divmod(position, 8)
+
+            if not self.bits[byte] & (1 << bit):
+                seen = False
+                self.bits[byte] |= 1 << bit
+
+        if not seen:
+            self.count += 1
+
+            if self.count == self.capacity + 1:
+                LOGGER.warning(
+                    "Bloom filter capacity of %s exceeded, the false positive rate will rise",
+                    self.capacity,
+                )
+
+        return seen
+
+    def memory(self) -> int:
+        return sys.getsizeof(self.bits)
+
+
+DEDUPLICATORS = {
+    "off": NoDeduplication,
+    "exact": ExactDeduplication,
+    "bloom": BloomDeduplication,
+}
+
+
+def load_deduplicator(strategy: str, **kwargs) -> Deduplicator:
+    """
+    Load a deduplication strategy.
+
+    :param strategy: ``off``, ``exact`` or ``bloom``
+    :param kwargs: options for the strategy
+
+    :return: deduplicator
+    """
+    return DEDUPLICATORS[strategy](**kwargs)
@@ -0,0 +1,720 @@
+# encoding: utf-8
+"""
+Executors
+---------
+
+Executors decide where the extraction for an event is run. The generator
+hands every event to its executor and the executor makes sure the result
+reaches the generator's outputs.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+LOGGER = logging.getLogger(__name__)
+
+# Generator used by each worker process, built by the pool initializer.
+WORKER_GENERATOR = None
+
+
+class Executor(ABC):
+    """
+    Base class to define an executor
+    """
+
+    def __init__(self, generator, workers: int | None = None, **kwargs):
+        """
+        :param generator: Generator the executor runs events for
+        :param workers: Number of workers
+        :param kwargs:
+        """
+        self.generator = generator
+        self.workers = workers or 1
+
+    @abstractmethod
+    def submit(self, body: dict, done: Callable[[], None] | None = None) -> None:
+        """
+        Schedule an event to be processed.
+
+        :param body: initial body for object
+        :param done: called once the event has been output
+        """
+
+    def submit_batch(self, bodies: list[dict], done: Callable[[], None] | None = None) -> None:
+        """
+        Schedule a batch of events to be processed. By default each event is
+        submitted on its own and ``done`` is called once all have been output.
+
+        :param bodies: initial bodies for objects
+        :param done: called once the events have been output
+        """
+        if not bodies:
+            if done is not None:
+                done()
+
+            return
+
+        remaining = len(bodies)
+        lock = threading.Lock()
+
+        def event_done() -> None:
+            nonlocal remaining
+
+            with lock:
+                remaining -= 1
+                finished = remaining == 0
+
+            if finished:
+                done()
+
+        for body in bodies:
+            self.submit(body, event_done if done is not None else None)
+
+    def drain(self) -> None:
+        """
+        Wait for all submitted events to be processed and output.
+        """
+
+    def occupancy(self) -> float:
+        """
+        Fraction of the executor's capacity in use. Inputs can use this to
+        slow down when the generator can't keep up.
+        """
+        return 0.0
+
+    def metrics(self) -> dict:
+        """
+        Executor metrics.
+        """
+        return {}
+
+    def process(self, body: dict | list[dict], done: Callable[[], None] | None = None) -> None:
+        """
+        Process an event, or a list of events. Used as the callback for
+        blocking inputs.
+
+        Without ``done`` this waits for the event to be output, otherwise it
+        returns as soon as the event is accepted and ``done`` is called once
+        it has been output.
+
+        :param body: initial body for object or a list of them
+        :param done: called once the event has been output
+        """
+        submit = self.submit_batch if isinstance(body, list) else self.submit
+
+        if done is not None:
+            submit(body, done)
+            return
+
+        submit(body)
+        self.drain()
+
+    def shutdown(self) -> None:
+        """
+        Drain and release any workers.
+        """
+        self.drain()
+
+
+class SerialExecutor(Executor):
+    """
+    Process events one at a time in the calling thread.
+    """
+
+    def submit(self, body: dict, done: Callable[[], None] | None = None) -> None:
+        self.generator.process_event(body)
+
+        if done is not None:
+            done()
+
+    def submit_batch(self, bodies: list[dict], done: Callable[[], None] | None = None) -> None:
+        self.generator.process_batch(bodies)
+
+        if done is not None:
+            done()
+
+
+def init_worker(conf: dict) -> None:
+    """
+    Build the generator for a worker process. Workers only run the
+    extraction methods: the main process looks up each event's recipe,
+    checks the incremental state and extraction cache and watches the
+    recipes.
+
+    :param conf: generator configuration
+    """
+    # pylint: disable=import-outside-toplevel,global-statement
+    from .generator import Generator
+
+    global WORKER_GENERATOR
+    WORKER_GENERATOR = Generator(conf, worker=True)
+
+    if WORKER_GENERATOR.profiler is not None:
+        WORKER_GENERATOR.profiler.start()
+
+
+def load_cached(cached: dict) -> None:
+    """
+    Pass the extraction cache results looked up by the main process to the
+    worker's extraction cache.
+
+    :param cached: changes or None by URI and fingerprint
+    """
+    if WORKER_GENERATOR.extraction_cache is not None:
+        WORKER_GENERATOR.extraction_cache.load(cached)
+
+
+def extract_in_worker(body: dict, recipe, fingerprint: str | None, cached: dict) -> tuple:
+    """
+    Run the extraction for an event in a worker process. Timings, metrics,
+    profile samples and extraction cache results recorded by the worker are
+    sent back with the result.
+
+    :param body: initial body for object
+    :param recipe: recipe for the event
+    :param fingerprint: fingerprint of the source
+    :param cached: extraction cache results by URI and fingerprint
+
+    :return: extraction result and worker state
+    """
+    load_cached(cached)
+    result = WORKER_GENERATOR.run_extraction(body, recipe, fingerprint)
+
+    return result, WORKER_GENERATOR.pop_state()
+
+
+def extract_batch_in_worker(events: list[tuple], cached: dict) -> tuple:
+    """
+    Run the extraction for a batch of events in a worker process.
+
+    :param events: initial body, recipe and fingerprint of each event
+    :param cached: extraction cache results by URI and fingerprint
+
+    :return: extraction results and worker state
+    """
+    load_cached(cached)
+    results = WORKER_GENERATOR.run_extraction_batch(events)
+
+    return results, WORKER_GENERATOR.pop_state()
+
+
+class ProcessExecutor(Executor):
+    """
+    Fan the extraction out to a pool of worker processes. Results are
+    output in the main process by a single collector thread as soon as they
+    are ready, so bulk outputs keep a single flush point and ``done`` is
+    called without waiting for the executor to fill or drain.
+    """
+
+    STOP = object()
+
+    def __init__(
+        self,
+        generator,
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        start_method: str | None = None,
+        **kwargs,
+    ):
+        """
+        :param generator: Generator the executor runs events for
+        :param workers: Number of worker processes, defaults to the CPU count
+        :param max_in_flight: Maximum number of events or batches submitted but not yet output
+        :param start_method: multiprocessing start method
+        :param kwargs:
+        """
+        super().__init__(generator, workers or multiprocessing.cpu_count(), **kwargs)
+
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.slots = threading.BoundedSemaphore(self.max_in_flight)
+
+        # Done callback, whether the submission is a batch and the results
+        # resolved without a worker by future
+        self.in_flight: dict[Future, tuple[Callable[[], None] | None, bool, list]] = {}
+        self.in_flight_changed = threading.Condition()
+        self.error: BaseException | None = None
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=init_worker,
+            initargs=(generator.conf,),
+        )
+
+        # Futures are queued as they finish and output by the collector thread
+        self.finished: queue.Queue = queue.Queue()
+        self.collector = threading.Thread(
+            target=self.collect, name="stac-generator-collector", daemon=True
+        )
+        self.collector.start()
+
+    def output(self, future: Future) -> None:
+        """
+        Output the result of a completed future.
+
+        :param future: completed future
+        """
+        done, batched, prepared = self.in_flight[future]
+        result, state = future.result()
+
+        self.generator.merge_state(state)
+
+        if batched:
+            self.generator.output_results(prepared + result)
+
+        else:
+            self.generator.output_result(*result)
+
+        if done is not None:
+            done()
+
+    def collect(self) -> None:
+        """
+        Output the results of futures as they finish, run in the collector thread.
+        """
+        while (future := self.finished.get()) is not self.STOP:
+            try:
+                self.output(future)
+
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.error = self.error or error
+
+            finally:
+                with self.in_flight_changed:
+                    self.in_flight.pop(future)
+                    self.in_flight_changed.notify_all()
+
+                self.slots.release()
+
+    def raise_error(self) -> None:
+        """
+        Re-raise the first error raised while outputting a result.
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit_to_pool(
+        self,
+        function: Callable | None,
+        args: tuple,
+        done: Callable[[], None] | None,
+        batched: bool,
+        prepared: list,
+    ) -> None:
+        """
+        Submit work to the pool once there is room for it. Without a
+        ``function`` the result is already known and is only queued to be
+        output by the collector thread.
+
+        :param function: function run in the worker
+        :param args: arguments of ``function`` or the result if there is no function
+        :param done: called once the events have been output
+        :param batched: whether the submission is a batch
+        :param prepared: results of the batch resolved in the main process
+        """
+        self.raise_error()
+        self.slots.acquire()
+
+        if function is None:
+            future = Future()
+            future.set_result((args, {}))
+
+        else:
+            future = self.pool.submit(function, *args)
+
+        with self.in_flight_changed:
+            self.in_flight[future] = (done, batched, prepared)
+
+        future.add_done_callback(self.finished.put)
+
+    def cached(self, events: list[tuple[dict, object, str | None]]) -> dict:
+        """
+        Look up the extraction cache for events sent to the workers.
+
+        :param events: initial body, recipe and fingerprint of each event
+
+        :return: changes or None by URI and fingerprint
+        """
+        return {
+            (body["uri"], fingerprint): self.generator.cached(body, recipe, fingerprint)
+            for body, recipe, fingerprint in events
+            if fingerprint is not None
+        }
+
+    def submit(self, body: dict, done: Callable[[], None] | None = None) -> None:
+        recipe, fingerprint, result = self.generator.prepare(body)
+
+        if result is not None:
+            self.submit_to_pool(None, result, done, False, [])
+            return
+
+        cached = self.cached([(body, recipe, fingerprint)])
+        self.submit_to_pool(
+            extract_in_worker, (body, recipe, fingerprint, cached), done, False, []
+        )
+
+    def submit_batch(self, bodies: list[dict], done: Callable[[], None] | None = None) -> None:
+        prepared = []
+        events = []
+
+        for body in bodies:
+            recipe, fingerprint, result = self.generator.prepare(body)
+
+            if result is not None:
+                prepared.append(result)
+
+            else:
+                events.append((body, recipe, fingerprint))
+
+        if not events:
+            self.submit_to_pool(None, [], done, True, prepared)
+            return
+
+        self.submit_to_pool(
+            extract_batch_in_worker, (events, self.cached(events)), done, True, prepared
+        )
+
+    def drain(self) -> None:
+        with self.in_flight_changed:
+            self.in_flight_changed.wait_for(lambda: not self.in_flight)
+
+        self.raise_error()
+
+    def occupancy(self) -> float:
+        return len(self.in_flight) / self.max_in_flight
+
+    def shutdown(self) -> None:
+        self.drain()
+        self.finished.put(self.STOP)
+        self.collector.join()
+        self.pool.shutdown()
+
+
+class ThreadExecutor(Executor):
+    """
+    Process events concurrently on a pool of threads, for recipes that spend
+    most of their time waiting on I/O.
+
+    Each thread is a lane with its own queue and events are routed to a lane
+    by their ``uri``, so events for the same ``uri`` are processed in the
+    order they were submitted.
+    """
+
+    def __init__(
+        self,
+        generator,
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        **kwargs,
+    ):
+        """
+        :param generator: Generator the executor runs events for
+        :param workers: Number of threads
+        :param max_in_flight: Maximum number of events submitted but not yet output
+        :param kwargs:
+        """
+        super().__init__(generator, workers or min(32, (os.cpu_count() or 1) + 4), **kwargs)
+
+        self.lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stac-generator-{lane}")
+            for lane in range(self.workers)
+        ]
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.slots = threading.BoundedSemaphore(self.max_in_flight)
+
+        self.lock = threading.Lock()
+        self.in_flight: set[Future] = set()
+        self.error: BaseException | None = None
+
+    def release(self, future: Future) -> None:
+        """
+        Release the slot held by a finished event and record any error.
+
+        :param future: finished future
+        """
+        self.slots.release()
+
+        with self.lock:
+            self.in_flight.discard(future)
+
+            if future.exception() is not None and self.error is None:
+                self.error = future.exception()
+
+    def raise_error(self) -> None:
+        """
+        Re-raise the first error raised by a worker thread.
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def run_event(self, body: dict, done: Callable[[], None] | None) -> None:
+        """
+        Process an event on a lane.
+
+        :param body: initial body for object
+        :param done: called once the event has been output
+        """
+        self.generator.process_event(body)
+
+        if done is not None:
+            done()
+
+    def submit(self, body: dict, done: Callable[[], None] | None = None) -> None:
+        self.raise_error()
+        self.slots.acquire()
+
+        lane = self.lanes[hash(body["uri"]) % self.workers]
+        future = lane.submit(self.run_event, body, done)
+
+        with self.lock:
+            self.in_flight.add(future)
+
+        future.add_done_callback(self.release)
+
+    def drain(self) -> None:
+        with self.lock:
+            in_flight = list(self.in_flight)
+
+        wait(in_flight)
+        self.raise_error()
+
+    def occupancy(self) -> float:
+        return len(self.in_flight) / self.max_in_flight
+
+    def shutdown(self) -> None:
+        self.drain()
+
+        for lane in self.lanes:
+            lane.shutdown()
+
+
+class StageQueue(queue.Queue):
+    """
+    Bounded queue between two stages which records how full it gets and how
+    long each side spends waiting on the other.
+
+    A stage that spends a long time waiting to put into its output queue is
+    being held back by the next stage, one waiting to get from its input
+    queue is starved by the previous one.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        """
+        :param name: Name of the stage the queue feeds
+        :param maxsize: Maximum number of items in the queue
+        """
+        super().__init__(maxsize)
+
+        self.name = name
+        self.stats_lock = threading.Lock()
+        self.max_depth = 0
+        self.total = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def put(self, item, block: bool = True, timeout: float | None = None) -> None:
+        start = time.perf_counter()
+        super().put(item, block, timeout)
+        waited = time.perf_counter() - start
+
+        with self.stats_lock:
+            self.put_wait += waited
+            self.total += 1
+            self.max_depth = max(self.max_depth, self.qsize())
+
+    def get(self, block: bool = True, timeout: float | None = None):
+        start = time.perf_counter()
+        item = super().get(block, timeout)
+        waited = time.perf_counter() - start
+
+        with self.stats_lock:
+            self.get_wait += waited
+
+        return item
+
+    def occupancy(self) -> float:
+        """
+        Fraction of the queue in use.
+        """
+        return self.qsize() / self.maxsize
+
+    def metrics(self) -> dict:
+        """
+        Queue depth and wait time metrics.
+        """
+        return {
+            "depth": self.qsize(),
+            "capacity": self.maxsize,
+            "max_depth": self.max_depth,
+            "total": self.total,
+            "put_wait": self.put_wait,
+            "get_wait": self.get_wait,
+        }
+
+
+class StagedExecutor(Executor):
+    """
+    Run the input, extraction and output as separate stages connected by
+    bounded queues.
+
+    The input feeds the ``extract`` queue from the calling thread, a pool of
+    extraction threads feeds the ``output`` queue and a single output thread
+    runs the outputs. When a queue fills the stage feeding it blocks, so a
+    slow output holds back the extraction which in turn holds back the input.
+    """
+
+    STOP = object()
+
+    def __init__(
+        self,
+        generator,
+        workers: int | None = None,
+        extract_queue_size: int = 1000,
+        output_queue_size: int = 1000,
+        **kwargs,
+    ):
+        """
+        :param generator: Generator the executor runs events for
+        :param workers: Number of extraction threads
+        :param extract_queue_size: Depth of the queue between the input and extraction stages
+        :param output_queue_size: Depth of the queue between the extraction and output stages
+        :param kwargs:
+        """
+        super().__init__(generator, workers, **kwargs)
+
+        self.extract_queue = StageQueue("extract", extract_queue_size)
+        self.output_queue = StageQueue("output", output_queue_size)
+        self.error: BaseException | None = None
+
+        self.threads = [
+            threading.Thread(target=self.extract_stage, name=f"stac-generator-extract-{n}")
+            for n in range(self.workers)
+        ]
+        self.threads.append(
+            threading.Thread(target=self.output_stage, name="stac-generator-output")
+        )
+
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def extract_stage(self) -> None:
+        """
+        Run the extraction for events from the ``extract`` queue.
+        """
+        while (item := self.extract_queue.get()) is not self.STOP:
+            body, done = item
+
+            try:
+                self.output_queue.put((self.generator.extract(body), done))
+
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.error = self.error or error
+
+            finally:
+                self.extract_queue.task_done()
+
+        self.extract_queue.task_done()
+
+    def output_stage(self) -> None:
+        """
+        Run the outputs for results from the ``output`` queue.
+        """
+        while (item := self.output_queue.get()) is not self.STOP:
+            result, done = item
+
+            try:
+                self.generator.output_result(*result)
+
+                if done is not None:
+                    done()
+
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.error = self.error or error
+
+            finally:
+                self.output_queue.task_done()
+
+        self.output_queue.task_done()
+
+    def raise_error(self) -> None:
+        """
+        Re-raise the first error raised by a stage.
+        """
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, body: dict, done: Callable[[], None] | None = None) -> None:
+        self.raise_error()
+        self.extract_queue.put((body, done))
+
+    def drain(self) -> None:
+        self.extract_queue.join()
+        self.output_queue.join()
+        self.raise_error()
+
+    def occupancy(self) -> float:
+        return self.extract_queue.occupancy()
+
+    def metrics(self) -> dict:
+        return {
+            "queues": {
+                stage_queue.name: stage_queue.metrics()
+                for stage_queue in (self.extract_queue, self.output_queue)
+            }
+        }
+
+    def shutdown(self) -> None:
+        self.drain()
+
+        for _ in range(self.workers):
+            self.extract_queue.put(self.STOP)
+
+        self.extract_queue.join()
+        self.output_queue.put(self.STOP)
+
+        for thread in self.threads:
+            thread.join()
+
+
+EXECUTORS = {
+    "serial": SerialExecutor,
+    "process": ProcessExecutor,
+    "thread": ThreadExecutor,
+    "staged": StagedExecutor,
+}
+
+
+def load_executor(generator, conf: dict) -> Executor:
+    """
+    Load the executor configured for a generator. Setting ``workers``
+    without an ``executor`` selects the process executor.
+
+    :param generator: Generator the executor runs events for
+    :param conf: generator configuration
+
+    :return: executor
+    """
+    workers = conf.get("workers")
+    name = conf.get("executor") or ("process" if workers and workers > 1 else "serial")
+
+    if name not in EXECUTORS:
+        raise ValueError(f"Unknown executor: {name}")
+
+    return EXECUTORS[name](generator, workers=workers, **conf.get("executor_kwargs", {}))
@@ -0,0 +1,380 @@
+# encoding: utf-8
+"""
+Extraction Cache
+----------------
+
+Persistent cache of the body after the expensive leading extraction methods
+of a recipe, such as reading NetCDF or Zarr headers. Results are keyed by the
+event's URI, the fingerprint of its source and a hash of the cached methods'
+configuration, so a re-run after changing a later method in a recipe reuses
+them while a changed source or earlier method runs the extraction again.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from extraction_methods.core.extraction_method import ExtractionMethodConf
+
+from .metrics import Counter
+
+LOGGER = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_LOOKUPS = Counter(
+    "stac_generator_extraction_cache_lookups_total",
+    "Persistent extraction cache lookups by result.",
+    ("result",),
+)
+
+# Number of access times buffered before they are written
+TOUCH_BATCH_SIZE = 1000
+
+# Number of results buffered before they are written
+PUT_BATCH_SIZE = 100
+
+
+def prefix_hash(confs: list[ExtractionMethodConf]) -> str:
+    """
+    Hash of the configuration of the cached extraction methods.
+
+    :param confs: configuration of the methods in recipe order
+
+    :return: hash of the methods
+    """
+    digest = hashlib.md5()
+
+    for conf in confs:
+        digest.update(conf.model_dump_json().encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def cached_prefix(methods: set[str], confs: list[ExtractionMethodConf]) -> int:
+    """
+    Number of leading extraction methods of a recipe to cache.
+
+    :param methods: names of the extraction methods to cache
+    :param confs: configuration of the recipe's extraction methods
+
+    :return: length of the cached prefix, 0 if nothing is cached
+    """
+    return max(
+        (index + 1 for index, conf in enumerate(confs) if conf.method in methods),
+        default=0,
+    )
+
+
+class ExtractionCache:
+    """
+    SQLite store of the changes the cached extraction methods make to each
+    event's body. The least recently used results are evicted once the
+    stored results exceed ``max_size`` bytes.
+    """
+
+    def __init__(
+        self,
+        path: str = "extraction_cache.db",
+        methods: list[str] | None = None,
+        max_size: int = 1024**3,
+    ):
+        """
+        :param path: Path of the database
+        :param methods: Names of the extraction methods to cache. Each recipe
+            caches the body after the last of these methods it runs.
+        :param max_size: Maximum size in bytes of the stored results
+        """
+        self.path = path
+        self.methods = set(methods or [])
+        self.max_size = max_size
+
+        self.lock = threading.Lock()
+        self.touched = {}
+        # Results not yet written, fingerprint, data and access time by URI and prefix
+        self.pending: dict[tuple[str, str], tuple[str, bytes, float]] = {}
+        self.counts = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self.written = 0
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (uri TEXT NOT NULL, prefix TEXT NOT NULL, "
+            "fingerprint TEXT NOT NULL, data BLOB NOT NULL, size INTEGER NOT NULL, "
+            "accessed REAL NOT NULL, PRIMARY KEY (uri, prefix))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.connection.commit()
+
+    def prefix(self, confs: list[ExtractionMethodConf]) -> int:
+        """
+        Number of leading extraction methods of a recipe to cache.
+
+        :param confs: configuration of the recipe's extraction methods
+
+        :return: length of the cached prefix, 0 if nothing is cached
+        """
+        return cached_prefix(self.methods, confs)
+
+    def get(self, uri: str, fingerprint: str, prefix: str) -> tuple[dict, list] | None:
+        """
+        Changes the cached methods made to the body of an event.
+
+        :param uri: URI of the event
+        :param fingerprint: fingerprint of the source
+        :param prefix: hash of the cached methods
+
+        :return: changes to apply with ``apply_changes`` or None if not cached
+        """
+        with self.lock:
+            if (pending := self.pending.get((uri, prefix))) is not None:
+                data = pending[1] if pending[0] == fingerprint else None
+
+            else:
+                row = self.connection.execute(
+                    "SELECT data FROM results WHERE uri = ? AND prefix = ? AND fingerprint = ?",
+                    (uri, prefix, fingerprint),
+                ).fetchone()
+                data = None if row is None else row[0]
+
+            if data is None:
+                self.counts["misses"] += 1
+                EXTRACTION_CACHE_LOOKUPS.inc(result="miss")
+                return None
+
+            self.counts["hits"] += 1
+            self.touched[(uri, prefix)] = time.time()
+
+            if len(self.touched) >= TOUCH_BATCH_SIZE:
+                self.write()
+
+        EXTRACTION_CACHE_LOOKUPS.inc(result="hit")
+
+        return pickle.loads(zlib.decompress(data))
+
+    def put(self, uri: str, fingerprint: str, prefix: str, changes: tuple[dict, list]) -> None:
+        """
+        Store the changes the cached methods made to the body of an event.
+        Bodies that can't be pickled aren't stored. Results are buffered and
+        written in batches.
+
+        :param uri: URI of the event
+        :param fingerprint: fingerprint of the source
+        :param prefix: hash of the cached methods
+        :param changes: changes taken with ``get_changes``
+        """
+        try:
+            data = zlib.compress(pickle.dumps(changes, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.debug("Unable to cache extraction of %s", uri, exc_info=True)
+            return
+
+        with self.lock:
+            self.pending[(uri, prefix)] = (fingerprint, data, time.time())
+            self.counts["stored"] += 1
+            self.written += len(data)
+
+            # Check the size once a tenth of the limit has been written since the last check
+            if self.written >= self.max_size / 10:
+                self.write()
+                self.counts["evicted"] += self.evict(self.max_size)
+                self.written = 0
+
+            elif len(self.pending) >= PUT_BATCH_SIZE:
+                self.write()
+
+    def write(self) -> None:
+        """
+        Write buffered results and access times in one transaction. Must be
+        called holding ``lock``.
+        """
+        if not self.pending and not self.touched:
+            return
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results (uri, prefix, fingerprint, data, size, "
+                "accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (uri, prefix, fingerprint, data, len(data), accessed)
+                    for (uri, prefix), (fingerprint, data, accessed) in self.pending.items()
+                ],
+            )
+            self.connection.executemany(
+                "UPDATE results SET accessed = ? WHERE uri = ? AND prefix = ?",
+                [(accessed, uri, prefix) for (uri, prefix), accessed in self.touched.items()],
+            )
+
+        self.pending = {}
+        self.touched = {}
+
+    def evict(self, max_size: int) -> int:
+        """
+        Delete the least recently used results until the stored results fit
+        in ``max_size`` bytes. Must be called holding ``lock``.
+
+        :param max_size: Maximum size in bytes of the stored results
+
+        :return: number of results deleted
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM (SELECT rowid, "
+                "SUM(size) OVER (ORDER BY accessed DESC, rowid DESC) AS total FROM results) "
+                "WHERE total > ?)",
+                (max_size,),
+            )
+
+        if cursor.rowcount:
+            LOGGER.info("Evicted %s results from the extraction cache", cursor.rowcount)
+
+        return cursor.rowcount
+
+    def prune(self, max_size: int | None = None, older_than: float | None = None) -> int:
+        """
+        Delete results not used for ``older_than`` seconds and the least
+        recently used results over ``max_size`` bytes.
+
+        :param max_size: Maximum size in bytes of the stored results
+        :param older_than: Seconds since a result was last used
+
+        :return: number of results deleted
+        """
+        deleted = 0
+
+        with self.lock:
+            self.write()
+
+            if older_than is not None:
+                with self.connection:
+                    deleted += self.connection.execute(
+                        "DELETE FROM results WHERE accessed < ?", (time.time() - older_than,)
+                    ).rowcount
+
+            if max_size is not None:
+                deleted += self.evict(max_size)
+
+        return deleted
+
+    def vacuum(self) -> None:
+        """
+        Return the space freed by deleted results to the file system.
+        """
+        with self.lock:
+            self.connection.execute("VACUUM")
+
+    def info(self) -> dict:
+        """
+        Number of results, their size in bytes, the number of distinct cached
+        method prefixes and the range of access times.
+        """
+        with self.lock:
+            self.write()
+            results, size, prefixes, oldest, newest = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT prefix), "
+                "MIN(accessed), MAX(accessed) FROM results"
+            ).fetchone()
+
+        return {
+            "results": results,
+            "size": size,
+            "prefixes": prefixes,
+            "oldest": oldest,
+            "newest": newest,
+        }
+
+    def merge(self, state: dict) -> None:
+        """
+        Store the results sent back by a worker process.
+
+        :param state: state from ``WorkerExtractionCache.pop_state``
+        """
+        for uri, fingerprint, prefix, changes in state["stored"]:
+            self.put(uri, fingerprint, prefix, changes)
+
+    def stats(self) -> dict:
+        """
+        Hits, misses, results stored and evicted, and the hit rate.
+        """
+        hits, misses = self.counts["hits"], self.counts["misses"]
+
+        return self.counts | {"hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+    def flush(self) -> None:
+        """
+        Write buffered results and access times.
+        """
+        with self.lock:
+            self.write()
+
+    def close(self) -> None:
+        """
+        Write buffered results and access times and close the database.
+        """
+        with self.lock:
+            self.write()
+            self.connection.close()
+
+
+class WorkerExtractionCache:
+    """
+    Extraction cache of a worker process. The main process looks results up
+    and passes them in with each event, results the worker stores are sent
+    back with its state and written by the main process.
+    """
+
+    def __init__(self, methods: list[str] | None = None, **kwargs):
+        """
+        :param methods: Names of the extraction methods to cache
+        :param kwargs:
+        """
+        self.methods = set(methods or [])
+        self.results: dict[tuple[str, str], tuple[dict, list] | None] = {}
+        self.stored: list[tuple] = []
+
+    def prefix(self, confs: list[ExtractionMethodConf]) -> int:
+        """
+        Number of leading extraction methods of a recipe to cache.
+
+        :param confs: configuration of the recipe's extraction methods
+
+        :return: length of the cached prefix, 0 if nothing is cached
+        """
+        return cached_prefix(self.methods, confs)
+
+    def load(self, results: dict[tuple[str, str], tuple[dict, list] | None]) -> None:
+        """
+        Set the results looked up by the main process for the next events.
+
+        :param results: changes or None by URI and fingerprint
+        """
+        self.results = results
+
+    def get(self, uri: str, fingerprint: str, prefix: str) -> tuple[dict, list] | None:
+        """
+        Changes looked up by the main process for an event.
+        """
+        return self.results.get((uri, fingerprint))
+
+    def put(self, uri: str, fingerprint: str, prefix: str, changes: tuple[dict, list]) -> None:
+        """
+        Keep changes to send back to the main process.
+        """
+        self.stored.append((uri, fingerprint, prefix, changes))
+
+    def pop_state(self) -> dict:
+        """
+        Take the results stored since the last call.
+        """
+        stored, self.stored = self.stored, []
+
+        return {"stored": stored}
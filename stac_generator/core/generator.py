@@ -13,35 +13,80 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 import logging
+import time
 import traceback
+from collections.abc import Callable
 from importlib.metadata import entry_points
+from typing import NamedTuple
 
-from extraction_methods.core.extraction_method import (
-    ExtractionMethod,
-    set_extraction_method_defaults,
-)
+from extraction_methods.core.extraction_method import set_extraction_method_defaults
 
 from stac_generator.core.bulk_output import BulkOutput
 from stac_generator.core.input import Input
 from stac_generator.core.output import Output
 
 from .baker import Recipe, Recipes
-from .utils import load_plugins
+from .checkpoint import Checkpointer
+from .executor import Executor, load_executor
+from .extraction_cache import ExtractionCache, WorkerExtractionCache, prefix_hash
+from .incremental import IncrementalState, get_fingerprint
+from .memoize import MemoCache
+from .metrics import (
+    EVENTS,
+    EXECUTOR_OCCUPANCY,
+    EXTRACTION_SECONDS,
+    QUEUE_DEPTH,
+    REGISTRY,
+    MetricsServer,
+)
+from .pipeline import PipelineCache
+from .profiler import SamplingProfiler, profile_tag
+from .recipe_watcher import RecipeWatcher
+from .resources import ResourceRegistry
+from .scheduler import InputScheduler
+from .timings import Timings
+from .utils import batches, load_plugins
 
 LOGGER = logging.getLogger(__name__)
 
 
+class Extraction(NamedTuple):
+    """
+    Result of the extraction for an event, passed to ``Generator.output_result``.
+    """
+
+    body: dict
+    recipe: Recipe
+    failed: bool = False
+    fingerprint: str | None = None
+    unchanged: bool = False
+    uri: str | None = None
+
+
 class Generator:
     """
     Generator class
     """
 
-    def __init__(self, conf: dict):
+    def __init__(self, conf: dict, worker: bool = False):
+        """
+        :param conf: generator configuration
+        :param worker: only build what a ``process`` executor worker needs to run
+            extractions, the main process looks up the recipes and holds the state
+        """
         set_extraction_method_defaults(conf.get("extraction_methods", {}))
 
         recipes_root = conf.get("recipes_root", "recipes")
 
-        self.recipes = Recipes(recipes_root)
+        recipe_cache = conf.get("recipe_cache", {})
+
+        self.recipes = (
+            None
+            if worker
+            else Recipes(
+                recipes_root, cache=recipe_cache.get("path"), workers=recipe_cache.get("workers")
+            )
+        )
 
         self.inputs = load_plugins(conf.pop("inputs", []), "stac_generator.inputs")
 
@@ -53,51 +98,70 @@ class Generator:
 
         self.extraction_methods = entry_points(group="extraction_methods")
 
-    def _load_extraction_method(self, extraction_method_conf: dict, **kwargs) -> ExtractionMethod:
-        """
-        Load the given extraction method
+        self.timings = Timings(**conf["timings"]) if "timings" in conf else Timings(enabled=False)
 
-        :param extraction_method_conf: Configuration for the extraction method
-        :param kwargs:
+        for output in self.outputs + self.failed_outputs:
+            output.timings = self.timings
 
-        :return: extraction method
-        """
+        self.resources = ResourceRegistry.current = ResourceRegistry(**conf.get("resources", {}))
 
-        extraction_method = self.extraction_methods[extraction_method_conf.method].load()
+        for plugin in self.inputs + self.outputs + self.failed_outputs:
+            plugin.resources = self.resources
 
-        return extraction_method(extraction_method_conf, **kwargs)
+        for output in self.outputs:
+            output.failure_callback = self.output_failed
 
-    def _run_extraction_method(self, body: dict, extraction_method_conf: dict, **kwargs) -> dict:
-        """
-        Run the specified extraction method.
+        self.extraction_cache = None
 
-        :param body: The current body of data
-        :param extraction_method_conf: Configuration for the extraction method
-        :param kwargs:
+        if "extraction_cache" in conf:
+            self.extraction_cache = (WorkerExtractionCache if worker else ExtractionCache)(
+                **conf["extraction_cache"]
+            )
 
-        :return: body post extraction method
-        """
+        self.pipelines = PipelineCache(
+            self.extraction_methods,
+            self.timings,
+            conf.get("vectorize"),
+            MemoCache(**conf.get("memoize", {})),
+            self.extraction_cache,
+        )
 
-        extraction_method = self._load_extraction_method(extraction_method_conf, **kwargs)
+        if "metrics" in conf:
+            REGISTRY.enabled = True
 
-        return extraction_method._run(body)
+        self.metrics_server: MetricsServer | None = None
 
-    def run_extraction_methods(self, body: dict, extraction_methods: list, **kwargs) -> dict:
-        """
-        Extract facets from the listed extraction methods
+        self.profiler = SamplingProfiler(**conf["profile"]) if "profile" in conf else None
 
-        :param body: current extracted meta data
-        :param recipe: Recipe
-        :param kwargs:
+        self.incremental = (
+            IncrementalState(**conf["incremental"])
+            if "incremental" in conf and not worker
+            else None
+        )
+
+        # Opened by ``run`` so worker processes don't open the checkpoint store
+        self.checkpoints: Checkpointer | None = None
 
-        :return: result from the processing
+        self.recipe_watcher: RecipeWatcher | None = None
+
+        self.executor = None if worker else self.create_executor(conf)
+
+    def create_executor(self, conf: dict) -> Executor:
         """
+        Executor that extracts and outputs the events from the inputs.
+
+        :param conf: generator configuration
 
-        for extraction_method in extraction_methods:
-            # print("EXTRACTION METHOD", extraction_method)
-            body = self._run_extraction_method(body, extraction_method, **kwargs)
+        :return: executor
+        """
+        return load_executor(self, conf)
 
-        return body
+    @property
+    def kwargs(self) -> dict:
+        """
+        Keyword arguments passed to extraction methods, mappings and outputs.
+        """
+        return {"GENERATOR_TYPE": self.conf.get("generator")}
 
     def output(self, body: dict, outputs: list[Output], recipe: Recipe, **kwargs) -> None:
         """
@@ -109,43 +173,398 @@ class Generator:
         for output in outputs:
             output.run(body, recipe, **kwargs)
 
+    def output_failed(self, data: dict, error: str) -> None:
+        """
+        Send a record an output reported as failed to the failed outputs.
+
+        :param data: record which failed
+        :param error: description of the failure
+        """
+        if self.incremental is not None:
+            self.incremental.forget(self.incremental.uris(data.get("id")))
+
+        self.output(data | {"ERROR": error}, self.failed_outputs, None, **self.kwargs)
+        EVENTS.inc(status="output_failed")
+
     def finished(self) -> None:
         """
-        Run clear cache of remaining data for bulk outputs.
+        Run clear cache of remaining data for bulk outputs and wait for
+        outputs to complete their exports. In incremental mode the URIs
+        output before the flush are then committed.
         """
-        for output in self.outputs:
+        if self.incremental is not None:
+            self.incremental.prepare()
+
+        for output in self.outputs + self.failed_outputs:
             if isinstance(output, BulkOutput):
                 output.clear_cache()
 
-    def process(self, body: dict, recipe: Recipe, **kwargs) -> None:
+        for output in self.outputs + self.failed_outputs:
+            output.finish()
+
+        if self.incremental is not None:
+            self.incremental.commit()
+
+        if self.extraction_cache is not None:
+            self.extraction_cache.flush()
+
+    def process(
+        self, body: dict, recipe: Recipe, fingerprint: str | None = None, **kwargs
+    ) -> None:
         """
         process a generator record.
 
         :param body: body for object
+        :param fingerprint: fingerprint of the source, needed to use the extraction cache
         :param kwargs:
         """
         LOGGER.debug(
             "Generating %s : %s with recipe %s", self.conf.get("generator"), body["uri"], recipe
         )
 
-        return self.run_extraction_methods(body, recipe.extraction_methods, **kwargs)
+        return self.pipelines.get(recipe, **kwargs).run(body, fingerprint)
 
-    def process_event(self, body: dict) -> None:
+    def prepare(self, body: dict) -> tuple[Recipe, str | None, Extraction | None]:
         """
-        Run event.
+        Find the recipe for an event and fingerprint its source if the
+        fingerprint is needed. In incremental mode events whose source and
+        recipe are unchanged since they were last output need no extraction.
 
         :param body: initial body for object
+
+        :return: recipe, fingerprint and the result if the event needs no extraction
         """
-        kwargs = {"GENERATOR_TYPE": self.conf.get("generator")}
-        recipe = self.recipes.get(body.get("recipe_path", body["uri"]), self.conf.get("generator"))
+        start = time.perf_counter()
+        generator = self.conf.get("generator")
+        recipe = self.recipes.get(body.get("recipe_path", body["uri"]), generator)
+        self.timings.add("recipe_lookup", generator, time.perf_counter() - start)
+
+        if self.incremental is None and self.extraction_cache is None:
+            return recipe, None, None
 
         try:
-            body = self.process(body, recipe, **kwargs)
-            self.output(body, self.outputs, recipe, **kwargs)
+            fingerprint = get_fingerprint(body, self.resources)
+
+            if self.incremental is not None and self.incremental.unchanged(
+                body["uri"], fingerprint, recipe.key
+            ):
+                return recipe, fingerprint, Extraction(body, recipe, unchanged=True)
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            body["ERROR"] = traceback.format_exc()
+            return recipe, None, Extraction(body, recipe, failed=True)
+
+        return recipe, fingerprint, None
+
+    def cached(self, body: dict, recipe: Recipe, fingerprint: str | None) -> tuple | None:
+        """
+        Look up the extraction cache for an event extracted by a worker process.
+
+        :param body: initial body for object
+        :param recipe: recipe for the event
+        :param fingerprint: fingerprint of the source
+
+        :return: changes made by the recipe's cached methods or None if not cached
+        """
+        if self.extraction_cache is None or fingerprint is None:
+            return None
+
+        prefix = self.extraction_cache.prefix(recipe.extraction_methods)
+
+        if not prefix:
+            return None
+
+        return self.extraction_cache.get(
+            body["uri"], fingerprint, prefix_hash(recipe.extraction_methods[:prefix])
+        )
+
+    def run_extraction(self, body: dict, recipe: Recipe, fingerprint: str | None) -> Extraction:
+        """
+        Run the extraction for a prepared event.
+
+        :param body: initial body for object
+        :param recipe: recipe for the event
+        :param fingerprint: fingerprint of the source
+
+        :return: extraction result
+        """
+        start = time.perf_counter()
+        uri = body["uri"]
+        acquired = self.resources.resolve(body)
+
+        try:
+            with profile_tag("extract", recipe.key):
+                body = self.process(body, recipe, fingerprint, **self.kwargs)
+
+            return Extraction(body, recipe, fingerprint=fingerprint, uri=uri)
 
         except Exception:
             body["ERROR"] = traceback.format_exc()
-            self.output(body, self.failed_outputs, recipe, **kwargs)
+            return Extraction(body, recipe, failed=True)
+
+        finally:
+            self.resources.restore([body], acquired)
+            EXTRACTION_SECONDS.observe(time.perf_counter() - start)
+
+    def run_extraction_batch(self, events: list[tuple[dict, Recipe, str | None]]) -> list:
+        """
+        Run the extraction for a batch of prepared events. Events are grouped
+        by recipe and each recipe's pipeline is run over its group at once.
+
+        :param events: initial body, recipe and fingerprint of each event
+
+        :return: extraction results
+        """
+        start = time.perf_counter()
+        generator = self.conf.get("generator")
+
+        results = []
+        # Recipe and the bodies, fingerprints and URIs of its events in order
+        groups: dict[str, tuple[Recipe, list[dict], list[str | None], list[str]]] = {}
+        acquired = [resource for body, _, _ in events for resource in self.resources.resolve(body)]
+
+        for body, recipe, fingerprint in events:
+            group = groups.setdefault(recipe.key, (recipe, [], [], []))
+            group[1].append(body)
+            group[2].append(fingerprint)
+            group[3].append(body["uri"])
+
+        for recipe, group, fingerprints, uris in groups.values():
+            LOGGER.debug(
+                "Generating %s : %s events with recipe %s", generator, len(group), recipe
+            )
+
+            with profile_tag("extract", recipe.key):
+                try:
+                    extracted, failed = self.pipelines.get(recipe, **self.kwargs).run_batch(
+                        group, fingerprints
+                    )
+
+                except Exception:  # pylint: disable=broad-exception-caught
+                    error = traceback.format_exc()
+                    extracted, failed = [], list(enumerate(group))
+
+                    for _, body in failed:
+                        body["ERROR"] = error
+
+            # Extracted bodies may be new dicts so they are matched to their events by position
+            results.extend(
+                Extraction(body, recipe, fingerprint=fingerprints[index], uri=uris[index])
+                for index, body in extracted
+            )
+            results.extend(Extraction(body, recipe, failed=True) for _, body in failed)
+
+        self.resources.restore([result.body for result in results], acquired)
+
+        if events:
+            duration = (time.perf_counter() - start) / len(events)
+
+            for _ in events:
+                EXTRACTION_SECONDS.observe(duration)
+
+        return results
+
+    def extract(self, body: dict) -> Extraction:
+        """
+        Run the extraction for an event without outputting it.
+
+        :param body: initial body for object
+
+        :return: extraction result
+        """
+        recipe, fingerprint, result = self.prepare(body)
+
+        if result is not None:
+            return result
+
+        return self.run_extraction(body, recipe, fingerprint)
+
+    def extract_batch(self, bodies: list[dict]) -> list[Extraction]:
+        """
+        Run the extraction for a batch of events without outputting them.
+
+        :param bodies: initial bodies for objects
+
+        :return: extraction results
+        """
+        results = []
+        events = []
+
+        for body in bodies:
+            recipe, fingerprint, result = self.prepare(body)
+
+            if result is not None:
+                results.append(result)
+
+            else:
+                events.append((body, recipe, fingerprint))
+
+        return results + self.run_extraction_batch(events)
+
+    def output_result(
+        self,
+        body: dict,
+        recipe: Recipe,
+        failed: bool = False,
+        fingerprint: str | None = None,
+        unchanged: bool = False,
+        uri: str | None = None,
+    ) -> None:
+        """
+        Output the result of an extraction.
+
+        :param body: extracted body for object
+        :param recipe: recipe used for the extraction
+        :param failed: whether the extraction failed
+        :param fingerprint: fingerprint of the source to record in incremental mode
+        :param unchanged: whether the event was skipped as unchanged
+        :param uri: URI of the event to record in incremental mode
+        """
+        if unchanged:
+            self.incremental.skip()
+            EVENTS.inc(status="unchanged")
+            return
+
+        status = "extraction_failed" if failed else "success"
+
+        with profile_tag("output", recipe.key):
+            if not failed:
+                try:
+                    self.output(body, self.outputs, recipe, **self.kwargs)
+                    self.record(uri, recipe, fingerprint, body.get("id"))
+                    EVENTS.inc(status=status)
+                    return
+
+                except Exception:
+                    body["ERROR"] = traceback.format_exc()
+                    status = "output_failed"
+
+            self.output(body, self.failed_outputs, recipe, **self.kwargs)
+            EVENTS.inc(status=status)
+
+    def output_results(self, results: list[Extraction]) -> None:
+        """
+        Output the results of a batch extraction. Successful results are
+        handed to each output as one batch per recipe, if an output fails the
+        whole batch is sent to the failed outputs.
+
+        :param results: extraction results
+        """
+        groups: dict[str, tuple[Recipe, list[Extraction]]] = {}
+
+        for result in results:
+            if result.unchanged or result.failed:
+                self.output_result(*result)
+
+            else:
+                groups.setdefault(result.recipe.key, (result.recipe, []))[1].append(result)
+
+        for recipe, group in groups.values():
+            bodies = [result.body for result in group]
+
+            with profile_tag("output", recipe.key):
+                try:
+                    for output in self.outputs:
+                        output.run_batch(bodies, recipe, **self.kwargs)
+
+                except Exception:  # pylint: disable=broad-exception-caught
+                    error = traceback.format_exc()
+
+                    for body in bodies:
+                        body["ERROR"] = error
+
+                    for output in self.failed_outputs:
+                        output.run_batch(bodies, recipe, **self.kwargs)
+
+                    EVENTS.inc(len(bodies), status="output_failed")
+                    continue
+
+            for result in group:
+                self.record(result.uri, recipe, result.fingerprint, result.body.get("id"))
+
+            EVENTS.inc(len(bodies), status="success")
+
+    def record(
+        self, uri: str | None, recipe: Recipe, fingerprint: str | None, output_id: str | None
+    ) -> None:
+        """
+        Record an event that has been output in incremental mode.
+
+        :param uri: URI of the event
+        :param recipe: recipe used for the extraction
+        :param fingerprint: fingerprint of the source
+        :param output_id: id of the output record
+        """
+        if self.incremental is not None and uri is not None:
+            self.incremental.record(uri, fingerprint, recipe.key, output_id)
+
+    def pop_state(self) -> dict:
+        """
+        Take the timings, metrics and profile samples recorded since the last
+        call. Used by worker processes to send them back with each result.
+        """
+        state = {}
+
+        if self.timings.enabled:
+            state["timings"] = self.timings.pop_state()
+
+        if REGISTRY.enabled:
+            state["metrics"] = REGISTRY.pop_state()
+
+        if self.profiler is not None:
+            state["profile"] = self.profiler.pop_state()
+
+        if self.extraction_cache is not None:
+            state["extraction_cache"] = self.extraction_cache.pop_state()
+
+        return state
+
+    def merge_state(self, state: dict) -> None:
+        """
+        Merge state taken with ``pop_state`` from a worker process.
+
+        :param state: worker state
+        """
+        if "timings" in state:
+            self.timings.merge(state["timings"])
+
+        if "metrics" in state:
+            REGISTRY.merge(state["metrics"])
+
+        if "profile" in state and self.profiler is not None:
+            self.profiler.merge(state["profile"])
+
+        if "extraction_cache" in state and self.extraction_cache is not None:
+            self.extraction_cache.merge(state["extraction_cache"])
+
+    def process_event(self, body: dict) -> None:
+        """
+        Run event.
+
+        :param body: initial body for object
+        """
+        self.output_result(*self.extract(body))
+
+    def process_batch(self, bodies: list[dict]) -> None:
+        """
+        Run a batch of events.
+
+        :param bodies: initial bodies for objects
+        """
+        self.output_results(self.extract_batch(bodies))
+
+    def submit(self, events: dict | list[dict], done: Callable[[], None] | None = None) -> None:
+        """
+        Hand an event, or a list of events yielded by an input, to the executor.
+
+        :param events: initial body for object or a list of them
+        :param done: called once the events have been output
+        """
+        if isinstance(events, list):
+            self.executor.submit_batch(events, done)
+
+        else:
+            self.executor.submit(events, done)
 
     def run_input(self, input_plugin: Input) -> None:
         """
@@ -153,20 +572,156 @@ class Generator:
 
         :param input_plugin: Input plugin to be run
         """
+        input_plugin.backpressure = self.executor.occupancy
+
         if input_plugin.blocking:
-            input_plugin.run(self.process_event)
+            input_plugin.run(self.executor.process)
 
         else:
-            for body in input_plugin.run():
-                self.process_event(body)
+            input_name = type(input_plugin).__name__
+
+            events = self.timings.iterate("input", input_name, input_plugin.run())
 
+            for body in batches(events, self.conf.get("batch_size", 1)):
+                self.submit(body)
+
+                if self.checkpoints is not None and self.checkpoints.due():
+                    self.checkpoints.commit({input_plugin.checkpoint_key: input_plugin.checkpoint})
+
+        self.executor.drain()
         self.finished()
 
+        if self.checkpoints is not None:
+            self.checkpoints.save({input_plugin.checkpoint_key: input_plugin.checkpoint})
+
+    def run_inputs_concurrently(self) -> None:
+        """
+        Run all inputs at once, interleaving their events.
+        """
+        scheduler = InputScheduler(self, self.inputs, self.conf.get("input_queue_size", 100))
+        scheduler.run()
+
+        self.executor.drain()
+        self.finished()
+
+        if self.checkpoints is not None:
+            self.checkpoints.save(scheduler.checkpoints)
+
+    def start_metrics(self) -> None:
+        """
+        Serve metrics on ``/metrics`` if ``metrics`` is configured.
+        """
+        if "metrics" not in self.conf:
+            return
+
+        EXECUTOR_OCCUPANCY.function = self.executor.occupancy
+        QUEUE_DEPTH.function = lambda: {
+            (name,): queue_metrics["depth"]
+            for name, queue_metrics in self.executor.metrics().get("queues", {}).items()
+        }
+
+        self.metrics_server = MetricsServer(REGISTRY, **self.conf["metrics"]).start()
+
+    def stop_metrics(self) -> None:
+        """
+        Stop serving metrics.
+        """
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def start_checkpoints(self) -> None:
+        """
+        Open the checkpoint store if ``checkpoint`` is configured and give
+        each input its resume token.
+        """
+        if "checkpoint" not in self.conf:
+            return
+
+        self.checkpoints = Checkpointer(self, **self.conf["checkpoint"])
+        self.checkpoints.resume(self.inputs)
+
+    def stop_checkpoints(self) -> None:
+        """
+        Close the checkpoint store.
+        """
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+            self.checkpoints = None
+
+    def recipes_changed(self, keys: set[str]) -> None:
+        """
+        Drop the compiled pipelines of recipes that have been changed or removed.
+
+        :param keys: ``Recipe.key`` of the recipes which no longer exist
+        """
+        for key in keys:
+            self.pipelines.invalidate(key)
+
+    def start_recipe_watcher(self) -> None:
+        """
+        Reload recipes when they change if ``recipe_watch`` is configured.
+        """
+        if "recipe_watch" not in self.conf:
+            return
+
+        self.recipe_watcher = RecipeWatcher(
+            self.recipes, self.recipes_changed, **self.conf["recipe_watch"]
+        ).start()
+
+    def stop_recipe_watcher(self) -> None:
+        """
+        Stop reloading recipes.
+        """
+        if self.recipe_watcher is not None:
+            self.recipe_watcher.stop()
+            self.recipe_watcher = None
+
     def run(self) -> None:
         """
         Run generator.
         """
         print("RUNNING")
         LOGGER.info("Running generator: %s", self.conf)
-        for input_plugin in self.inputs:
-            self.run_input(input_plugin)
+        self.start_metrics()
+        self.start_checkpoints()
+        self.start_recipe_watcher()
+
+        if self.profiler is not None:
+            self.profiler.start()
+
+        try:
+            if self.conf.get("concurrent_inputs", False):
+                self.run_inputs_concurrently()
+
+            else:
+                for input_plugin in self.inputs:
+                    self.run_input(input_plugin)
+
+        finally:
+            self.executor.shutdown()
+            self.stop_metrics()
+            self.stop_checkpoints()
+            self.stop_recipe_watcher()
+
+            if self.profiler is not None:
+                self.profiler.stop()
+                self.profiler.write()
+
+        LOGGER.info("Pipeline cache: %s", self.pipelines.stats())
+
+        if self.incremental is not None:
+            LOGGER.info("Incremental: %s", self.incremental.stats())
+            self.incremental.close()
+
+        if self.extraction_cache is not None:
+            LOGGER.info("Extraction cache: %s", self.extraction_cache.stats())
+            self.extraction_cache.close()
+
+        LOGGER.info("Resources: %s", self.resources.stats())
+        self.resources.close()
+
+        if executor_metrics := self.executor.metrics():
+            LOGGER.info("Executor: %s", executor_metrics)
+
+        self.timings.write_report(pipeline_cache=self.pipelines.stats(), executor=executor_metrics)
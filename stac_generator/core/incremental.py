@@ -0,0 +1,220 @@
+# encoding: utf-8
+"""
+Incremental State
+-----------------
+
+Local state store for incremental runs. The fingerprint of every URI output
+is recorded with the key of the recipe that produced it so a re-run can skip
+events whose source and recipe are unchanged.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from .resources import ResourceRegistry
+from .utils import Stats
+
+LOGGER = logging.getLogger(__name__)
+
+
+def object_fingerprint(etag: str, size: int) -> str:
+    """
+    Fingerprint of an object in an object store.
+
+    :param etag: ETag of the object
+    :param size: size of the object in bytes
+
+    :return: fingerprint
+    """
+    return f"{etag}:{size}"
+
+
+def get_fingerprint(body: dict, resources: ResourceRegistry | None = None) -> str | None:
+    """
+    Fingerprint of the source of an event. Inputs can provide one as
+    ``fingerprint`` in the event, otherwise objects listed with a boto
+    ``client``, or a handle to one, are fetched for their ETag and size and
+    local files use their mtime and size.
+
+    :param body: initial body for object
+    :param resources: registry to resolve a client handle from
+
+    :return: fingerprint or None if the source can't be fingerprinted
+    """
+    if "fingerprint" in body:
+        return body["fingerprint"]
+
+    uri = body["uri"]
+
+    if (client := body.get("client")) is not None:
+        _, bucket, key = urlparse(uri).path.split("/", 2)
+
+        with (resources or ResourceRegistry()).use(client) as client:
+            stats = Stats.from_boto(client.head_object(Bucket=bucket, Key=key))
+
+        return object_fingerprint(stats["Etag"], stats["size"])
+
+    try:
+        stat = os.stat(uri)
+
+    except (OSError, ValueError):
+        return None
+
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class IncrementalState:
+    """
+    SQLite store of the fingerprint, recipe key and output id of every URI
+    output. Records are held from the process running the outputs until the
+    outputs have flushed them, worker processes only read.
+
+    Outputs may buffer records or send them in the background, so a URI is
+    only committed once the generator has flushed its outputs: ``prepare``
+    is called before the outputs are flushed and ``commit`` after. Records
+    whose export fails in between are dropped with ``forget``.
+    """
+
+    def __init__(self, path: str = "incremental.db"):
+        """
+        :param path: Path of the database
+        """
+        self.lock = threading.Lock()
+        self.pending = []
+        self.prepared = []
+        self.skipped = 0
+        self.recorded = 0
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS state (uri TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+            "recipe_key TEXT NOT NULL, output_id TEXT, updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def unchanged(self, uri: str, fingerprint: str | None, recipe_key: str) -> bool:
+        """
+        Whether a URI was output before from the same source and recipe.
+
+        :param uri: URI of the event
+        :param fingerprint: fingerprint of the source
+        :param recipe_key: key of the recipe for the event
+
+        :return: True if the event can be skipped
+        """
+        if fingerprint is None:
+            return False
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fingerprint, recipe_key FROM state WHERE uri = ?", (uri,)
+            ).fetchone()
+
+        return row == (fingerprint, recipe_key)
+
+    def skip(self) -> None:
+        """
+        Count an event skipped as unchanged.
+        """
+        with self.lock:
+            self.skipped += 1
+
+    def record(
+        self, uri: str, fingerprint: str | None, recipe_key: str, output_id: str | None
+    ) -> None:
+        """
+        Record a URI that has been handed to the outputs. It is committed by
+        the first ``commit`` after the outputs have been flushed.
+
+        :param uri: URI of the event
+        :param fingerprint: fingerprint of the source
+        :param recipe_key: key of the recipe used for the event
+        :param output_id: id of the output record
+        """
+        if fingerprint is None:
+            return
+
+        with self.lock:
+            self.recorded += 1
+            self.pending.append((uri, fingerprint, recipe_key, output_id, time.time()))
+
+    def uris(self, output_id: str | None) -> list[str]:
+        """
+        URIs not yet committed which produced an output record.
+
+        :param output_id: id of the output record
+
+        :return: URIs of the records
+        """
+        with self.lock:
+            return [
+                record[0] for record in self.pending + self.prepared if record[3] == output_id
+            ]
+
+    def forget(self, uris: list[str]) -> None:
+        """
+        Drop the records of URIs whose output failed to export so their
+        sources are output again by the next run.
+
+        :param uris: URIs of the events
+        """
+        if not uris:
+            return
+
+        uris = set(uris)
+
+        with self.lock:
+            self.pending = [record for record in self.pending if record[0] not in uris]
+            self.prepared = [record for record in self.prepared if record[0] not in uris]
+
+    def prepare(self) -> None:
+        """
+        Mark the records so far to be committed. Called before the outputs
+        are flushed, so records added while they flush wait for the next commit.
+        """
+        with self.lock:
+            self.prepared.extend(self.pending)
+            self.pending = []
+
+    def commit(self) -> None:
+        """
+        Write the records marked by ``prepare``. Called once the outputs have
+        been flushed.
+        """
+        with self.lock:
+            if not self.prepared:
+                return
+
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO state "
+                    "(uri, fingerprint, recipe_key, output_id, updated) VALUES (?, ?, ?, ?, ?)",
+                    self.prepared,
+                )
+
+            self.prepared = []
+
+    def stats(self) -> dict:
+        """
+        Number of events skipped as unchanged and recorded as new or changed.
+        """
+        return {"skipped": self.skipped, "recorded": self.recorded}
+
+    def close(self) -> None:
+        """
+        Close the database. Records which haven't been committed are dropped,
+        so their URIs are output again by the next run.
+        """
+        with self.lock:
+            self.connection.close()
@@ -6,19 +6,55 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import asyncio
 from abc import abstractmethod
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable, Coroutine
+from typing import Any
 
 from stac_generator.core.process_config import SetConfig
+from stac_generator.core.resources import ResourceRegistry
 
 
 class Input(SetConfig):
     """
     Base class to define an input
+
+    Resumable inputs read ``resume_token`` when run and continue after the
+    position it records. While running they keep ``checkpoint`` set to a
+    token for the position after the last event they yielded, which must be
+    JSON serialisable.
     """
 
     blocking: bool = False
 
+    # Set by the generator, returns the fraction of its capacity in use
+    backpressure: Callable[[], float] | None = None
+
+    # Key the input's resume token is stored under, set by the generator if not configured
+    checkpoint_key: str | None = None
+
+    # Set by the generator from the checkpoint store before the input is run
+    resume_token: Any = None
+
+    # Position after the last event yielded, committed once it has been output
+    checkpoint: Any = None
+
+    # Set by the generator, resources shared with the rest of the run
+    resources: ResourceRegistry = ResourceRegistry()
+
+    def __init__(self, **kwargs):
+        """
+        Set the input's config, its scheduling ``weight`` and ``priority``
+        used when inputs are run concurrently and its ``checkpoint_key``.
+
+        :param kwargs:
+        """
+        super().__init__(**kwargs)
+
+        self.weight = kwargs.get("weight", 1)
+        self.priority = kwargs.get("priority", 0)
+        self.checkpoint_key = kwargs.get("checkpoint_key")
+
     @abstractmethod
     def run(self):
         """
@@ -38,3 +74,105 @@ class BlockingInput(Input):
         """
         Run the input plugin.
         """
+
+
+class AsyncInput(Input):
+    """
+    Base class to define an input run on the asyncio event loop
+    """
+
+    @abstractmethod
+    def run(self) -> AsyncIterator[dict]:
+        """
+        Run the input plugin as an asynchronous generator of events.
+        """
+
+
+class AsyncBlockingInput(AsyncInput):
+    """
+    Base class to define a blocking input run on the asyncio event loop
+    """
+
+    blocking: bool = True
+
+    @abstractmethod
+    async def run(self, process_method: Callable[[dict], Coroutine]):
+        """
+        Run the input plugin, awaiting ``process_method`` for every event.
+        """
+
+
+class SyncInputAdapter(AsyncInput):
+    """
+    Run a synchronous input in the event loop's executor so it can be used
+    by the asynchronous generator.
+    """
+
+    def __init__(self, input_plugin: Input):
+        """
+        :param input_plugin: synchronous input plugin to wrap
+        """
+        self.input_plugin = input_plugin
+        self.blocking = input_plugin.blocking
+
+    @property
+    def checkpoint_key(self) -> str | None:
+        return self.input_plugin.checkpoint_key
+
+    @checkpoint_key.setter
+    def checkpoint_key(self, checkpoint_key: str) -> None:
+        self.input_plugin.checkpoint_key = checkpoint_key
+
+    @property
+    def resume_token(self) -> Any:
+        return self.input_plugin.resume_token
+
+    @resume_token.setter
+    def resume_token(self, resume_token: Any) -> None:
+        self.input_plugin.resume_token = resume_token
+
+    @property
+    def checkpoint(self) -> Any:
+        return self.input_plugin.checkpoint
+
+    def run(self, process_method: Callable[[dict], Coroutine] | None = None):
+        """
+        Run the wrapped input plugin.
+
+        :param process_method: coroutine function run for each event of a blocking input
+
+        :return: coroutine for blocking inputs otherwise an asynchronous generator of events
+        """
+        if self.blocking:
+            return self.consume(process_method)
+
+        return self.iterate()
+
+    async def consume(self, process_method: Callable[[dict], Coroutine]) -> None:
+        """
+        Run a blocking input in a thread, awaiting ``process_method`` on the
+        event loop for every event.
+
+        :param process_method: coroutine function run for each event
+        """
+        loop = asyncio.get_running_loop()
+
+        def callback(body: dict, done: Callable[[], None] | None = None) -> None:
+            asyncio.run_coroutine_threadsafe(process_method(body), loop).result()
+
+            if done is not None:
+                done()
+
+        await loop.run_in_executor(None, self.input_plugin.run, callback)
+
+    async def iterate(self) -> AsyncIterator[dict]:
+        """
+        Iterate a non-blocking input from a thread one event at a time.
+        """
+        loop = asyncio.get_running_loop()
+
+        end = object()
+        iterator = iter(self.input_plugin.run())
+
+        while (body := await loop.run_in_executor(None, next, iterator, end)) is not end:
+            yield body
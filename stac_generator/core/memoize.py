@@ -0,0 +1,235 @@
+# encoding: utf-8
+"""
+Memoization
+-----------
+
+In process cache of extraction method results shared by the events of a
+dataset. A recipe marks a method as cacheable with a key template, such as
+``$mip_era.$source_id.$version``, and the changes the method makes to the
+body are stored under the rendered key. Later events with the same key have
+the changes applied instead of running the method.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import copy
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from string import Template
+
+from cachetools import TTLCache
+
+from .metrics import Counter
+
+MEMOIZE_LOOKUPS = Counter(
+    "stac_generator_memoize_lookups_total",
+    "Memoized extraction method lookups by method and result.",
+    ("method", "result"),
+)
+
+
+def snapshot(body: dict) -> dict:
+    """
+    Copy of a body to compare against once it has been changed. Methods may
+    change values in place so values are deep copied, values that can't be
+    copied, such as clients, are kept as they are.
+
+    :param body: body of data
+
+    :return: copy of the body
+    """
+    copies = {}
+
+    for name, value in body.items():
+        try:
+            copies[name] = copy.deepcopy(value)
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            copies[name] = value
+
+    return copies
+
+
+class NestedChanges:
+    """
+    Changes made to a dictionary held in a body, applied to the body's own
+    dictionary rather than replacing it.
+    """
+
+    __slots__ = ("changes",)
+
+    def __init__(self, changes: tuple[dict, list]):
+        """
+        :param changes: added or changed values and names of removed values
+        """
+        self.changes = changes
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NestedChanges) and other.changes == self.changes
+
+    def __repr__(self) -> str:
+        return f"NestedChanges({self.changes!r})"
+
+
+def get_changes(before: dict, after: dict) -> tuple[dict, list]:
+    """
+    Changes made to a body. Dictionaries in both are compared key by key,
+    so only the values a method wrote are kept.
+
+    :param before: snapshot of the body
+    :param after: body once changed
+
+    :return: added or changed values and names of removed values
+    """
+    updated = {}
+
+    for name, value in after.items():
+        if name not in before:
+            updated[name] = value
+
+        elif before[name] != value:
+            if isinstance(value, dict) and isinstance(before[name], dict):
+                updated[name] = NestedChanges(get_changes(before[name], value))
+
+            else:
+                updated[name] = value
+
+    removed = [name for name in before if name not in after]
+
+    return updated, removed
+
+
+def apply_changes(body: dict, changes: tuple[dict, list]) -> dict:
+    """
+    Apply changes taken with ``get_changes`` to a body.
+
+    :param body: body of data
+    :param changes: added or changed values and names of removed values
+
+    :return: changed body
+    """
+    updated, removed = changes
+
+    for name in removed:
+        body.pop(name, None)
+
+    for name, value in updated.items():
+        if isinstance(value, NestedChanges):
+            nested = body.get(name)
+            body[name] = apply_changes(nested if isinstance(nested, dict) else {}, value.changes)
+
+        else:
+            body[name] = value
+
+    return body
+
+
+class MemoCache:
+    """
+    LRU cache of extraction method results with a time to live.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600):
+        """
+        :param maxsize: Maximum number of results kept
+        :param ttl: Seconds a result is kept for
+        """
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.hits: dict[str, int] = defaultdict(int)
+        self.misses: dict[str, int] = defaultdict(int)
+
+    def run(
+        self,
+        method: str,
+        key: tuple,
+        function: Callable[[dict], dict],
+        body: dict,
+    ) -> dict:
+        """
+        Apply the memoized changes for ``key`` to the body, or run the method
+        and store the changes it makes.
+
+        :param method: name of the extraction method
+        :param key: cache key
+        :param function: runs the extraction method on a body
+        :param body: current body of data
+
+        :return: body post extraction method
+        """
+        with self.lock:
+            changes = self.cache.get(key)
+
+        if changes is not None:
+            self.hits[method] += 1
+            MEMOIZE_LOOKUPS.inc(method=method, result="hit")
+
+            return apply_changes(body, copy.deepcopy(changes))
+
+        self.misses[method] += 1
+        MEMOIZE_LOOKUPS.inc(method=method, result="miss")
+
+        before = snapshot(body)
+        body = function(body)
+
+        with self.lock:
+            self.cache[key] = copy.deepcopy(get_changes(before, body))
+
+        return body
+
+    def stats(self) -> dict:
+        """
+        Hits, misses and hit rate by method.
+        """
+        stats = {}
+
+        for method in set(self.hits) | set(self.misses):
+            hits, misses = self.hits[method], self.misses[method]
+            stats[method] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+
+        return stats
+
+
+class Memoized:
+    """
+    Memoization of a single extraction method of a recipe.
+    """
+
+    def __init__(self, cache: MemoCache, method: str, key: str, scope: tuple):
+        """
+        :param cache: Cache to store results in
+        :param method: Name of the extraction method
+        :param key: Template of the cache key
+        :param scope: Identifies the method's configuration, such as the recipe key and position
+        """
+        self.cache = cache
+        self.method = method
+        self.template = Template(key)
+        self.scope = scope
+
+    def run(self, function: Callable[[dict], dict], body: dict) -> dict:
+        """
+        Run the extraction method through the cache. Bodies missing a value
+        for the key are run without it.
+
+        :param function: runs the extraction method on a body
+        :param body: current body of data
+
+        :return: body post extraction method
+        """
+        try:
+            key = self.template.substitute(body)
+
+        except (KeyError, ValueError):
+            return function(body)
+
+        return self.cache.run(self.method, self.scope + (key,), function, body)
@@ -0,0 +1,459 @@
+# encoding: utf-8
+"""
+Metrics
+-------
+
+Prometheus compatible counters, gauges and histograms with a built-in HTTP
+``/metrics`` endpoint, for watching long running generators.
+
+Metrics are only recorded once the registry has been enabled, which the
+generator does when ``metrics`` is set in its configuration.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape(value: str) -> str:
+    """
+    Escape a label value for the exposition format.
+
+    :param value: label value
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    """
+    Format label names and values for the exposition format.
+
+    :param labelnames: label names
+    :param labelvalues: label values
+    :param extra: extra pre-formatted label
+    """
+    labels = [
+        f'{name}="{escape(str(value))}"' for name, value in zip(labelnames, labelvalues)
+    ]
+
+    if extra:
+        labels.append(extra)
+
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def format_value(value: float) -> str:
+    """
+    Format a sample value for the exposition format.
+
+    :param value: sample value
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base class to define a metric.
+    """
+
+    type: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        """
+        :param name: metric name
+        :param documentation: help text
+        :param labelnames: names of the labels
+        :param registry: registry to add the metric to, defaults to ``REGISTRY``
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry if registry is not None else REGISTRY
+        self.lock = threading.Lock()
+        self.values = {}
+
+        self.registry.register(self)
+
+    def key(self, labels: dict) -> tuple:
+        """
+        Label values in label name order.
+
+        :param labels: label values by name
+        """
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        """
+        Exposition lines for the metric's samples.
+        """
+        with self.lock:
+            values = dict(self.values)
+
+        return [
+            f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}"
+            for key, value in values.items()
+        ]
+
+    def exposition(self) -> str:
+        """
+        The metric in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+        return "\n".join(lines + self.samples())
+
+    def pop_state(self):
+        """
+        Take state recorded since the last call, used to send metrics from
+        worker processes. Only counters and histograms are sent.
+        """
+        return None
+
+    def merge(self, state) -> None:
+        """
+        Merge state taken with ``pop_state``.
+
+        :param state: metric state
+        """
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing counter.
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increment the counter.
+
+        :param amount: amount to increase by
+        :param labels: label values
+        """
+        if not self.registry.enabled:
+            return
+
+        key = self.key(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def pop_state(self) -> dict:
+        with self.lock:
+            values, self.values = self.values, {}
+
+        return values
+
+    def merge(self, state: dict) -> None:
+        with self.lock:
+            for key, value in state.items():
+                self.values[key] = self.values.get(key, 0.0) + value
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down. A ``function`` can be given to read the
+    value when the metric is scraped, it can return a number or a dictionary
+    of label values to numbers.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        registry=None,
+        function: Callable | None = None,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        """
+        Set the gauge.
+
+        :param value: new value
+        :param labels: label values
+        """
+        if not self.registry.enabled:
+            return
+
+        key = self.key(labels)
+
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self) -> list[str]:
+        if self.function is None:
+            return super().samples()
+
+        try:
+            value = self.function()
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.debug("Unable to read gauge %s", self.name, exc_info=True)
+            return []
+
+        values = value if isinstance(value, dict) else {(): value}
+
+        return [
+            f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations in cumulative buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        registry=None,
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record an observation.
+
+        :param value: observed value
+        :param labels: label values
+        """
+        if not self.registry.enabled:
+            return
+
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)
+
+        with self.lock:
+            counts = self.values.get(key)
+
+            if counts is None:
+                # One count per bucket, then +Inf, then the sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            values = {key: list(counts) for key, counts in self.values.items()}
+
+        lines = []
+
+        for key, counts in values.items():
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+        return lines
+
+    def pop_state(self) -> dict:
+        with self.lock:
+            values, self.values = self.values, {}
+
+        return values
+
+    def merge(self, state: dict) -> None:
+        with self.lock:
+            for key, counts in state.items():
+                current = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+
+                for index, count in enumerate(counts):
+                    current[index] += count
+
+
+class Registry:
+    """
+    Collection of metrics.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        """
+        Add a metric to the registry.
+
+        :param metric: metric to add
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+
+        self.metrics[metric.name] = metric
+
+    def exposition(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        return "\n".join(metric.exposition() for metric in self.metrics.values()) + "\n"
+
+    def pop_state(self) -> dict:
+        """
+        Take the counter and histogram state recorded since the last call.
+        """
+        return {
+            name: state
+            for name, metric in self.metrics.items()
+            if (state := metric.pop_state())
+        }
+
+    def merge(self, state: dict) -> None:
+        """
+        Merge state taken with ``pop_state``, for example from a worker process.
+
+        :param state: registry state
+        """
+        for name, metric_state in state.items():
+            if name in self.metrics:
+                self.metrics[name].merge(metric_state)
+
+
+class MetricsServer:
+    """
+    HTTP server exposing a registry on ``/metrics`` from a background thread.
+    """
+
+    def __init__(self, registry: Registry, host: str = "0.0.0.0", port: int = 9100):
+        """
+        :param registry: registry to expose
+        :param host: host to bind to
+        :param port: port to bind to, 0 picks a free port
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        """
+        Request handler class for the registry.
+        """
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            """Serve the registry on /metrics."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = registry.exposition().encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                LOGGER.debug(format, *args)
+
+        return MetricsHandler
+
+    def start(self) -> "MetricsServer":
+        """
+        Start serving in a daemon thread.
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), self.handler())
+        self.port = self.server.server_address[1]
+
+        threading.Thread(
+            target=self.server.serve_forever, name="stac-generator-metrics", daemon=True
+        ).start()
+
+        LOGGER.info("Serving metrics on %s:%s/metrics", self.host, self.port)
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+REGISTRY = Registry()
+
+EVENTS = Counter("stac_generator_events_total", "Events output by status.", ("status",))
+EXTRACTION_SECONDS = Histogram(
+    "stac_generator_extraction_duration_seconds",
+    "Time to look up the recipe and run the extraction methods for an event.",
+)
+OUTPUT_SECONDS = Histogram(
+    "stac_generator_output_duration_seconds", "Time for an output to run.", ("output",)
+)
+OUTPUT_ERRORS = Counter(
+    "stac_generator_output_errors_total", "Errors raised by outputs.", ("output",)
+)
+BULK_BUFFER = Gauge(
+    "stac_generator_bulk_buffer_records", "Records buffered by a bulk output.", ("output",)
+)
+BULK_BUFFER_FILL = Gauge(
+    "stac_generator_bulk_buffer_fill_ratio",
+    "Fraction of a bulk output's buffer in use.",
+    ("output",),
+)
+BULK_FLUSH_SECONDS = Histogram(
+    "stac_generator_bulk_flush_duration_seconds", "Time to flush a bulk output.", ("output",)
+)
+BULK_FLUSH_RECORDS = Counter(
+    "stac_generator_bulk_flushed_records_total", "Records flushed by bulk outputs.", ("output",)
+)
+BULK_CHUNK_SECONDS = Histogram(
+    "stac_generator_bulk_chunk_duration_seconds",
+    "Time to send a chunk of a bulk output flush, including retries.",
+    ("output",),
+)
+BULK_REJECTIONS = Counter(
+    "stac_generator_bulk_rejected_records_total",
+    "Records rejected by a bulk output's destination as overloaded.",
+    ("output",),
+)
+EXECUTOR_OCCUPANCY = Gauge(
+    "stac_generator_executor_occupancy", "Fraction of the executor's capacity in use."
+)
+QUEUE_DEPTH = Gauge(
+    "stac_generator_queue_depth", "Events waiting in each stage queue.", ("queue",)
+)
@@ -6,18 +6,43 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import asyncio
+import logging
+import threading
+import time
 from abc import abstractmethod
+from collections.abc import Callable
+from contextlib import nullcontext
 
 from stac_generator.core.baker import Recipe
+from stac_generator.core.metrics import OUTPUT_ERRORS, OUTPUT_SECONDS
 from stac_generator.core.process_config import SetConfig
+from stac_generator.core.resources import ResourceRegistry
+from stac_generator.core.timings import Timings
 from stac_generator.core.utils import load_plugins
 
+LOGGER = logging.getLogger(__name__)
+
 
 class Output(SetConfig):
     """
     Base class to define an output
+
+    Outputs that can safely export from several threads at once should set
+    ``thread_safe`` otherwise calls to ``export`` are serialised with a lock.
     """
 
+    thread_safe: bool = False
+
+    # Set by the generator to record mapping and export timings
+    timings: Timings = Timings(enabled=False)
+
+    # Set by the generator, resources shared with the rest of the run
+    resources: ResourceRegistry = ResourceRegistry()
+
+    # Set by the generator, sends records to the failed outputs
+    failure_callback: Callable[[dict, str], None] | None = None
+
     def __init__(self, **kwargs):
         """
         Set the kwargs to generate instance attributes of the same name
@@ -30,6 +55,8 @@ class Output(SetConfig):
             else []
         )
 
+        self.export_lock = nullcontext() if self.thread_safe else threading.Lock()
+
         super().__init__(**kwargs)
 
     @abstractmethod
@@ -41,6 +68,25 @@ class Output(SetConfig):
         :param kwargs:
         """
 
+    def map(self, body: dict, recipe: Recipe, **kwargs) -> dict:
+        """
+        Run the configured mappings on a copy of the body.
+
+        :param body: data from processor to be output.
+        :param recipe: recipe used to generate the body
+        :param kwargs:
+
+        :return: mapped body
+        """
+        output_body = body.copy()
+
+        for mapping in self.mappings:
+            start = time.perf_counter()
+            output_body = mapping.run(output_body, recipe, **kwargs)
+            self.timings.add("mapping", type(mapping).__name__, time.perf_counter() - start)
+
+        return output_body
+
     # This allows for bulk outputs
     def run(self, body: dict, recipe: Recipe, **kwargs) -> None:
         """
@@ -49,9 +95,142 @@ class Output(SetConfig):
         :param data: data from processor to be output.
         :param kwargs:
         """
-        output_body = body.copy()
+        name = type(self).__name__
+        run_start = time.perf_counter()
 
-        for mapping in self.mappings:
-            output_body = mapping.run(output_body, recipe, **kwargs)
+        try:
+            output_body = self.map(body, recipe, **kwargs)
+
+            start = time.perf_counter()
+            with self.export_lock:
+                self.export(output_body, **kwargs)
+
+        except Exception:
+            OUTPUT_ERRORS.inc(output=name)
+            raise
+
+        end = time.perf_counter()
+        self.timings.add("export", name, end - start)
+        OUTPUT_SECONDS.observe(end - run_start, output=name)
+
+    def finish(self) -> None:
+        """
+        Complete any exports still in progress. Called by the generator when
+        inputs finish and before checkpoints are saved. Outputs which export
+        in the background should override this.
+        """
+
+    def failed(self, data: dict, error: str) -> None:
+        """
+        Report a record which couldn't be exported. Used by outputs which
+        learn of failures of single records, such as the per-item errors of a
+        bulk request, after ``export`` has returned.
+
+        :param data: record which failed
+        :param error: description of the failure
+        """
+        OUTPUT_ERRORS.inc(output=type(self).__name__)
+
+        if self.failure_callback is None:
+            LOGGER.error("Unable to export %s: %s", data.get("id"), error)
+            return
+
+        self.failure_callback(data, error)
+
+    def export_batch(self, data_list: list[dict], **kwargs) -> None:
+        """
+        Output a batch of data. Outputs which can write several records at
+        once should override this, by default each record is exported in turn.
+
+        :param data_list: list of data from processor to be output.
+        :param kwargs:
+        """
+        for data in data_list:
+            self.export(data, **kwargs)
+
+    def run_batch(self, bodies: list[dict], recipe: Recipe, **kwargs) -> None:
+        """
+        Run the output for a batch of bodies extracted with the same recipe.
+
+        :param bodies: data from processor to be output.
+        :param recipe: recipe used to generate the bodies
+        :param kwargs:
+        """
+        name = type(self).__name__
+        run_start = time.perf_counter()
+
+        try:
+            output_bodies = [self.map(body, recipe, **kwargs) for body in bodies]
+
+            start = time.perf_counter()
+            with self.export_lock:
+                self.export_batch(output_bodies, **kwargs)
+
+        except Exception:
+            OUTPUT_ERRORS.inc(output=name)
+            raise
+
+        end = time.perf_counter()
+        self.timings.add("export", name, end - start)
+        OUTPUT_SECONDS.observe(end - run_start, output=name)
+
+
+class AsyncOutput(Output):
+    """
+    Base class to define an output run on the asyncio event loop
+    """
+
+    @abstractmethod
+    async def export(self, data: dict, **kwargs) -> None:
+        """
+        Output the data.
+
+        :param data: data from processor to be output.
+        :param kwargs:
+        """
+
+    async def run(self, body: dict, recipe: Recipe, **kwargs) -> None:
+        """
+        Run the output.
+
+        :param data: data from processor to be output.
+        :param kwargs:
+        """
+        name = type(self).__name__
+        start = time.perf_counter()
+
+        try:
+            await self.export(self.map(body, recipe, **kwargs), **kwargs)
+
+        except Exception:
+            OUTPUT_ERRORS.inc(output=name)
+            raise
+
+        OUTPUT_SECONDS.observe(time.perf_counter() - start, output=name)
+
+    async def finish(self) -> None:
+        """
+        Complete any exports still in progress.
+        """
+
+
+class SyncOutputAdapter(AsyncOutput):
+    """
+    Run a synchronous output in a thread so it can be used by the
+    asynchronous generator.
+    """
+
+    def __init__(self, output: Output):
+        """
+        :param output: synchronous output plugin to wrap
+        """
+        self.output = output
+
+    async def export(self, data: dict, **kwargs) -> None:
+        await asyncio.to_thread(self.output.export, data, **kwargs)
+
+    async def run(self, body: dict, recipe: Recipe, **kwargs) -> None:
+        await asyncio.to_thread(self.output.run, body, recipe, **kwargs)
 
-        self.export(output_body, **kwargs)
+    async def finish(self) -> None:
+        await asyncio.to_thread(self.output.finish)
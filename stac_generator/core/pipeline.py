@@ -0,0 +1,490 @@
+# encoding: utf-8
+"""
+Pipeline
+--------
+
+Compiled extraction pipelines. A recipe's extraction methods are resolved from
+their entry points once. Methods update their inputs from each event's body so
+they are instantiated per event.
+
+Pipelines can also be run over a batch of events. Extraction methods which
+define ``run_batch`` receive the whole batch, the rest are run per event.
+Recipes supported by the vectorized engine can run whole batches as columns.
+
+Methods a recipe lists under ``memoize`` run once per rendered key, other
+events with the same key reuse the changes they made to the body. With an
+extraction cache the changes made by a recipe's leading methods are kept
+between runs.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import threading
+import time
+import traceback
+
+from extraction_methods.core.extraction_method import (
+    ExtractionMethod,
+    ExtractionMethodConf,
+)
+
+from .baker import Recipe
+from .extraction_cache import ExtractionCache, prefix_hash
+from .memoize import MemoCache, Memoized, apply_changes, get_changes, snapshot
+from .timings import Timings
+from .vectorized import VectorizedRecipe, compile_recipe
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PipelineStep:
+    """
+    A single resolved extraction method.
+    """
+
+    def __init__(
+        self,
+        conf: ExtractionMethodConf,
+        method_class: type[ExtractionMethod],
+        memo: Memoized | None = None,
+        **kwargs,
+    ):
+        """
+        :param conf: Configuration for the extraction method
+        :param method_class: Extraction method class loaded from the entry point
+        :param memo: Cache of the method's results if the recipe memoizes it
+        :param kwargs:
+        """
+        self.conf = conf
+        self.method_class = method_class
+        self.kwargs = kwargs
+        self.memo = memo
+
+    @property
+    def name(self) -> str:
+        """Name of the extraction method"""
+        return self.conf.method
+
+    @property
+    def instance(self) -> ExtractionMethod:
+        """
+        New extraction method instance, as running a method replaces the
+        ``$`` references in its inputs with values from the body.
+        """
+        return self.method_class(self.conf, **self.kwargs)
+
+    def run(self, body: dict) -> dict:
+        """
+        Run the extraction method.
+
+        :param body: The current body of data
+
+        :return: body post extraction method
+        """
+        if self.memo is not None:
+            return self.memo.run(self.instance._run, body)
+
+        return self.instance._run(body)
+
+    @property
+    def batched(self) -> bool:
+        """Whether the extraction method accepts a whole batch of events"""
+        # Memoized methods run per event so each event can hit the cache
+        return self.memo is None and callable(getattr(self.method_class, "run_batch", None))
+
+    def run_batch(self, items: list[tuple[int, dict]]) -> tuple[list, list]:
+        """
+        Run the extraction method over a batch of events. If a batched
+        method raises the batch is re-run per event so only the events that
+        fail are dropped. Methods may return new bodies so each body is
+        paired with the position of its event in the batch.
+
+        :param items: position and current body of each event
+
+        :return: positions and bodies post extraction method and positions and
+            bodies which failed with ``ERROR`` set
+        """
+        if self.batched:
+            try:
+                results = self.instance.run_batch([body for _, body in items])
+                return [(index, body) for (index, _), body in zip(items, results)], []
+
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOGGER.debug("Batch failed for %s, running per event", self.name, exc_info=True)
+
+        results = []
+        failed = []
+
+        for index, body in items:
+            try:
+                results.append((index, self.run(body)))
+
+            except Exception:  # pylint: disable=broad-exception-caught
+                body["ERROR"] = traceback.format_exc()
+                failed.append((index, body))
+
+        return results, failed
+
+
+class CompiledRecipe:
+    """
+    The extraction methods of a recipe resolved and ready to be run.
+    """
+
+    def __init__(
+        self,
+        recipe: Recipe,
+        steps: list[PipelineStep],
+        timings: Timings,
+        vectorized: VectorizedRecipe | None = None,
+        min_batch_size: int = 32,
+        extraction_cache: ExtractionCache | None = None,
+    ):
+        """
+        :param recipe: Recipe the pipeline was built from
+        :param steps: Resolved extraction methods in recipe order
+        :param timings: Timings to record the extraction methods in
+        :param vectorized: Recipe compiled for the vectorized engine
+        :param min_batch_size: Smallest batch run by the vectorized engine
+        :param extraction_cache: Persistent cache of the recipe's leading methods
+        """
+        self.key = recipe.key
+        self.steps = steps
+        self.timings = timings
+        self.vectorized = vectorized
+        self.min_batch_size = min_batch_size
+
+        self.extraction_cache = extraction_cache
+        self.prefix = 0
+        self.prefix_hash = None
+
+        if extraction_cache is not None:
+            self.prefix = extraction_cache.prefix(recipe.extraction_methods)
+            self.prefix_hash = prefix_hash(recipe.extraction_methods[: self.prefix])
+
+    def run_steps(self, body: dict, start: int = 0) -> dict:
+        """
+        Run every extraction method of the recipe without recording timings.
+
+        :param body: initial body for object
+        :param start: index of the first method to run
+
+        :return: body post extraction methods
+        """
+        for step in self.steps[start:]:
+            body = step.run(body)
+
+        return body
+
+    def run_prefix(self, body: dict, fingerprint: str | None) -> tuple[dict, int]:
+        """
+        Apply the cached results of the recipe's leading methods, or run
+        them and store their results.
+
+        :param body: initial body for object
+        :param fingerprint: fingerprint of the source
+
+        :return: body and index of the first method still to run
+        """
+        if not self.prefix or fingerprint is None:
+            return body, 0
+
+        changes = self.extraction_cache.get(body["uri"], fingerprint, self.prefix_hash)
+
+        if changes is not None:
+            return apply_changes(body, changes), self.prefix
+
+        before = snapshot(body)
+        uri = body["uri"]
+
+        for index, step in enumerate(self.steps[: self.prefix]):
+            start = time.perf_counter()
+            body = step.run(body)
+
+            if self.timings.enabled:
+                duration = time.perf_counter() - start
+                self.timings.add("extraction_method", step.name, duration)
+                self.timings.add("recipe_method", f"{self.key}:{index}:{step.name}", duration)
+
+        self.extraction_cache.put(uri, fingerprint, self.prefix_hash, get_changes(before, body))
+
+        return body, self.prefix
+
+    def run(self, body: dict, fingerprint: str | None = None) -> dict:
+        """
+        Run every extraction method of the recipe in series.
+
+        :param body: initial body for object
+        :param fingerprint: fingerprint of the source, needed to use the extraction cache
+
+        :return: body post extraction methods
+        """
+        recipe_start = time.perf_counter()
+        body, first = self.run_prefix(body, fingerprint)
+
+        if not self.timings.enabled:
+            return self.run_steps(body, first)
+
+        start = time.perf_counter()
+
+        for index, step in enumerate(self.steps[first:], first):
+            body = step.run(body)
+
+            end = time.perf_counter()
+            self.timings.add("extraction_method", step.name, end - start)
+            self.timings.add("recipe_method", f"{self.key}:{index}:{step.name}", end - start)
+            start = end
+
+        self.timings.add("recipe", self.key, start - recipe_start)
+
+        return body
+
+    def run_batch(
+        self, bodies: list[dict], fingerprints: list[str | None] | None = None
+    ) -> tuple[list, list]:
+        """
+        Run every extraction method of the recipe over a batch of events.
+        Events which fail a method are dropped from the rest of the batch.
+
+        :param bodies: initial bodies for the objects
+        :param fingerprints: fingerprints of the sources, needed to use the extraction cache
+
+        :return: positions in ``bodies`` and bodies post extraction methods, and
+            positions and bodies which failed with ``ERROR`` set
+        """
+        items = list(enumerate(bodies))
+        failed = []
+        first = 0
+        recipe_start = start = time.perf_counter()
+
+        if self.prefix:
+            # Cached methods run per event so each event's results are stored
+            prefixed = []
+
+            for (index, body), fingerprint in zip(items, fingerprints or [None] * len(bodies)):
+                try:
+                    prefixed.append((index, *self.run_prefix(body, fingerprint)))
+
+                except Exception:  # pylint: disable=broad-exception-caught
+                    body["ERROR"] = traceback.format_exc()
+                    failed.append((index, body))
+
+            # Events without a fingerprint still need the leading methods
+            items = [(index, body) for index, body, cached in prefixed if cached]
+            uncached = [(index, body) for index, body, cached in prefixed if not cached]
+
+            if uncached:
+                for step in self.steps[: self.prefix]:
+                    uncached, step_failed = step.run_batch(uncached)
+                    failed.extend(step_failed)
+
+                items.extend(uncached)
+
+            first = self.prefix
+            start = time.perf_counter()
+
+        elif (
+            self.vectorized is not None
+            and self.vectorized.enabled
+            and len(bodies) >= self.min_batch_size
+        ):
+            results = self.vectorized.run(bodies, self.run_steps)
+
+            if results is not None:
+                if self.timings.enabled:
+                    duration = time.perf_counter() - recipe_start
+                    self.timings.add("extraction_method", "vectorized", duration)
+                    self.timings.add("recipe", self.key, duration)
+
+                return list(enumerate(results)), failed
+
+            start = time.perf_counter()
+
+        for index, step in enumerate(self.steps[first:], first):
+            if not items:
+                break
+
+            items, step_failed = step.run_batch(items)
+            failed.extend(step_failed)
+
+            if self.timings.enabled:
+                end = time.perf_counter()
+                self.timings.add("extraction_method", step.name, end - start)
+                self.timings.add("recipe_method", f"{self.key}:{index}:{step.name}", end - start)
+                start = end
+
+        if self.timings.enabled:
+            self.timings.add("recipe", self.key, time.perf_counter() - recipe_start)
+
+        return items, failed
+
+
+class PipelineCache:
+    """
+    Cache of compiled recipes keyed by ``Recipe.key``.
+
+    Extraction methods are instantiated for every event, as running a method
+    replaces the ``$`` references in its inputs with values from the body.
+    """
+
+    def __init__(
+        self,
+        extraction_methods,
+        timings: Timings | None = None,
+        vectorize: dict | None = None,
+        memoize: MemoCache | None = None,
+        extraction_cache: ExtractionCache | None = None,
+    ):
+        """
+        :param extraction_methods: ``extraction_methods`` entry points
+        :param timings: Timings to record the extraction methods in
+        :param vectorize: Vectorized engine options, ``min_batch_size``,
+            ``validate`` and ``validate_batches``. The engine is off if not given.
+        :param memoize: Cache for the methods recipes memoize
+        :param extraction_cache: Persistent cache of the recipes' leading methods
+        """
+        self.extraction_methods = extraction_methods
+        self.timings = timings or Timings(enabled=False)
+        self.vectorize = vectorize
+        self.memoize = memoize or MemoCache()
+        self.extraction_cache = extraction_cache
+
+        self.method_classes = {}
+        self.pipelines = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.build_time = 0.0
+
+    def load_method_class(self, name: str) -> type[ExtractionMethod]:
+        """
+        Resolve the class for an extraction method, loading the entry point once.
+
+        :param name: Name of the extraction method
+
+        :return: extraction method class
+        """
+        if name not in self.method_classes:
+            self.method_classes[name] = self.extraction_methods[name].load()
+
+        return self.method_classes[name]
+
+    def compile(self, recipe: Recipe, **kwargs) -> CompiledRecipe:
+        """
+        Build the pipeline for a recipe.
+
+        :param recipe: Recipe to compile
+        :param kwargs:
+
+        :return: compiled recipe
+        """
+        steps = []
+        memoize = {memo.method: memo.key for memo in recipe.memoize or []}
+
+        for index, conf in enumerate(recipe.extraction_methods):
+            method_class = self.load_method_class(conf.method)
+            memo = None
+
+            if conf.method in memoize:
+                memo = Memoized(
+                    self.memoize, conf.method, memoize[conf.method], (recipe.key, index)
+                )
+
+            steps.append(PipelineStep(conf, method_class, memo, **kwargs))
+
+        pipeline = CompiledRecipe(
+            recipe, steps, self.timings, extraction_cache=self.extraction_cache
+        )
+
+        # Recipes using the extraction cache run their cached methods per event
+        if self.vectorize is not None and not pipeline.prefix:
+            pipeline.vectorized = compile_recipe(
+                recipe.key,
+                recipe.extraction_methods,
+                self.vectorize.get("validate", 8),
+                self.vectorize.get("validate_batches", 10),
+            )
+            pipeline.min_batch_size = self.vectorize.get("min_batch_size", 32)
+
+        return pipeline
+
+    def get(self, recipe: Recipe, **kwargs) -> CompiledRecipe:
+        """
+        Get the compiled pipeline for a recipe, building it on first use.
+
+        ``kwargs`` are only used when the pipeline is built so should be
+        constant for the lifetime of the cache.
+
+        :param recipe: Recipe to retrieve the pipeline for
+        :param kwargs:
+
+        :return: compiled recipe
+        """
+        with self.lock:
+            pipeline = self.pipelines.get(recipe.key)
+
+            if pipeline is not None:
+                self.hits += 1
+                return pipeline
+
+            start = time.perf_counter()
+            pipeline = self.compile(recipe, **kwargs)
+            self.build_time += time.perf_counter() - start
+
+            self.misses += 1
+            self.pipelines[recipe.key] = pipeline
+
+        return pipeline
+
+    def invalidate(self, key: str | None = None) -> None:
+        """
+        Drop a compiled pipeline, or all of them if no key is given.
+
+        :param key: ``Recipe.key`` of the pipeline to drop
+        """
+        with self.lock:
+            if key is None:
+                self.pipelines.clear()
+
+            else:
+                self.pipelines.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Cache statistics. ``time_saved`` estimates the build time avoided by
+        reusing pipelines, based on the mean build time.
+        """
+        mean_build_time = self.build_time / self.misses if self.misses else 0.0
+
+        stats = {
+            "pipelines": len(self.pipelines),
+            "hits": self.hits,
+            "misses": self.misses,
+            "build_time": self.build_time,
+            "time_saved": self.hits * mean_build_time,
+        }
+
+        if self.vectorize is not None:
+            vectorized = [
+                pipeline.vectorized
+                for pipeline in self.pipelines.values()
+                if pipeline.vectorized is not None
+            ]
+            stats["vectorized"] = {
+                "recipes": len(vectorized),
+                "disabled": sum(not recipe.enabled for recipe in vectorized),
+                "batches": sum(recipe.batches for recipe in vectorized),
+                "events": sum(recipe.events for recipe in vectorized),
+                "fallbacks": sum(recipe.fallbacks for recipe in vectorized),
+            }
+
+        if memoize := self.memoize.stats():
+            stats["memoize"] = memoize
+
+        return stats
@@ -0,0 +1,204 @@
+# encoding: utf-8
+"""
+Profiler
+--------
+
+Low overhead sampling profiler. The stack of every thread is sampled at a
+fixed interval and written in the collapsed stack format read by
+``flamegraph.pl``, speedscope and similar tools.
+
+Samples can be tagged with the generator stage and recipe key the thread is
+working on, which become the root frames of the flamegraph.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+# Stage and recipe key by thread ident, only kept while a tagging profiler runs
+TAGS: dict[int, tuple[str, str | None]] = {}
+TAGGING = False
+
+
+@contextmanager
+def profile_tag(stage: str, recipe: str | None = None) -> Iterator[None]:
+    """
+    Tag samples taken from the current thread with a stage and recipe key.
+
+    :param stage: generator stage
+    :param recipe: recipe key
+    """
+    if not TAGGING:
+        yield
+        return
+
+    ident = threading.get_ident()
+    previous = TAGS.get(ident)
+    TAGS[ident] = (stage, recipe)
+
+    try:
+        yield
+
+    finally:
+        if previous is None:
+            TAGS.pop(ident, None)
+
+        else:
+            TAGS[ident] = previous
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads from a background thread.
+    """
+
+    def __init__(self, path: str | None = None, interval: float = 0.01, tags: bool = True):
+        """
+        :param path: Path to write the collapsed stacks to
+        :param interval: Seconds between samples
+        :param tags: Tag samples with the generator stage and recipe key
+        """
+        self.path = path
+        self.interval = interval
+        self.tags = tags
+
+        self.samples: Counter = Counter()
+        self.labels: dict = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def label(self, code) -> str:
+        """
+        Frame label for a code object.
+
+        :param code: code object of the frame
+        """
+        label = self.labels.get(code)
+
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = self.labels[code] = (
+                f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            )
+
+        return label
+
+    def sample(self) -> None:
+        """
+        Record the current stack of every other thread.
+        """
+        own = threading.get_ident()
+        stacks = []
+
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == own:
+                continue
+
+            stack = []
+
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+
+            if self.tags and (tag := TAGS.get(ident)) is not None:
+                stage, recipe = tag
+                stack.append(f"recipe:{recipe}" if recipe else "recipe:none")
+                stack.append(f"stage:{stage}")
+
+            stacks.append(";".join(reversed(stack)))
+
+        with self.lock:
+            self.samples.update(stacks)
+
+    def loop(self) -> None:
+        """
+        Sample until stopped.
+        """
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "SamplingProfiler":
+        """
+        Start sampling in a daemon thread.
+        """
+        global TAGGING  # pylint: disable=global-statement
+        TAGGING = TAGGING or self.tags
+
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self.loop, name="stac-generator-profiler", daemon=True
+        )
+        self.thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop sampling.
+        """
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def pop_state(self) -> dict:
+        """
+        Take the samples recorded since the last call. Used to send samples
+        from worker processes to the main process.
+        """
+        with self.lock:
+            samples, self.samples = self.samples, Counter()
+
+        return dict(samples)
+
+    def merge(self, state: dict) -> None:
+        """
+        Merge samples taken with ``pop_state``.
+
+        :param state: samples by collapsed stack
+        """
+        with self.lock:
+            self.samples.update(state)
+
+    def collapsed(self, samples: Counter | None = None) -> str:
+        """
+        Samples in the collapsed stack format, one ``frame;frame;... count``
+        line per distinct stack.
+
+        :param samples: copy of the samples to format, the current samples by default
+        """
+        if samples is None:
+            with self.lock:
+                samples = self.samples.copy()
+
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items()))
+
+    def write(self) -> None:
+        """
+        Write the collapsed stacks to the configured path.
+        """
+        if not self.path:
+            return
+
+        # The sampler thread may still be adding samples
+        with self.lock:
+            samples = self.samples.copy()
+
+        with open(self.path, "w", encoding="utf-8") as writer:
+            writer.write(self.collapsed(samples))
+
+        LOGGER.info("Profile of %s samples written to %s", sum(samples.values()), self.path)
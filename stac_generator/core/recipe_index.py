@@ -0,0 +1,174 @@
+# encoding: utf-8
+"""
+Recipe Index
+------------
+
+Longest prefix index of recipe paths. Paths are split into segments under a
+root, which is the scheme and host for remote URIs such as ``gc://a/b/c`` or
+``https://host/bucket`` and ``/`` for absolute local paths, and stored in a
+segment trie. Lookups are memoised per parent directory so sibling files
+resolve with a single dictionary lookup.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import re
+import threading
+
+REMOTE = re.compile(r"^([a-z][a-z0-9]*(?:://|::))([^/]*)(.*)$")
+
+
+def split_location(path: str) -> tuple[str, list[str]]:
+    """
+    Split a path into its root and segments. Empty and ``.`` segments are
+    dropped so repeated and trailing separators don't change the result.
+
+    :param path: local path or remote URI
+
+    :return: root and segments
+    """
+    root = "/" if path.startswith("/") else ""
+
+    if match := REMOTE.match(path):
+        scheme, host, path = match.groups()
+        root = f"{scheme}{host}"
+
+    return root, [segment for segment in path.split("/") if segment and segment != "."]
+
+
+class Node:
+    """
+    Node of the segment trie.
+    """
+
+    __slots__ = ("children", "key")
+
+    def __init__(self):
+        self.children: dict[str, Node] = {}
+        self.key: str | None = None
+
+
+class RecipeIndex:
+    """
+    Index of the recipe key for each recipe path of a recipe type.
+    """
+
+    def __init__(self, memo_size: int = 100_000):
+        """
+        :param memo_size: Maximum number of parent directories memoised
+        """
+        self.roots: dict[str, Node] = {}
+        self.memo: dict[str, tuple[str | None, Node | None]] = {}
+        self.memo_size = memo_size
+        self.lock = threading.Lock()
+
+    def add(self, path: str, key: str) -> None:
+        """
+        Add a recipe path.
+
+        :param path: path the recipe applies to
+        :param key: ``Recipe.key`` of the recipe
+        """
+        root, segments = split_location(path)
+
+        with self.lock:
+            node = self.roots.setdefault(root, Node())
+
+            for segment in segments:
+                node = node.children.setdefault(segment, Node())
+
+            node.key = key
+            self.memo = {}
+
+    def remove(self, path: str, key: str | None = None) -> None:
+        """
+        Remove a recipe path, if ``key`` is given only when it still maps to it.
+
+        :param path: path the recipe applies to
+        :param key: ``Recipe.key`` the path should map to
+        """
+        root, segments = split_location(path)
+
+        with self.lock:
+            node = self.roots.get(root)
+
+            for segment in segments:
+                if node is None:
+                    return
+
+                node = node.children.get(segment)
+
+            if node is not None and (key is None or node.key == key):
+                node.key = None
+                self.memo = {}
+
+    def walk(self, path: str) -> tuple[str | None, Node | None]:
+        """
+        Walk the trie along a path.
+
+        :param path: path to walk
+
+        :return: key of the deepest recipe path on the way and the node at the
+            end of the path, or None if the path leaves the trie
+        """
+        root, segments = split_location(path)
+        node = self.roots.get(root)
+
+        if node is None:
+            return None, None
+
+        best = node.key
+
+        for segment in segments:
+            node = node.children.get(segment)
+
+            if node is None:
+                return best, None
+
+            if node.key is not None:
+                best = node.key
+
+        return best, node
+
+    def find(self, path: str) -> str | None:
+        """
+        Key of the recipe with the longest path containing ``path``.
+
+        :param path: path of the event
+
+        :return: recipe key or None if no recipe applies
+        """
+        parent, separator, name = path.rpartition("/")
+
+        if not separator:
+            return self.walk(path)[0]
+
+        if ("://" in path or "::" in path) and (match := REMOTE.match(path)):
+            if len(parent) < match.end(2):
+                # The separator is part of the scheme, there is no parent to memoise on
+                return self.walk(path)[0]
+
+        memo = self.memo
+        entry = memo.get(parent)
+
+        if entry is None:
+            entry = self.walk(parent)
+
+            if len(memo) >= self.memo_size:
+                memo.clear()
+
+            memo[parent] = entry
+
+        best, node = entry
+
+        if node is not None and name and name != ".":
+            child = node.children.get(name)
+
+            if child is not None and child.key is not None:
+                return child.key
+
+        return best
@@ -0,0 +1,151 @@
+# encoding: utf-8
+"""
+Recipe Watcher
+--------------
+
+Reload recipes while the generator runs. Changes under the recipes root are
+picked up with inotify when ``inotify_simple`` is installed and by polling
+otherwise, then ``Recipes.refresh`` swaps in the new recipes.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import os
+import threading
+from collections.abc import Callable
+
+from .baker import Recipes
+
+try:
+    from inotify_simple import INotify
+    from inotify_simple import flags as inotify_flags
+except ImportError:
+    INotify = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RecipeWatcher:
+    """
+    Refresh recipes from a background thread when their files change.
+    """
+
+    def __init__(
+        self,
+        recipes: Recipes,
+        callback: Callable[[set[str]], None] | None = None,
+        interval: float = 30,
+        debounce: float = 1,
+        inotify: bool = True,
+    ):
+        """
+        :param recipes: Recipes to refresh
+        :param callback: Called with the keys of recipes that no longer exist after a refresh
+        :param interval: Seconds between polls when inotify isn't used
+        :param debounce: Seconds to wait for further changes before refreshing
+        :param inotify: Use inotify if it is available
+        """
+        self.recipes = recipes
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self.inotify = INotify() if inotify and INotify is not None else None
+
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+        self.watched: set[str] = set()
+
+    def watch_directories(self) -> None:
+        """
+        Add an inotify watch for every directory under the recipes root.
+        """
+        mask = (
+            inotify_flags.CREATE
+            | inotify_flags.CLOSE_WRITE
+            | inotify_flags.DELETE
+            | inotify_flags.MOVED_FROM
+            | inotify_flags.MOVED_TO
+        )
+
+        for directory, _, _ in os.walk(self.recipes.root_path):
+            if directory not in self.watched:
+                self.inotify.add_watch(directory, mask)
+                self.watched.add(directory)
+
+    def refresh(self) -> None:
+        """
+        Refresh the recipes and report the keys that no longer exist.
+        """
+        try:
+            stale_keys = self.recipes.refresh()
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.exception("Unable to refresh recipes")
+            return
+
+        if stale_keys and self.callback is not None:
+            self.callback(stale_keys)
+
+    def wait(self) -> bool:
+        """
+        Wait until recipes may have changed.
+
+        :return: False once stopped
+        """
+        if self.inotify is None:
+            return not self.stopped.wait(self.interval)
+
+        while not self.stopped.is_set():
+            # Wake up regularly to check if the watcher has been stopped
+            if self.inotify.read(timeout=1000, read_delay=int(self.debounce * 1000)):
+                self.watch_directories()
+                return True
+
+        return False
+
+    def loop(self) -> None:
+        """
+        Refresh recipes until stopped.
+        """
+        while self.wait():
+            self.refresh()
+
+    def start(self) -> "RecipeWatcher":
+        """
+        Start watching in a daemon thread.
+        """
+        if self.inotify is not None:
+            self.watch_directories()
+
+        LOGGER.info(
+            "Watching recipes in %s with %s",
+            self.recipes.root_path,
+            "inotify" if self.inotify is not None else f"polling every {self.interval}s",
+        )
+
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self.loop, name="stac-generator-recipe-watcher", daemon=True
+        )
+        self.thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop watching.
+        """
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
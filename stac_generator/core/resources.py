@@ -0,0 +1,362 @@
+# encoding: utf-8
+"""
+Resources
+---------
+
+Registry of resources shared by the plugins of a generator, such as boto3
+and Elasticsearch clients, HTTP sessions and opened catalogs. Resources are
+identified by a ``ResourceHandle`` holding their kind and configuration,
+created the first time they are used and closed once they have been unused
+for ``ttl`` seconds.
+
+Handles can be pickled, so events carry them in place of live clients and
+each worker process resolves them from its own registry. The generator
+swaps the handles in an event for their resources while it is extracted.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+
+def boto3_client(
+    service_name: str = "s3", session_kwargs: dict | None = None, **client_kwargs
+) -> Any:
+    """
+    Create a boto3 client.
+
+    :param service_name: AWS service of the client
+    :param session_kwargs: arguments for the boto3 session
+    :param client_kwargs: arguments for the client, such as ``endpoint_url``
+    """
+    # pylint: disable=import-outside-toplevel
+    import boto3
+
+    return boto3.session.Session(**session_kwargs or {}).client(service_name, **client_kwargs)
+
+
+def elasticsearch_client(**client_kwargs) -> Any:
+    """
+    Create an Elasticsearch client.
+
+    :param client_kwargs: arguments for the client
+    """
+    # pylint: disable=import-outside-toplevel
+    from elasticsearch import Elasticsearch
+
+    return Elasticsearch(**client_kwargs)
+
+
+def http_client(limits: dict | None = None, **client_kwargs) -> Any:
+    """
+    Create an httpx client, which pools its connections.
+
+    :param limits: arguments for the client's ``httpx.Limits``
+    :param client_kwargs: arguments for the client, such as ``timeout`` or ``http2``
+    """
+    # pylint: disable=import-outside-toplevel
+    import httpx
+
+    if limits is not None:
+        client_kwargs["limits"] = httpx.Limits(**limits)
+
+    return httpx.Client(**client_kwargs)
+
+
+def intake_esm_catalog(url: str, search_kwargs: dict | None = None, **catalog_kwargs) -> Any:
+    """
+    Open an intake-esm catalog.
+
+    :param url: location of the catalog
+    :param search_kwargs: search to narrow the catalog with
+    :param catalog_kwargs: arguments to open the catalog
+    """
+    # pylint: disable=import-outside-toplevel
+    import intake
+
+    catalog = intake.open_esm_datastore(url, **catalog_kwargs)
+
+    if search_kwargs:
+        catalog = catalog.search(**search_kwargs)
+
+    return catalog
+
+
+FACTORIES: dict[str, Callable[..., Any]] = {
+    "boto3": boto3_client,
+    "elasticsearch": elasticsearch_client,
+    "http": http_client,
+    "intake_esm": intake_esm_catalog,
+}
+
+
+class ResourceHandle:
+    """
+    Serializable reference to a shared resource. Handles with the same kind
+    and configuration refer to the same resource. The configuration is left
+    out of the ``repr`` as it may hold credentials.
+    """
+
+    __slots__ = ("kind", "conf", "key")
+
+    def __init__(self, kind: str, conf: dict | None = None):
+        """
+        :param kind: kind of resource, a key of the registry's factories
+        :param conf: arguments to create the resource with
+        """
+        self.kind = kind
+        self.conf = conf or {}
+
+        digest = hashlib.md5(
+            json.dumps(self.conf, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self.key = f"{kind}:{digest}"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ResourceHandle) and other.key == self.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f"ResourceHandle({self.key!r})"
+
+    def __getstate__(self) -> tuple:
+        return self.kind, self.conf
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+
+class Resource:
+    """
+    Resource held by the registry.
+    """
+
+    __slots__ = ("value", "references", "used", "created")
+
+    def __init__(self):
+        self.value = None
+        self.references = 0
+        self.used = time.monotonic()
+
+        # Resolved once the resource has been created or failed to be
+        self.created: Future = Future()
+
+
+class ResourceRegistry:
+    """
+    Resources created on first use and shared by handle. Each use is
+    reference counted and resources without references are closed once
+    unused for ``ttl`` seconds.
+    """
+
+    # Registry of the generator running in this process, for plugins the
+    # generator doesn't create such as extraction method backends
+    current: "ResourceRegistry | None" = None
+
+    def __init__(self, ttl: float = 300, factories: dict[str, Callable[..., Any]] | None = None):
+        """
+        :param ttl: Seconds an unused resource is kept for
+        :param factories: Factories by kind, in place of or in addition to ``FACTORIES``
+        """
+        self.ttl = ttl
+        self.factories = FACTORIES | (factories or {})
+        self.resources: dict[str, Resource] = {}
+        self.lock = threading.Lock()
+        self.counts = {"created": 0, "reused": 0, "evicted": 0}
+
+    def create(self, handle: ResourceHandle) -> Any:
+        """
+        Create the resource for a handle.
+
+        :param handle: handle of the resource
+
+        :return: resource
+        """
+        LOGGER.debug("Creating resource %s", handle)
+
+        return self.factories[handle.kind](**handle.conf)
+
+    def acquire(self, handle: ResourceHandle) -> Any:
+        """
+        Take a reference to the resource for a handle, creating it if needed.
+        Must be matched by a call to ``release``.
+
+        :param handle: handle of the resource
+
+        :return: resource
+        """
+        self.evict()
+
+        with self.lock:
+            resource = self.resources.get(handle.key)
+            creating = resource is None
+
+            if creating:
+                resource = self.resources[handle.key] = Resource()
+
+            else:
+                self.counts["reused"] += 1
+
+            resource.references += 1
+            resource.used = time.monotonic()
+
+        # Created outside the lock so a slow resource doesn't hold up the
+        # others, acquires of the same handle meanwhile wait for it
+        if creating:
+            try:
+                resource.value = self.create(handle)
+
+            except BaseException as error:
+                with self.lock:
+                    if self.resources.get(handle.key) is resource:
+                        del self.resources[handle.key]
+
+                resource.created.set_exception(error)
+                raise
+
+            with self.lock:
+                self.counts["created"] += 1
+
+            resource.created.set_result(resource.value)
+
+        return resource.created.result()
+
+    def release(self, handle: ResourceHandle) -> None:
+        """
+        Drop a reference taken with ``acquire``.
+
+        :param handle: handle of the resource
+        """
+        with self.lock:
+            resource = self.resources.get(handle.key)
+
+            if resource is not None:
+                resource.references -= 1
+                resource.used = time.monotonic()
+
+    @contextmanager
+    def use(self, handle: Any) -> Iterator[Any]:
+        """
+        Use the resource for a handle. Objects that aren't handles, such as
+        clients passed by older inputs, are used as they are.
+
+        :param handle: handle of the resource
+
+        :return: resource
+        """
+        if not isinstance(handle, ResourceHandle):
+            yield handle
+            return
+
+        resource = self.acquire(handle)
+
+        try:
+            yield resource
+
+        finally:
+            self.release(handle)
+
+    def resolve(self, body: dict) -> list[tuple[Any, ResourceHandle]]:
+        """
+        Replace the handles in a body with their resources, taking a
+        reference to each. Must be matched by a call to ``restore``.
+
+        :param body: event body
+
+        :return: resources acquired and their handles
+        """
+        acquired = []
+
+        for key, value in body.items():
+            if isinstance(value, ResourceHandle):
+                body[key] = self.acquire(value)
+                acquired.append((body[key], value))
+
+        return acquired
+
+    def restore(self, bodies: list[dict], acquired: list[tuple[Any, ResourceHandle]]) -> None:
+        """
+        Put handles back in place of the resources taken with ``resolve``,
+        so the bodies can be pickled, and drop their references.
+
+        :param bodies: event bodies, which may have been replaced by the extraction
+        :param acquired: resources acquired and their handles
+        """
+        if not acquired:
+            return
+
+        handles = {id(resource): handle for resource, handle in acquired}
+
+        for body in bodies:
+            for key, value in body.items():
+                if id(value) in handles:
+                    body[key] = handles[id(value)]
+
+        for _, handle in acquired:
+            self.release(handle)
+
+    def evict(self) -> None:
+        """
+        Close resources without references that have been unused for ``ttl`` seconds.
+        """
+        expired = time.monotonic() - self.ttl
+
+        with self.lock:
+            keys = [
+                key
+                for key, resource in self.resources.items()
+                if resource.references <= 0 and resource.used < expired
+            ]
+            resources = [self.resources.pop(key) for key in keys]
+            self.counts["evicted"] += len(resources)
+
+        for resource in resources:
+            close_resource(resource.value)
+
+    def stats(self) -> dict:
+        """
+        Number of resources held, created, reused and evicted.
+        """
+        return {"resources": len(self.resources)} | self.counts
+
+    def close(self) -> None:
+        """
+        Close every resource.
+        """
+        with self.lock:
+            resources, self.resources = self.resources, {}
+
+        for resource in resources.values():
+            close_resource(resource.value)
+
+
+def close_resource(resource: Any) -> None:
+    """
+    Close a resource if it can be closed.
+
+    :param resource: resource to close
+    """
+    close = getattr(resource, "close", None)
+
+    if callable(close):
+        try:
+            close()
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.debug("Unable to close resource %s", resource, exc_info=True)
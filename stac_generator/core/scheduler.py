@@ -0,0 +1,248 @@
+# encoding: utf-8
+"""
+Input Scheduler
+---------------
+
+Runs several inputs at once, each in its own thread, and interleaves their
+events into the generator's executor.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable
+
+from stac_generator.core.input import Input
+from stac_generator.core.utils import batches
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SchedulerStopped(Exception):
+    """
+    Raised in an input's thread when the scheduler stops because another
+    input failed.
+    """
+
+
+class InputSource:
+    """
+    Buffer of events read from a single input.
+    """
+
+    def __init__(self, input_plugin: Input):
+        """
+        :param input_plugin: Input plugin to read events from
+        """
+        self.input_plugin = input_plugin
+        self.weight = max(input_plugin.weight, 1)
+        self.priority = input_plugin.priority
+
+        self.events = deque()
+        self.finished = False
+        self.error: BaseException | None = None
+
+        # Smooth weighted round robin counter
+        self.current = 0
+
+
+class InputScheduler:
+    """
+    Interleave events from several inputs.
+
+    Every input is run in its own thread and buffers up to ``queue_size``
+    events. Events are taken from the inputs with the highest ``priority``
+    that have events waiting and shared between those inputs in proportion
+    to their ``weight``.
+
+    If an input fails the error is logged, the other inputs are stopped at
+    their next event and ``run`` raises the error once the events already
+    submitted have been handed to the executor.
+    """
+
+    def __init__(self, generator, inputs: list[Input], queue_size: int = 100):
+        """
+        :param generator: Generator to run the events with
+        :param inputs: Input plugins to run
+        :param queue_size: Maximum number of buffered events per input
+        """
+        self.generator = generator
+        self.sources = [InputSource(input_plugin) for input_plugin in inputs]
+        self.queue_size = queue_size
+        self.condition = threading.Condition()
+
+        # Set by the first input to fail
+        self.error: BaseException | None = None
+
+        # Checkpoint of each input after the last event submitted from it
+        self.checkpoints = {}
+
+    def put(
+        self, source: InputSource, body: dict | list[dict], done: Callable[[], None] | None
+    ) -> None:
+        """
+        Buffer an event, or a batch of events, waiting while the input's
+        buffer is full. The input's checkpoint is buffered with it.
+
+        :param source: Source the event was read from
+        :param body: initial body for object or a list of them
+        :param done: called once the event has been output
+        """
+        checkpoint = source.input_plugin.checkpoint
+
+        with self.condition:
+            while len(source.events) >= self.queue_size and self.error is None:
+                self.condition.wait()
+
+            if self.error is not None:
+                raise SchedulerStopped()
+
+            source.events.append((body, done, checkpoint))
+            self.condition.notify_all()
+
+    def process_method(self, source: InputSource) -> Callable:
+        """
+        Callback for a blocking input. Without a ``done`` callback from the
+        input it waits for the event to be output, as the generator would.
+
+        :param source: Source for the blocking input
+        """
+
+        def process(body: dict, done: Callable[[], None] | None = None) -> None:
+            if done is not None:
+                self.put(source, body, done)
+                return
+
+            output = threading.Event()
+            self.put(source, body, output.set)
+
+            while not output.wait(1):
+                if self.error is not None:
+                    raise SchedulerStopped()
+
+        return process
+
+    def backpressure(self, source: InputSource) -> Callable[[], float]:
+        """
+        Occupancy of an input's buffer or the generator, whichever is fuller.
+
+        :param source: Source for the input
+        """
+
+        def occupancy() -> float:
+            return max(len(source.events) / self.queue_size, self.generator.executor.occupancy())
+
+        return occupancy
+
+    def read(self, source: InputSource) -> None:
+        """
+        Run an input, buffering its events. Run in the input's thread.
+
+        :param source: Source for the input
+        """
+        input_plugin = source.input_plugin
+        input_plugin.backpressure = self.backpressure(source)
+
+        try:
+            if input_plugin.blocking:
+                input_plugin.run(self.process_method(source))
+
+            else:
+                events = self.generator.timings.iterate(
+                    "input", type(input_plugin).__name__, input_plugin.run()
+                )
+
+                for body in batches(events, self.generator.conf.get("batch_size", 1)):
+                    self.put(source, body, None)
+
+        except SchedulerStopped:
+            LOGGER.info("Input %s stopped as another input failed", type(input_plugin).__name__)
+
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            LOGGER.error("Input %s failed", type(input_plugin).__name__, exc_info=error)
+            source.error = error
+
+            with self.condition:
+                if self.error is None:
+                    self.error = error
+
+                self.condition.notify_all()
+
+        finally:
+            with self.condition:
+                source.finished = True
+                self.condition.notify_all()
+
+    def select(self, ready: list[InputSource]) -> InputSource:
+        """
+        Pick the next input to take an event from using smooth weighted round
+        robin between the ready inputs with the highest priority.
+
+        :param ready: Sources with buffered events
+        """
+        priority = max(source.priority for source in ready)
+        candidates = [source for source in ready if source.priority == priority]
+
+        for source in candidates:
+            source.current += source.weight
+
+        selected = max(candidates, key=lambda source: source.current)
+        selected.current -= sum(source.weight for source in candidates)
+
+        return selected
+
+    def next_event(self) -> tuple | None:
+        """
+        Wait for the next event from any input.
+
+        :return: source, body, done callback and checkpoint or None once every
+            input has finished or one has failed
+        """
+        with self.condition:
+            while True:
+                if self.error is not None:
+                    return None
+
+                if ready := [source for source in self.sources if source.events]:
+                    source = self.select(ready)
+                    event = source.events.popleft()
+                    self.condition.notify_all()
+                    return source, *event
+
+                if all(source.finished for source in self.sources):
+                    return None
+
+                self.condition.wait()
+
+    def run(self) -> None:
+        """
+        Run all inputs to completion, submitting their events to the
+        generator's executor as they arrive and committing checkpoints if the
+        generator has them.
+        """
+        for source in self.sources:
+            threading.Thread(
+                target=self.read,
+                args=(source,),
+                name=f"stac-generator-input-{type(source.input_plugin).__name__}",
+                daemon=True,
+            ).start()
+
+        checkpoints = self.generator.checkpoints
+
+        while (event := self.next_event()) is not None:
+            source, body, done, checkpoint = event
+            self.generator.submit(body, done)
+            self.checkpoints[source.input_plugin.checkpoint_key] = checkpoint
+
+            if checkpoints is not None and checkpoints.due():
+                checkpoints.commit(self.checkpoints)
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,297 @@
+# encoding: utf-8
+"""
+Timings
+-------
+
+Low overhead timers for each stage of the generator and the end of run
+performance report.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterable, Iterator
+
+LOGGER = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+class Timing:
+    """
+    Count, total and a reservoir sample of the durations recorded for one
+    stage, used to estimate latency percentiles.
+    """
+
+    def __init__(self, reservoir_size: int = 1024):
+        """
+        :param reservoir_size: Maximum number of durations kept for percentiles
+        """
+        self.reservoir_size = reservoir_size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, duration: float) -> None:
+        """
+        Record a duration.
+
+        :param duration: duration in seconds
+        """
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+        if len(self.samples) < self.reservoir_size:
+            self.samples.append(duration)
+
+        elif (index := random.randrange(self.count)) < self.reservoir_size:
+            self.samples[index] = duration
+
+    def merge(self, state: dict) -> None:
+        """
+        Merge the state of another timing, for example from a worker process.
+
+        :param state: state from ``Timing.state``
+        """
+        self.count += state["count"]
+        self.total += state["total"]
+        self.max = max(self.max, state["max"])
+
+        samples = self.samples + state["samples"]
+        if len(samples) > self.reservoir_size:
+            samples = random.sample(samples, self.reservoir_size)
+
+        self.samples = samples
+
+    def state(self) -> dict:
+        """
+        Picklable state of the timing.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "samples": list(self.samples),
+        }
+
+    def percentile(self, percentile: int) -> float:
+        """
+        Nearest rank percentile of the sampled durations.
+
+        :param percentile: percentile between 0 and 100
+        """
+        if not self.samples:
+            return 0.0
+
+        samples = sorted(self.samples)
+        index = max(0, round(percentile / 100 * len(samples)) - 1)
+
+        return samples[min(index, len(samples) - 1)]
+
+    def summary(self) -> dict:
+        """
+        Summary of the timing.
+        """
+        summary = {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = self.percentile(percentile)
+
+        return summary
+
+
+class Timings:
+    """
+    Timings for every stage of the generator keyed by stage and name, for
+    example ``("extraction_method", "regex")`` or ``("export", "ElasticsearchOutput")``.
+
+    Recorded stages:
+
+    - ``input``: time waiting for an input to yield an event
+    - ``recipe_lookup``: ``Recipes.get``
+    - ``extraction_method``: each extraction method by method name
+    - ``recipe``: the full extraction chain by ``Recipe.key``
+    - ``recipe_method``: each extraction method by ``Recipe.key`` and position
+    - ``mapping``: each output mapping
+    - ``export``: each output ``export`` or bulk output ``run``
+    - ``bulk_flush``: each bulk output export of its cache
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        report: str | None = None,
+        reservoir_size: int = 1024,
+        top: int = 20,
+    ):
+        """
+        :param enabled: Record timings
+        :param report: Path to write the report to at the end of the run. A ``.json``
+            suffix writes JSON otherwise a text table is written.
+        :param reservoir_size: Maximum number of durations kept per stage for percentiles
+        :param top: Number of entries in each ranking of the report
+        """
+        self.enabled = enabled
+        self.report_path = report
+        self.reservoir_size = reservoir_size
+        self.top = top
+
+        self.timings: dict[tuple[str, str], Timing] = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage: str, name: str, duration: float) -> None:
+        """
+        Record a duration for a stage.
+
+        :param stage: stage of the generator
+        :param name: name within the stage
+        :param duration: duration in seconds
+        """
+        if not self.enabled:
+            return
+
+        with self.lock:
+            timing = self.timings.get((stage, name))
+
+            if timing is None:
+                timing = self.timings[(stage, name)] = Timing(self.reservoir_size)
+
+            timing.add(duration)
+
+    def iterate(self, stage: str, name: str, iterable: Iterable) -> Iterator:
+        """
+        Iterate, recording the time taken to produce each item.
+
+        :param stage: stage of the generator
+        :param name: name within the stage
+        :param iterable: iterable to time
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+
+        while True:
+            start = time.perf_counter()
+
+            try:
+                item = next(iterator)
+
+            except StopIteration:
+                return
+
+            self.add(stage, name, time.perf_counter() - start)
+            yield item
+
+    def pop_state(self) -> dict:
+        """
+        Take the recorded timings, leaving them empty. Used to send timings
+        from worker processes to the main process.
+        """
+        with self.lock:
+            timings, self.timings = self.timings, {}
+
+        return {key: timing.state() for key, timing in timings.items()}
+
+    def merge(self, state: dict) -> None:
+        """
+        Merge timings taken with ``pop_state``.
+
+        :param state: timings state
+        """
+        with self.lock:
+            for key, timing_state in state.items():
+                timing = self.timings.get(key)
+
+                if timing is None:
+                    timing = self.timings[key] = Timing(self.reservoir_size)
+
+                timing.merge(timing_state)
+
+    def summaries(self, stages: Iterable[str] | None = None) -> list[dict]:
+        """
+        Summaries of the recorded timings, slowest total first.
+
+        :param stages: only include these stages
+        """
+        with self.lock:
+            summaries = [
+                {"stage": key[0], "name": key[1]} | timing.summary()
+                for key, timing in self.timings.items()
+                if stages is None or key[0] in stages
+            ]
+
+        return sorted(summaries, key=lambda summary: summary["total"], reverse=True)
+
+    def report(self, **extra) -> dict:
+        """
+        Performance report ranking the slowest stages and recipes.
+
+        :param extra: extra sections to include in the report
+        """
+        recipe_stages = ("recipe", "recipe_method")
+
+        with self.lock:
+            stages = {key[0] for key in self.timings} - set(recipe_stages)
+
+        return {
+            "stages": self.summaries(stages)[: self.top],
+            "recipes": self.summaries(["recipe"])[: self.top],
+            "recipe_methods": self.summaries(["recipe_method"])[: self.top],
+        } | extra
+
+    @staticmethod
+    def format_table(summaries: list[dict]) -> str:
+        """
+        Format summaries as a text table.
+
+        :param summaries: timing summaries
+        """
+        columns = ["count", "total", "mean", "max"] + [f"p{p}" for p in PERCENTILES]
+        lines = [f"{'stage':<20} {'name':<60} " + " ".join(f"{c:>12}" for c in columns)]
+
+        for summary in summaries:
+            values = [f"{summary['count']:>12}"] + [f"{summary[c]:>12.6f}" for c in columns[1:]]
+            lines.append(f"{summary['stage']:<20} {summary['name']:<60} " + " ".join(values))
+
+        return "\n".join(lines)
+
+    def write_report(self, **extra) -> None:
+        """
+        Write the report to the configured path.
+
+        :param extra: extra sections to include in the report
+        """
+        if not (self.enabled and self.report_path):
+            return
+
+        report = self.report(**extra)
+
+        with open(self.report_path, "w", encoding="utf-8") as writer:
+            if self.report_path.endswith(".json"):
+                json.dump(report, writer, indent=4, default=str)
+                return
+
+            for section in ("stages", "recipes", "recipe_methods"):
+                writer.write(f"{section}\n{self.format_table(report.pop(section))}\n\n")
+
+            for section, value in report.items():
+                writer.write(f"{section}\n{json.dumps(value, indent=4, default=str)}\n\n")
+
+        LOGGER.info("Performance report written to %s", self.report_path)
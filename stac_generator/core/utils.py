@@ -9,6 +9,7 @@ __contact__ = "richard.d.smith@stfc.ac.uk"
 import collections
 import logging
 import re
+from collections.abc import Iterable, Iterator
 from importlib.metadata import entry_points
 
 # Python imports
@@ -100,7 +101,7 @@ class Stats:
             size=s3.get("ContentLength"),
             last_modified=s3.get("LastModified"),
             content_type=s3.get("ContentType"),
-            Etag=s3.get("Etag"),
+            Etag=s3.get("ETag", s3.get("Etag")),
         )
 
 
@@ -231,3 +232,37 @@ def is_remote_uri(path: str) -> bool:
     supported in <=v0.16.2.
     """
     return bool(re.search(r"^[a-z][a-z0-9]*(\://|\:\:)", path))
+
+
+def batches(events: Iterable, size: int) -> Iterator:
+    """
+    Group events from an input into lists of up to ``size``. Lists yielded
+    by the input are passed through as they are. A size of 1 or less yields
+    events unchanged.
+
+    :param events: events or lists of events
+    :param size: maximum number of events in a batch
+    """
+    if size <= 1:
+        yield from events
+        return
+
+    batch = []
+
+    for event in events:
+        if isinstance(event, list):
+            if batch:
+                yield batch
+                batch = []
+
+            yield event
+            continue
+
+        batch.append(event)
+
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
@@ -0,0 +1,536 @@
+# encoding: utf-8
+"""
+Vectorized Recipes
+------------------
+
+Columnar engine for recipes made only of ``default``, ``regex``,
+``string_template``, ``remove`` and ``lambda`` extraction methods. A batch of
+events is turned into columns and each method is applied to a whole column
+at once, using pandas string operations when pandas is installed.
+
+Recipes with any other method, or inputs the engine doesn't understand, are
+left to the per event pipeline. Every event of a recipe's first batches, and
+a sample of each later batch, is also run through the per event pipeline and
+a recipe whose results differ is switched back to it for the rest of the run.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import random
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from string import Formatter
+from typing import Any
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+LOGGER = logging.getLogger(__name__)
+
+# Value of a column for an event without the key
+MISSING = object()
+
+TERM = re.compile(r"\$(\w+)")
+TEMPLATED = re.compile(r"\$\w")
+
+
+class UnsupportedRecipe(Exception):
+    """
+    Raised when a recipe can't be run by the vectorized engine.
+    """
+
+
+class VectorizeError(Exception):
+    """
+    Raised when a batch can't be run by the vectorized engine.
+    """
+
+
+def term(value: Any) -> str | None:
+    """
+    Key referenced by an input of the form ``$key``.
+
+    :param value: input value
+
+    :return: referenced key or None
+    """
+    if isinstance(value, str) and (match := TERM.fullmatch(value)):
+        return match.group(1)
+
+    return None
+
+
+def check_literal(value: Any) -> None:
+    """
+    Check an input doesn't reference the body anywhere.
+
+    :param value: input value
+    """
+    if isinstance(value, str) and TEMPLATED.search(value):
+        raise UnsupportedRecipe(f"Templated input: {value}")
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            check_literal(key)
+            check_literal(item)
+
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            check_literal(item)
+
+
+class Columns:
+    """
+    A batch of bodies as one list of values per key.
+    """
+
+    def __init__(self, bodies: list[dict]):
+        """
+        :param bodies: bodies of the batch
+        """
+        self.length = len(bodies)
+        self.data: dict[str, list] = {}
+
+        for index, body in enumerate(bodies):
+            for key, value in body.items():
+                column = self.data.get(key)
+
+                if column is None:
+                    column = self.data[key] = [MISSING] * self.length
+
+                column[index] = value
+
+    def require(self, key: str) -> list:
+        """
+        Column which every event has a value for.
+
+        :param key: key of the column
+        """
+        column = self.data.get(key)
+
+        if column is None or any(value is MISSING for value in column):
+            raise VectorizeError(f"Missing values for {key}")
+
+        return column
+
+    def column(self, key: str) -> list:
+        """
+        Column for a key, created empty if no event has it.
+
+        :param key: key of the column
+        """
+        if key not in self.data:
+            self.data[key] = [MISSING] * self.length
+
+        return self.data[key]
+
+    def set(self, key: str, values: list) -> None:
+        """
+        Set the value of a key for every event.
+
+        :param key: key of the column
+        :param values: new values
+        """
+        self.data[key] = values
+
+    def remove(self, key: str) -> None:
+        """
+        Remove a key from every event.
+
+        :param key: key of the column
+        """
+        self.data.pop(key, None)
+
+    def rows(self) -> list[dict]:
+        """
+        The batch as bodies.
+        """
+        columns = list(self.data.items())
+
+        return [
+            {key: column[index] for key, column in columns if column[index] is not MISSING}
+            for index in range(self.length)
+        ]
+
+
+class Step(ABC):
+    """
+    Base class for a vectorized extraction method.
+    """
+
+    inputs: frozenset = frozenset()
+
+    def __init__(self, inputs: dict):
+        """
+        :param inputs: inputs of the extraction method
+        """
+        if unknown := set(inputs) - self.inputs:
+            raise UnsupportedRecipe(f"Unsupported inputs: {', '.join(sorted(unknown))}")
+
+    @abstractmethod
+    def run(self, columns: Columns) -> None:
+        """
+        Apply the extraction method to every event of the batch.
+
+        :param columns: batch to update in place
+        """
+
+
+class DefaultStep(Step):
+    """
+    ``default``: set the same values on every event.
+    """
+
+    inputs = frozenset({"defaults"})
+
+    def __init__(self, inputs: dict):
+        super().__init__(inputs)
+        check_literal(inputs.get("defaults", {}))
+        self.defaults = dict(inputs.get("defaults", {}))
+
+    def run(self, columns: Columns) -> None:
+        for key, value in self.defaults.items():
+            columns.set(key, [value] * columns.length)
+
+
+class RegexStep(Step):
+    """
+    ``regex``: add the named groups of a regex searched for in ``input_term``.
+    """
+
+    inputs = frozenset({"regex", "input_term"})
+
+    def __init__(self, inputs: dict):
+        super().__init__(inputs)
+        self.term = term(inputs.get("input_term", "$uri"))
+
+        if self.term is None:
+            raise UnsupportedRecipe("regex input_term must reference a key")
+
+        self.pattern = re.compile(inputs["regex"])
+
+    def run(self, columns: Columns) -> None:
+        source = columns.require(self.term)
+
+        if not all(isinstance(value, str) for value in source):
+            raise VectorizeError(f"Non string values for {self.term}")
+
+        names = list(self.pattern.groupindex)
+
+        if not names:
+            return
+
+        if pandas is not None:
+            series = pandas.Series(source, dtype=object)
+            matched = series.str.contains(self.pattern.pattern, regex=True).tolist()
+            groups = series.str.extract(self.pattern.pattern, expand=True)
+
+            for name in names:
+                column = columns.column(name)
+
+                for index, value in enumerate(groups[name].tolist()):
+                    if matched[index]:
+                        column[index] = value if isinstance(value, str) else None
+
+            return
+
+        search = self.pattern.search
+        columns_by_name = [(name, columns.column(name)) for name in names]
+
+        for index, value in enumerate(source):
+            if (match := search(value)) is not None:
+                for name, column in columns_by_name:
+                    column[index] = match.group(name)
+
+
+class StringTemplateStep(Step):
+    """
+    ``string_template``: format a template with keys of the body.
+    """
+
+    inputs = frozenset({"template", "output_key"})
+
+    def __init__(self, inputs: dict):
+        super().__init__(inputs)
+
+        if "output_key" not in inputs:
+            raise UnsupportedRecipe("string_template without output_key")
+
+        self.template = inputs["template"]
+        self.output_key = inputs["output_key"]
+        self.parts = list(Formatter().parse(self.template))
+        self.names = []
+
+        for _, field, _, _ in self.parts:
+            if field is None:
+                continue
+
+            if not field.isidentifier():
+                raise UnsupportedRecipe(f"Unsupported template field: {field}")
+
+            if field not in self.names:
+                self.names.append(field)
+
+        # Templates of plain fields can be built by concatenating columns
+        self.concatenate = all(
+            not spec and conversion is None for _, _, spec, conversion in self.parts
+        )
+
+    def run(self, columns: Columns) -> None:
+        sources = [columns.require(name) for name in self.names]
+
+        if (
+            pandas is not None
+            and self.concatenate
+            and all(isinstance(value, str) for source in sources for value in source)
+        ):
+            series = {
+                name: pandas.Series(source, dtype=object)
+                for name, source in zip(self.names, sources)
+            }
+            result = pandas.Series([""] * columns.length, dtype=object)
+
+            for literal, field, _, _ in self.parts:
+                if literal:
+                    result = result + literal
+
+                if field is not None:
+                    result = result + series[field]
+
+            columns.set(self.output_key, result.tolist())
+            return
+
+        format_map = self.template.format_map
+        names = self.names
+
+        columns.set(
+            self.output_key,
+            [format_map(dict(zip(names, values))) for values in zip(*sources)]
+            if names
+            else [self.template.format()] * columns.length,
+        )
+
+
+class RemoveStep(Step):
+    """
+    ``remove``: remove keys from the body.
+    """
+
+    inputs = frozenset({"keys"})
+
+    def __init__(self, inputs: dict):
+        super().__init__(inputs)
+        check_literal(inputs.get("keys", []))
+        self.keys = list(inputs.get("keys", []))
+
+    def run(self, columns: Columns) -> None:
+        for key in self.keys:
+            columns.remove(key)
+
+
+class LambdaStep(Step):
+    """
+    ``lambda``: call a function with keys of the body or literal arguments.
+    """
+
+    inputs = frozenset({"function", "args", "kwargs", "output_key"})
+
+    def __init__(self, inputs: dict):
+        super().__init__(inputs)
+
+        if "output_key" not in inputs:
+            raise UnsupportedRecipe("lambda without output_key")
+
+        self.output_key = inputs["output_key"]
+        self.function = eval(inputs["function"])  # pylint: disable=eval-used
+        self.args = [self.argument(value) for value in inputs.get("args", [])]
+        self.kwargs = {key: self.argument(value) for key, value in inputs.get("kwargs", {}).items()}
+
+    @staticmethod
+    def argument(value: Any) -> tuple[str | None, Any]:
+        """
+        Key referenced by an argument or its literal value.
+
+        :param value: argument input
+        """
+        if (key := term(value)) is not None:
+            return key, None
+
+        check_literal(value)
+        return None, value
+
+    @staticmethod
+    def resolve(argument: tuple[str | None, Any], columns: Columns) -> list:
+        """
+        Column of values for an argument.
+
+        :param argument: referenced key and literal value
+        :param columns: batch
+        """
+        key, value = argument
+
+        return columns.require(key) if key is not None else [value] * columns.length
+
+    def run(self, columns: Columns) -> None:
+        function = self.function
+        args = [self.resolve(argument, columns) for argument in self.args]
+        names = list(self.kwargs)
+        kwargs = [self.resolve(argument, columns) for argument in self.kwargs.values()]
+
+        if not args and not kwargs:
+            values = [function() for _ in range(columns.length)]
+
+        else:
+            values = [
+                function(*row[: len(args)], **dict(zip(names, row[len(args) :])))
+                for row in zip(*args, *kwargs)
+            ]
+
+        columns.set(self.output_key, values)
+
+
+STEPS: dict[str, type[Step]] = {
+    "default": DefaultStep,
+    "regex": RegexStep,
+    "string_template": StringTemplateStep,
+    "remove": RemoveStep,
+    "lambda": LambdaStep,
+}
+
+
+class VectorizedRecipe:
+    """
+    A recipe compiled for the vectorized engine.
+    """
+
+    def __init__(
+        self, key: str, steps: list[Step], validate: int = 8, validate_batches: int = 10
+    ):
+        """
+        :param key: ``Recipe.key`` of the recipe
+        :param steps: vectorized extraction methods in recipe order
+        :param validate: number of events per batch checked against the per event pipeline
+        :param validate_batches: number of batches whose every event is checked
+            before only ``validate`` events per batch are
+        """
+        self.key = key
+        self.steps = steps
+        self.validate = validate
+        self.validate_batches = validate_batches
+        self.enabled = True
+
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.events = 0
+        self.fallbacks = 0
+
+    def transform(self, bodies: list[dict]) -> list[dict]:
+        """
+        Run the extraction methods over a batch.
+
+        :param bodies: initial bodies for the objects
+
+        :return: bodies post extraction methods
+        """
+        columns = Columns(bodies)
+
+        for step in self.steps:
+            step.run(columns)
+
+        return columns.rows()
+
+    def run(self, bodies: list[dict], scalar: Callable[[dict], dict]) -> list[dict] | None:
+        """
+        Run a batch, checking it against the per event pipeline. Every event
+        is checked until ``validate_batches`` batches have passed, then a
+        sample of ``validate`` events.
+
+        :param bodies: initial bodies for the objects
+        :param scalar: per event pipeline
+
+        :return: bodies post extraction methods or None if the batch must be
+            run by the per event pipeline
+        """
+        try:
+            results = self.transform(bodies)
+
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.debug("Vectorized batch failed for %s", self.key, exc_info=True)
+
+            with self.lock:
+                self.fallbacks += 1
+
+            return None
+
+        with self.lock:
+            validated = self.batches >= self.validate_batches
+
+        indices = (
+            random.sample(range(len(bodies)), min(self.validate, len(bodies)))
+            if validated
+            else range(len(bodies))
+        )
+
+        for index in indices:
+            try:
+                expected = scalar(dict(bodies[index]))
+
+            except Exception:  # pylint: disable=broad-exception-caught
+                expected = None
+
+            if expected != results[index]:
+                LOGGER.warning(
+                    "Vectorized result for %s differs from the pipeline, disabling for recipe %s",
+                    bodies[index].get("uri"),
+                    self.key,
+                )
+                self.enabled = False
+
+                with self.lock:
+                    self.fallbacks += 1
+
+                return None
+
+        with self.lock:
+            self.batches += 1
+            self.events += len(bodies)
+
+        return results
+
+
+def compile_recipe(
+    key: str, extraction_methods: list, validate: int = 8, validate_batches: int = 10
+) -> VectorizedRecipe | None:
+    """
+    Compile a recipe's extraction methods for the vectorized engine.
+
+    :param key: ``Recipe.key`` of the recipe
+    :param extraction_methods: extraction method configurations of the recipe
+    :param validate: number of events per batch checked against the per event pipeline
+    :param validate_batches: number of batches whose every event is checked
+
+    :return: vectorized recipe or None if the recipe isn't supported
+    """
+    steps = []
+
+    try:
+        for conf in extraction_methods:
+            if conf.method not in STEPS:
+                raise UnsupportedRecipe(f"Unsupported method: {conf.method}")
+
+            steps.append(STEPS[conf.method](dict(conf.inputs or {})))
+
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        LOGGER.debug("Recipe %s not vectorized: %s", key, error)
+        return None
+
+    return VectorizedRecipe(key, steps, validate, validate_batches)
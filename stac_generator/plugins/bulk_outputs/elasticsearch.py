@@ -5,15 +5,20 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import json
 import logging
+import threading
+import time
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 from elasticsearch.helpers import streaming_bulk
 from pydantic import BaseModel, Field
 
 from stac_generator.core.bulk_output import BulkOutput, BulkOutputConf
+from stac_generator.core.metrics import BULK_CHUNK_SECONDS, BULK_REJECTIONS
+from stac_generator.core.resources import ResourceHandle
 from stac_generator.core.utils import load_yaml
-from stac_generator.plugins.bulk_outputs.elasticsearch import Elasticsearch
 
 LOGGER = logging.getLogger(__name__)
 
@@ -44,12 +49,42 @@ class ElasticsearchConf(BulkOutputConf):
         default=60,
         description="Request timeout for search.",
     )
+    thread_count: int = Field(
+        default=1,
+        description="Number of chunks sent at once when the cache is flushed.",
+    )
+    chunk_size: int = Field(
+        default=500,
+        description="Maximum number of documents in a bulk request.",
+    )
+    max_chunk_bytes: int = Field(
+        default=100 * 1024**2,
+        description="Maximum size in bytes of a bulk request.",
+    )
+    max_retries: int = Field(
+        default=3,
+        description="Number of times documents rejected with a 429 are retried.",
+    )
+    initial_backoff: float = Field(
+        default=2,
+        description="Seconds to wait before the first retry, doubled for each further retry.",
+    )
+    max_backoff: float = Field(
+        default=600,
+        description="Maximum seconds to wait before a retry.",
+    )
 
 
 class ElasticsearchBulkOutput(BulkOutput):
     """
     Outputs to elasticsearch.
 
+    The cache is split into chunks of at most ``chunk_size`` documents and
+    ``max_chunk_bytes`` bytes, sent by ``thread_count`` threads at once.
+    Documents rejected because the cluster is overloaded are retried up to
+    ``max_retries`` times with exponential backoff. Documents which still
+    fail are sent to the failed outputs.
+
     **Plugin name:** ``elasticsearch_bulk``
 
     Example Configuration:
@@ -61,22 +96,47 @@ class ElasticsearchBulkOutput(BulkOutput):
                   hosts: ['host1','host2']
                   index:
                     name: 'assets-2021-06-02'
+                thread_count: 4
+                max_chunk_bytes: 10485760
 
     """
 
     config_class = ElasticsearchConf
+    thread_safe = True
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.es = Elasticsearch(**self.conf.client_kwargs)
+        self.es_handle = ResourceHandle("elasticsearch", self.conf.client_kwargs)
+        self._es = None
+        self.es_lock = threading.Lock()
 
-        # Create the index, if it doesn't already exist
-        if mapping := self.conf.index.mapping:
-            if not self.es.indices.exists(self.conf.index.name):
-                if isinstance(mapping, str):
-                    mapping = load_yaml(mapping)
-                self.es.indices.create(self.conf.index.name, body=mapping)
+        self.pool = (
+            ThreadPoolExecutor(self.conf.thread_count, thread_name_prefix="elasticsearch-bulk")
+            if self.conf.thread_count > 1
+            else None
+        )
+
+    @property
+    def es(self):
+        """
+        Elasticsearch client, taken from the generator's resources on first
+        use when the index is created if it doesn't already exist.
+        """
+        if self._es is None:
+            with self.es_lock:
+                if self._es is None:
+                    es = self.resources.acquire(self.es_handle)
+
+                    if mapping := self.conf.index.mapping:
+                        if not es.indices.exists(self.conf.index.name):
+                            if isinstance(mapping, str):
+                                mapping = load_yaml(mapping)
+                            es.indices.create(self.conf.index.name, body=mapping)
+
+                    self._es = es
+
+        return self._es
 
     def action_iterator(self, data_list: list) -> Iterator[dict]:
         """
@@ -96,14 +156,99 @@ class ElasticsearchBulkOutput(BulkOutput):
                 "doc_as_upsert": True,
             }
 
+    def chunks(self, data_list: list) -> Iterator[list]:
+        """
+        Split data into chunks of at most ``chunk_size`` documents and
+        ``max_chunk_bytes`` bytes.
+
+        :param data_list: List of output data
+
+        :returns: chunk of output data
+        """
+        chunk, chunk_bytes = [], 0
+
+        for data in data_list:
+            # The document and an allowance for its action line
+            size = len(json.dumps(data["body"], default=str)) + 100
+
+            if chunk and (
+                len(chunk) >= self.conf.chunk_size
+                or chunk_bytes + size > self.conf.max_chunk_bytes
+            ):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+
+            chunk.append(data)
+            chunk_bytes += size
+
+        if chunk:
+            yield chunk
+
+    def send_chunk(self, data_list: list) -> None:
+        """
+        Send a chunk in a bulk request. Documents rejected with a 429 are
+        retried with exponential backoff, other errors are reported.
+
+        :param data_list: chunk of output data
+        """
+        name = type(self).__name__
+        start = time.perf_counter()
+        records = {data["id"]: data for data in data_list}
+        pending = data_list
+        attempt = 0
+
+        while pending:
+            rejected = []
+
+            for _, info in streaming_bulk(
+                self.es,
+                self.action_iterator(pending),
+                chunk_size=len(pending),
+                max_chunk_bytes=self.conf.max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False,
+                yield_ok=False,
+                request_timeout=self.conf.request_timeout,
+            ):
+                _, result = info.popitem()
+                data = records[result["_id"]]
+
+                if result.get("status") == 429:
+                    rejected.append(data)
+
+                else:
+                    self.failed(data, str(result.get("error")))
+
+            if not rejected:
+                break
+
+            BULK_REJECTIONS.inc(len(rejected), output=name)
+
+            if attempt >= self.conf.max_retries:
+                for data in rejected:
+                    self.failed(data, f"Rejected by Elasticsearch after {attempt} retries")
+                break
+
+            backoff = min(self.conf.max_backoff, self.conf.initial_backoff * 2**attempt)
+            LOGGER.warning(
+                "%s documents rejected by Elasticsearch, retrying in %ss", len(rejected), backoff
+            )
+            time.sleep(backoff)
+
+            pending = rejected
+            attempt += 1
+
+        BULK_CHUNK_SECONDS.observe(time.perf_counter() - start, output=name)
+
     def export(self, data_list: list) -> None:
         """
         Export using elasticsearch bulk helper.
         """
-        for okay, info in streaming_bulk(self.es, self.action_iterator(data_list), yield_ok=False):
-            if not okay:
-                LOGGER.error(
-                    "Unable to index %s: %s",
-                    info["update"]["_id"],
-                    info["update"]["error"],
-                )
+        chunks = list(self.chunks(data_list))
+
+        if self.pool is None or len(chunks) == 1:
+            for chunk in chunks:
+                self.send_chunk(chunk)
+            return
+
+        list(self.pool.map(self.send_chunk, chunks))
@@ -0,0 +1,184 @@
+# encoding: utf-8
+"""
+STAC FastAPI Bulk
+-----------------
+
+Output items to a STAC FastAPI in batches with the bulk items endpoint of
+the Transaction extension.
+
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+import threading
+from collections import defaultdict
+from urllib.parse import urljoin
+
+from httpx import HTTPError, Response
+from pydantic import Field
+
+from stac_generator.core.bulk_output import BulkOutput, BulkOutputConf
+from stac_generator.plugins.outputs.stac_fastapi import (
+    STACFastAPIClientConf,
+    STACFastAPIClientMixin,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class STACFastAPIBulkConf(BulkOutputConf, STACFastAPIClientConf):
+    """STAC FastAPI bulk config model."""
+
+    method: str = Field(
+        default="upsert",
+        description="Bulk items method, ``upsert`` or ``insert``.",
+    )
+
+
+class STACFastAPIBulkOutput(STACFastAPIClientMixin, BulkOutput):
+    """
+    Output items to a STAC FastAPI using the bulk items endpoint of the
+    Transaction extension.
+
+    Buffered items are grouped by ``collection`` and each group is sent in
+    a single request. Collections which don't exist are created the first
+    time they are seen. If a bulk request fails its items are posted one at
+    a time and the items which still fail are sent to the failed outputs.
+
+    Collections should be output with ``stac_fastapi``.
+
+    **Plugin name:** ``stac_fastapi_bulk``
+
+    Example Configuration:
+        .. code-block:: yaml
+
+            - name: stac_fastapi_bulk
+              conf:
+                api_url: https://localhost
+                cache_max_size: 500
+    """
+
+    config_class = STACFastAPIBulkConf
+    thread_safe = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        # Collections known to exist, created at most once each
+        self.collections: set[str] = set()
+        self.collections_lock = threading.Lock()
+
+    def data_to_cache(self, data: dict) -> dict:
+        return {(data["collection"], data["id"]): data}
+
+    def post(self, path: str, data: dict) -> Response:
+        """
+        Post to the API.
+
+        :param path: path relative to the API URL
+        :param data: JSON body of the request
+
+        :return: response
+        """
+        return self.client.post(
+            urljoin(self.conf.api_url, path),
+            json=data,
+            auth=self.auth,
+            headers=self.conf.headers,
+        )
+
+    def create_collection(self, collection: str, data: dict) -> None:
+        """
+        Create a collection for items posted to a collection that doesn't
+        exist, unless it has been created already.
+
+        :param collection: id of the collection
+        :param data: item being posted
+        """
+        with self.collections_lock:
+            if collection in self.collections:
+                return
+
+            self.collections.add(collection)
+
+        response = self.post("collections", self.default_collection(collection, data))
+
+        if response.is_error and response.status_code != 409:
+            LOGGER.warning(
+                "FastAPI Bulk Output unable to create collection %s, status code: %s: %s",
+                collection,
+                response.status_code,
+                response.text,
+            )
+
+    def upsert_item(self, collection: str, data: dict) -> None:
+        """
+        Post a single item, replacing it if it already exists.
+
+        :param collection: id of the collection
+        :param data: item to post
+        """
+        response = self.post(f"collections/{collection}/items", data)
+
+        if response.status_code == 409:
+            response = self.client.put(
+                urljoin(self.conf.api_url, f"collections/{collection}/items/{data['id']}"),
+                json=data,
+                auth=self.auth,
+                headers=self.conf.headers,
+            )
+
+        if response.is_error:
+            self.failed(data, f"Status code: {response.status_code}: {response.text}")
+
+    def bulk_items(self, collection: str, data_list: list[dict]) -> None:
+        """
+        Post the items of a collection in a single request.
+
+        :param collection: id of the collection
+        :param data_list: items of the collection
+        """
+        body = {"items": {data["id"]: data for data in data_list}, "method": self.conf.method}
+        path = f"collections/{collection}/bulk_items"
+
+        response = self.post(path, body)
+
+        if response.status_code == 404 and collection not in self.collections:
+            self.create_collection(collection, data_list[0])
+            response = self.post(path, body)
+
+        if not response.is_error:
+            with self.collections_lock:
+                self.collections.add(collection)
+
+            return
+
+        LOGGER.warning(
+            "FastAPI Bulk Output bulk request for %s items in %s failed with status code: %s, "
+            "posting them separately: %s",
+            len(data_list),
+            collection,
+            response.status_code,
+            response.text,
+        )
+
+        for data in data_list:
+            self.upsert_item(collection, data)
+
+    def export(self, data_list: list) -> None:
+        collections = defaultdict(list)
+
+        for data in data_list:
+            collections[data["collection"]].append(data)
+
+        for collection, items in collections.items():
+            try:
+                self.bulk_items(collection, items)
+
+            except HTTPError as error:
+                for data in items:
+                    self.failed(data, repr(error))
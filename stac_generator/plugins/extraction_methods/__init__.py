@@ -0,0 +1,11 @@
+# encoding: utf-8
+"""
+Extraction method plugins that share resources with the generator, loaded
+by the extraction methods package from its entry point namespaces, such as
+``extraction_methods.assets.backends``.
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
@@ -0,0 +1,65 @@
+# encoding: utf-8
+"""
+Shared Intake ESM Assets Backend
+--------------------------------
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import logging
+from typing import Any, Iterator
+
+from extraction_methods.core.extraction_method import update_input
+from extraction_methods.plugins.assets.backends.intake_esm import IntakeESMAssets
+
+from stac_generator.core.resources import ResourceHandle, ResourceRegistry
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SharedIntakeESMAssets(IntakeESMAssets):
+    """
+    Method: ``intake_esm_shared``
+
+    Description:
+        The ``intake_esm`` assets backend with its catalog taken from the
+        generator's resources, so the catalog is opened once and shared by
+        every item rather than opened again for each of them. Only the
+        search is run per item.
+
+    Configuration Options:
+        As for the ``intake_esm`` assets backend.
+
+    Example Configuration:
+    .. code-block:: yaml
+
+        - method: assets
+          inputs:
+            backend:
+              method: intake_esm_shared
+              inputs:
+                input_term: https://example.com/catalog.json
+                href_term: zarr_path
+    """
+
+    # Used when no generator is running in this process
+    resources = ResourceRegistry()
+
+    @update_input
+    def run(self, body: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        handle = ResourceHandle(
+            "intake_esm", {"url": self.input.input_term} | self.input.datastore_kwargs
+        )
+
+        with (ResourceRegistry.current or self.resources).use(handle) as catalog:
+            if search_kwargs := self.input.search_kwargs:
+                catalog = catalog.search(**search_kwargs)
+
+            for _, row in catalog.df.iterrows():
+                if href := getattr(row, self.input.href_term):
+                    yield {
+                        "href": href,
+                    }
@@ -14,6 +14,12 @@ Inputs are loaded as named entry points with the namespace:
     could configure several to scan multiple directories but the rabbit plugin
     creates a listening connection which would block any other inputs.
 
+    Set ``concurrent_inputs: true`` in the generator configuration to run all
+    inputs at once and interleave their events. Each input can be given a
+    ``weight`` (default 1) to share events between inputs in proportion and a
+    ``priority`` (default 0) so inputs with a higher priority are always
+    served first when they have events waiting.
+
 Example Configuration:
     .. code-block:: yaml
 
@@ -22,6 +28,12 @@ Example Configuration:
             conf:
               path: ../manifests/cmip6.txt
 
+          - name: rabbitmq
+            weight: 4
+            priority: 1
+            conf:
+              ...
+
 """
 __author__ = "Richard Smith"
 __date__ = "08 Jun 2021"
@@ -13,9 +13,7 @@ from pydantic import BaseModel, Field
 
 # Package imports
 from stac_generator.core.input import Input
-
-# Thirdparty imports
-from stac_generator.plugins.bulk_outputs.elasticsearch import Elasticsearch
+from stac_generator.core.resources import ResourceHandle
 
 LOGGER = logging.getLogger(__name__)
 
@@ -65,6 +63,9 @@ class ElasticsearchAggregationInput(Input):
     Preforms an [Elasticsearch Aggregation](https://www.elastic.co/)
     to provide a stream of events for procesing.
 
+    The resume token is the composite ``after_key`` the current page was
+    requested with and the number of buckets read from it.
+
     **Plugin name:** ``elasticsearch``
 
     Example Configuration:
@@ -92,8 +93,6 @@ class ElasticsearchAggregationInput(Input):
         start = datetime.now()
         total_generated = 0
 
-        es_client = Elasticsearch(**self.conf.client_kwargs)
-
         body = {
             "query": self.conf.query,
             "aggs": {
@@ -123,26 +122,41 @@ class ElasticsearchAggregationInput(Input):
                 "terms": {"field": f"{extra_term.key}"},
             }
 
-        while True:
-            result = es_client.search(
-                index=self.index, body=body, request_timeout=self.conf.request_timeout
-            )
+        skip = 0
+
+        if self.resume_token:
+            skip = self.resume_token["offset"]
+
+            if self.resume_token["after"] is not None:
+                body["aggs"]["bucket"]["composite"]["after"] = self.resume_token["after"]
+
+        es_handle = ResourceHandle("elasticsearch", self.conf.client_kwargs)
+
+        with self.resources.use(es_handle) as es_client:
+            while True:
+                result = es_client.search(
+                    index=self.index, body=body, request_timeout=self.conf.request_timeout
+                )
+
+                aggregation = result["aggregations"]["bucket"]
+                after = body["aggs"]["bucket"]["composite"].get("after")
 
-            aggregation = result["aggregations"]["bucket"]
+                for offset, bucket in enumerate(aggregation["buckets"][skip:], skip + 1):
+                    self.checkpoint = {"after": after, "offset": offset}
+                    output = {"uri": bucket["key"]["uri"]}
 
-            for bucket in aggregation["buckets"]:
-                output = {"uri": bucket["key"]["uri"]}
+                    for extra_term in self.conf.extra_terms:
+                        output[extra_term.output_key] = bucket["key"][extra_term.key]
 
-                for extra_term in self.conf.extra_terms:
-                    output[extra_term.output_key] = bucket["key"][extra_term.key]
+                    yield output
+                    total_generated += 1
 
-                yield output
-                total_generated += 1
+                skip = 0
 
-            if "after_key" not in aggregation.keys():
-                break
+                if "after_key" not in aggregation.keys():
+                    break
 
-            body["aggs"]["bucket"]["composite"]["after"] = aggregation["after_key"]
+                body["aggs"]["bucket"]["composite"]["after"] = aggregation["after_key"]
 
         end = datetime.now()
         print(f"Processed {total_generated} elasticsearch records in {end-start}")
@@ -34,6 +34,10 @@ class FileSystemInput(Input):
     """
     Performs an os.walk to provide a stream of messages for procesing.
 
+    Directories and files are walked in name order. The resume token is the
+    last walked directory, relative to ``path``, and the last file yielded
+    from it.
+
     **Plugin name:** ``file_system``
 
     Example Configuration:
@@ -46,14 +50,45 @@ class FileSystemInput(Input):
 
     config_class = FileSystemConf
 
+    def parts(self, directory: str) -> tuple[str, ...]:
+        """
+        Components of a directory relative to the root path, which sort in
+        the order the directories are walked.
+
+        :param directory: walked directory
+        """
+        relative = os.path.relpath(directory, self.conf.path)
+        return () if relative == os.curdir else tuple(relative.split(os.sep))
+
     def run(self):
         total_files = 0
         start = datetime.now()
-        for root, _, files in tqdm(os.walk(self.conf.path, **self.conf.kwargs)):
-            for file in files:
+
+        resume = self.resume_token or {"directory": None, "file": None}
+        last = tuple(resume["directory"]) if resume["directory"] is not None else None
+
+        for root, dirs, files in tqdm(os.walk(self.conf.path, **self.conf.kwargs)):
+            parts = self.parts(root)
+
+            # Walk in a repeatable order, skipping subtrees walked before the resume point
+            dirs.sort()
+            if last is not None:
+                dirs[:] = [
+                    directory
+                    for directory in dirs
+                    if (child := parts + (directory,)) >= last or last[: len(child)] == child
+                ]
+
+            for file in sorted(files):
+                if last is not None and (
+                    parts < last or (parts == last and file <= resume["file"])
+                ):
+                    continue
+
                 filename = os.path.abspath(os.path.join(root, file))
                 logger.debug("Input processing: %s", filename)
 
+                self.checkpoint = {"directory": list(parts), "file": file}
                 yield {"uri": filename}
                 total_files += 1
 
@@ -10,12 +10,12 @@ import logging
 from datetime import datetime
 
 # Thirdparty imports
-import intake
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
 # Package imports
 from stac_generator.core.input import Input
+from stac_generator.core.resources import ResourceHandle
 
 LOGGER = logging.getLogger(__name__)
 
@@ -52,6 +52,8 @@ class IntakeESMInput(Input):
     Uses an `Intake catalog <https://intake.readthedocs.io/>`_
     as a source for events.
 
+    The resume token is the index of the last row read.
+
     **Plugin name:** ``intake_esm``
 
 
@@ -70,27 +72,34 @@ class IntakeESMInput(Input):
         start = datetime.now()
 
         LOGGER.info("Opening catalog %s", self.conf.url)
-        catalog = intake.open_esm_datastore(self.conf.url, **self.conf.catalog_kwargs)
+        catalog_handle = ResourceHandle(
+            "intake_esm",
+            {"url": self.conf.url, "search_kwargs": self.conf.search_kwargs}
+            | self.conf.catalog_kwargs,
+        )
+
+        skip = self.conf.skip
 
-        if self.conf.search_kwargs:
-            LOGGER.info("Searching catalog")
-            catalog = catalog.search(**self.conf.search_kwargs)
+        if self.resume_token:
+            skip = max(skip, self.resume_token["row"])
 
-        LOGGER.info("Found %s items", len(catalog.df))
+        with self.resources.use(catalog_handle) as catalog:
+            LOGGER.info("Found %s items", len(catalog.df))
 
-        count = 0
-        for _, row in catalog.df.iterrows():
-            if count > self.conf.skip:
-                output = {"uri": getattr(row, self.conf.uri_term)}
-                LOGGER.debug("Input processing: %s", output["uri"])
+            count = 0
+            for _, row in catalog.df.iterrows():
+                if count > skip:
+                    self.checkpoint = {"row": count}
+                    output = {"uri": getattr(row, self.conf.uri_term)}
+                    LOGGER.debug("Input processing: %s", output["uri"])
 
-                for extra_term in self.conf.extra_terms:
-                    output[extra_term.output_key] = getattr(row, extra_term.key)
+                    for extra_term in self.conf.extra_terms:
+                        output[extra_term.output_key] = getattr(row, extra_term.key)
 
-                yield output
-                total_files += 1
+                    yield output
+                    total_files += 1
 
-            count += 1
+                count += 1
 
         end = datetime.now()
         print(f"Processed {total_files} files from {self.conf.url} in {end-start}")
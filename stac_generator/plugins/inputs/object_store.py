@@ -12,7 +12,9 @@ import boto3
 from pydantic import BaseModel, Field
 
 # Package imports
+from stac_generator.core.incremental import object_fingerprint
 from stac_generator.core.input import Input
+from stac_generator.core.resources import ResourceHandle
 
 LOGGER = logging.getLogger(__name__)
 
@@ -44,6 +46,15 @@ class ObjectStoreInput(Input):
     Takes an endpoint url and optionally a bucket prefix and delimiter and will
     scan the object store at these points to produce events.
 
+    The resume token is the bucket and key of the last object listed, used as
+    the listing ``Marker`` on restart.
+
+    Events carry a ``client`` handle to a boto3 client for the object store,
+    so they can be sent to worker processes. The generator swaps it for the
+    client from its resources while the event is extracted. The ETag and
+    size from the listing are the event's ``fingerprint``, so incremental
+    runs don't fetch each object's metadata again.
+
     **Plugin name:** ``object_store``
 
     Example Configuration:
@@ -78,16 +89,36 @@ class ObjectStoreInput(Input):
             else s3.buckets.all()
         )
 
+        client = ResourceHandle(
+            "boto3",
+            {
+                "service_name": "s3",
+                "session_kwargs": self.conf.session_kwargs,
+                "endpoint_url": self.conf.url,
+            },
+        )
+
+        resume = self.resume_token
+
         for bucket in buckets:
             total_files = 0
+            filter_kwargs = {"Prefix": self.conf.prefix, "Delimiter": self.conf.delimiter}
+
+            if resume:
+                # Skip buckets listed before the resume point
+                if bucket.name != resume["bucket"]:
+                    continue
+
+                filter_kwargs["Marker"] = resume["marker"]
+                resume = None
 
-            for obj in bucket.objects.filter(
-                Prefix=self.conf.prefix, Delimiter=self.conf.delimiter
-            ):
+            for obj in bucket.objects.filter(**filter_kwargs):
+                self.checkpoint = {"bucket": bucket.name, "marker": obj.key}
 
                 yield {
                     "uri": f"{self.conf.url}/{bucket.name}/{obj.key}",
-                    "client": s3.meta.client,
+                    "client": client,
+                    "fingerprint": object_fingerprint(obj.e_tag, obj.size),
                 }
                 total_files += 1
 
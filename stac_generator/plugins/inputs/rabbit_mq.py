@@ -97,6 +97,10 @@ class RabbitMQConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    prefetch_count: int = Field(
+        default=1,
+        description="Maximum number of unacknowledged messages, scaled down as the generator fills.",
+    )
 
 
 class RabbitMQInput(BlockingInput):
@@ -212,7 +216,8 @@ class RabbitMQInput(BlockingInput):
             exchange_type=self.conf.exchange.type,
             **self.conf.exchange.kwargs,
         )
-        channel.basic_qos(prefetch_count=1)
+        self.prefetch_count = self.conf.prefetch_count
+        channel.basic_qos(prefetch_count=self.prefetch_count)
 
         # Declare queue and bind queue to the dest exchange
         for queue in self.conf.queues:
@@ -287,8 +292,31 @@ class RabbitMQInput(BlockingInput):
 
         LOGGER.info("Input processing: %s message: %s", message[self.conf.uri_term], message)
 
-        self.process_method(output)
-        self.acknowledge_message(ch, method.delivery_tag, connection)
+        # Acknowledge once the message has been output, which may be after this returns
+        self.process_method(
+            output,
+            done=functools.partial(
+                self.acknowledge_message, ch, method.delivery_tag, connection
+            ),
+        )
+        self.apply_backpressure(ch)
+
+    def apply_backpressure(self, channel: pika.channel.Channel) -> None:
+        """
+        Scale the prefetch count with the free capacity of the generator so
+        fewer messages are held while it is busy.
+
+        :param channel: Channel to set the prefetch count on
+        """
+        if self.conf.prefetch_count <= 1 or self.backpressure is None:
+            return
+
+        prefetch_count = max(1, round(self.conf.prefetch_count * (1 - self.backpressure())))
+
+        if prefetch_count != self.prefetch_count:
+            LOGGER.debug("Setting prefetch count: %s", prefetch_count)
+            channel.basic_qos(prefetch_count=prefetch_count)
+            self.prefetch_count = prefetch_count
 
     def run(self, process_method: Callable):
 
@@ -65,6 +65,9 @@ class SolrInput(Input):
     """
     Uses a Solr index node for a source for events.
 
+    The resume token is the ``cursorMark`` of the current page and the number
+    of documents read from it.
+
     **Plugin name:** ``solr``
 
     Example Configuration:
@@ -85,6 +88,12 @@ class SolrInput(Input):
         Core loop to iterate through the Solr response.
         """
         n = 0
+        skip = 0
+
+        if self.resume_token:
+            self.conf.params.cursorMark = self.resume_token["cursorMark"]
+            skip = self.resume_token["offset"]
+
         while True:
             try:
                 resp = requests.get(self.conf.url, self.conf.params.dict())
@@ -96,7 +105,11 @@ class SolrInput(Input):
             docs = resp["response"]["docs"]
 
             # Return the list of files to the for loop and continue paginating
-            yield from docs
+            for offset, doc in enumerate(docs[skip:], skip + 1):
+                self.checkpoint = {"cursorMark": self.conf.params.cursorMark, "offset": offset}
+                yield doc
+
+            skip = 0
 
             n += len(docs)
             LOGGER.info("%s/%s\n", n, resp["response"]["numFound"])
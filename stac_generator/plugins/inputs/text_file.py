@@ -1,13 +1,119 @@
+import bz2
+import gzip
+import io
 import json
+import logging
+import mmap
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
+from functools import partial
 from os import listdir
 from os.path import isdir, isfile, join
+from typing import BinaryIO, NamedTuple
 
 from extraction_methods.core.types import KeyOutputKey
 from pydantic import BaseModel, Field
 
+from stac_generator.core.deduplication import load_deduplicator
 from stac_generator.core.input import Input
 
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOGGER = logging.getLogger(__name__)
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zst")
+
+
+def open_file(path: str) -> BinaryIO:
+    """
+    Open a plain, gzip, bzip2 or zstandard file for reading.
+
+    :param path: path of the file
+
+    :return: binary file object of the decompressed content
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"zstandard must be installed to read {path}")
+
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        )
+
+    return open(path, "rb")
+
+
+class Chunk(NamedTuple):
+    """
+    Range of whole lines from a file. Compressed files are read by the input
+    and the decompressed lines passed as ``data``, plain files are read by
+    the parser from the ``start`` and ``end`` byte offsets.
+    """
+
+    file: str
+    start: int
+    end: int
+    data: bytes | None = None
+
+
+def parse_chunk(chunk: Chunk, uri_term: str, extra_keys: list[str]) -> list[tuple]:
+    """
+    Parse the JSON lines of a chunk. Run in a worker process when the input
+    has more than one worker.
+
+    :param chunk: chunk to parse
+    :param uri_term: attribute to use as uri
+    :param extra_keys: extra attributes to read
+
+    :return: offset after the line, uri and extra values for every line
+    """
+    data = chunk.data
+
+    if data is None:
+        with open(chunk.file, "rb") as reader, mmap.mmap(
+            reader.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            data = mapped[chunk.start : chunk.end]
+
+    records = []
+    offset = chunk.start
+
+    for line in data.splitlines(keepends=True):
+        offset += len(line)
+
+        if not line.strip():
+            continue
+
+        # Try parsing line as JSON, else raise Exception
+        try:
+            record = loads(line)
+        except Exception as exc:
+            raise Exception(
+                f"[ERROR] Cannot load line: '{line.strip()}' from file: {chunk.file} exception: {exc}"
+            )
+
+        records.append((offset, record[uri_term], [record[key] for key in extra_keys]))
+
+    return records
+
 
 class TextFileConf(BaseModel):
     """Text file Config."""
@@ -23,12 +129,53 @@ class TextFileConf(BaseModel):
         default=[],
         description="List of extra attributes.",
     )
+    deduplicate: str = Field(
+        default="exact",
+        description="Deduplication of uris: off, exact (64 bit hashes) or bloom.",
+    )
+    bloom_capacity: int = Field(
+        default=10_000_000,
+        description="Expected number of distinct uris for the bloom filter.",
+    )
+    false_positive_rate: float = Field(
+        default=0.001,
+        description="Bloom filter probability of dropping an unseen uri.",
+    )
+    workers: int = Field(
+        default=1,
+        description="Number of processes parsing chunks in parallel, 1 parses in the input.",
+    )
+    chunk_size: int = Field(
+        default=16 * 1024 * 1024,
+        description="Approximate size of each chunk in bytes.",
+    )
+    ordered: bool = Field(
+        default=True,
+        description="Yield chunks in file order rather than as they are parsed.",
+    )
 
 
 class TextFileInput(Input):
     """
     Reads lines from file/files as a source for events.
 
+    Files in a directory are read in name order. The resume token is the
+    file and byte offset after the last line read. ``.gz``, ``.bz2`` and
+    ``.zst`` files are decompressed as they are read, ``.zst`` needs
+    ``zstandard`` installed. Lines are parsed with ``orjson`` if it is
+    installed.
+
+    Files are split into chunks of whole lines. With more than one of
+    ``workers`` the chunks, including those of the following files, are
+    parsed in parallel processes. Unless ``ordered`` is set chunks are
+    yielded as soon as they are parsed and the resume token only advances
+    past chunks once every chunk before them has been yielded, so a resumed
+    run may repeat some lines.
+
+    Lines are deduplicated on their uri. ``exact`` keeps a 64 bit hash of
+    every uri, ``bloom`` a Bloom filter of fixed size which may drop a small
+    fraction of unseen uris and ``off`` keeps every line.
+
     **Plugin name:** ``text_file``
 
     Example Configuration:
@@ -37,47 +184,157 @@ class TextFileInput(Input):
             - name: text_file
               conf:
                 filepath: /path/to/files
+                workers: 8
+                ordered: false
     """
 
     config_class = TextFileConf
 
-    def run(self):
-
+    def file_list(self) -> list[str]:
+        """
+        Files to read in name order.
+        """
         if isdir(self.conf.path):
-            file_list = [
+            return sorted(
                 join(self.conf.path, file)
                 for file in listdir(self.conf.path)
                 if isfile(join(self.conf.path, file))
-            ]
+            )
+
+        return [self.conf.path]
+
+    def chunks(self, file_list: list[str], resume: dict) -> Iterator[Chunk]:
+        """
+        Split files into chunks of whole lines starting from the resume point.
+
+        :param file_list: files to read
+        :param resume: file and offset to start from
+        """
+        for file in file_list:
+            if file < resume["file"]:
+                continue
+
+            start = resume["offset"] if file == resume["file"] else 0
+
+            if file.endswith(COMPRESSED_SUFFIXES):
+                with open_file(file) as reader:
+                    # Decompressed streams can only be skipped by reading
+                    skipped = 0
+                    while skipped < start and (
+                        block := reader.read(min(self.conf.chunk_size, start - skipped))
+                    ):
+                        skipped += len(block)
+
+                    while block := reader.read(self.conf.chunk_size):
+                        if not block.endswith(b"\n"):
+                            block += reader.readline()
+
+                        yield Chunk(file, start, start + len(block), block)
+                        start += len(block)
+
+            else:
+                size = os.path.getsize(file)
+
+                with open(file, "rb") as reader:
+                    while start < size:
+                        reader.seek(min(start + self.conf.chunk_size, size))
+                        reader.readline()
+                        end = reader.tell()
+
+                        yield Chunk(file, start, end)
+                        start = end
 
-        else:
-            file_list = [self.conf.path]
+    def parse_chunks(self, chunks: Iterable[Chunk]) -> Iterator[tuple[int, Chunk, list]]:
+        """
+        Parse chunks, in parallel if there is more than one worker.
 
+        :param chunks: chunks to parse
+
+        :return: index, chunk and parsed records of each chunk
+        """
+        parse = partial(
+            parse_chunk,
+            uri_term=self.conf.uri_term,
+            extra_keys=[extra_term.key for extra_term in self.conf.extra_terms],
+        )
+
+        if self.conf.workers <= 1:
+            for index, chunk in enumerate(chunks):
+                yield index, chunk, parse(chunk)
+
+            return
+
+        pool = ProcessPoolExecutor(max_workers=self.conf.workers)
+        pending = {}
+        chunks = enumerate(chunks)
+
+        try:
+            while True:
+                # Keep every worker busy with one chunk queued behind it
+                for index, chunk in chunks:
+                    pending[pool.submit(parse, chunk)] = (index, chunk._replace(data=None))
+
+                    if len(pending) >= self.conf.workers * 2:
+                        break
+
+                if not pending:
+                    return
+
+                if self.conf.ordered:
+                    # Chunks are submitted in order so the first pending is the next
+                    future = next(iter(pending))
+
+                else:
+                    future = wait(pending, return_when=FIRST_COMPLETED)[0].pop()
+
+                index, chunk = pending.pop(future)
+                yield index, chunk, future.result()
+
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def run(self):
         start = datetime.now()
         total_generated = 0
-        unique_lines = set()
+        deduplicator = load_deduplicator(
+            self.conf.deduplicate,
+            capacity=self.conf.bloom_capacity,
+            false_positive_rate=self.conf.false_positive_rate,
+        )
 
-        for file in file_list:
-            with (open(file, "r", encoding="utf-8") as f,):
-                for line in f:
-                    if line not in unique_lines:
-                        unique_lines.add(line)
+        resume = self.resume_token or {"file": "", "offset": 0}
+        chunks = self.chunks(self.file_list(), resume)
+
+        # Unordered chunks yielded ahead of the resume point
+        yielded = {}
+        next_index = 0
+
+        for index, chunk, records in self.parse_chunks(chunks):
+            for offset, uri, extras in records:
+                if self.conf.ordered:
+                    self.checkpoint = {"file": chunk.file, "offset": offset}
+
+                if deduplicator.seen(uri):
+                    continue
+
+                output = {"uri": uri}
 
-                        # Try parsing line as JSON, else raise Exception
-                        try:
-                            data = json.loads(line)
-                        except Exception as exc:
-                            raise Exception(
-                                f"[ERROR] Cannot load line: '{line.strip()}' from file: {file} exception: {exc.message}"
-                            )
+                for extra_term, value in zip(self.conf.extra_terms, extras):
+                    output[extra_term.output_key] = value
 
-                        output = {"uri": data[self.conf.uri_term]}
+                yield output
+                total_generated += 1
 
-                        for extra_term in self.conf.extra_terms:
-                            output[extra_term.output_key] = data[extra_term.key]
+            if not self.conf.ordered:
+                yielded[index] = chunk
 
-                        yield output
-                        total_generated += 1
+                while next_index in yielded:
+                    done = yielded.pop(next_index)
+                    self.checkpoint = {"file": done.file, "offset": done.end}
+                    next_index += 1
 
         end = datetime.now()
         print(f"Processed {total_generated} records in {end-start}")
+        LOGGER.info(
+            "Deduplication %s used %s bytes", self.conf.deduplicate, deduplicator.memory()
+        )
@@ -5,11 +5,17 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
+import json
+import threading
+import time
+
+from elasticsearch.helpers import streaming_bulk
 from pydantic import BaseModel, Field
 
+from stac_generator.core.metrics import BULK_FLUSH_RECORDS, BULK_FLUSH_SECONDS
 from stac_generator.core.output import Output
+from stac_generator.core.resources import ResourceHandle
 from stac_generator.core.utils import load_yaml
-from stac_generator.plugins.bulk_outputs.elasticsearch import Elasticsearch
 
 
 class ElasticsearchIndex(BaseModel):
@@ -38,12 +44,30 @@ class ElasticsearchConf(BaseModel):
         default=60,
         description="Request timeout for search.",
     )
+    batch_size: int = Field(
+        default=0,
+        description="Number of updates sent in one bulk request, 0 to send each update in turn.",
+    )
+    batch_bytes: int = Field(
+        default=5 * 1024**2,
+        description="Size in bytes of the updates which triggers a bulk request.",
+    )
+    batch_interval: float = Field(
+        default=1,
+        description="Maximum seconds an update waits before it is sent.",
+    )
 
 
 class ElasticsearchOutput(Output):
     """
     Output generated meta data to elasticsearch.
 
+    With ``batch_size`` set updates are collected and sent with the bulk API
+    once ``batch_size`` updates or ``batch_bytes`` bytes are waiting, or
+    the oldest has waited ``batch_interval`` seconds. Updates still waiting
+    are sent when the generator finishes and documents which fail are sent
+    to the failed outputs.
+
     **Plugin name:** ``elasticsearch``
 
     Example Configuration:
@@ -55,27 +79,182 @@ class ElasticsearchOutput(Output):
                     hosts: ['host1','host2']
                   index:
                     name: 'assets-2021-06-02'
+                  batch_size: 500
     """
 
     config_class = ElasticsearchConf
+    thread_safe = True
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-        self.es = Elasticsearch(**self.conf.client_kwargs)
+        self.es_handle = ResourceHandle("elasticsearch", self.conf.client_kwargs)
+        self._es = None
+        self.es_lock = threading.Lock()
+
+        self.batch: list[dict] = []
+        self.batch_bytes = 0
+        self.batch_started = 0.0
+        self.batch_lock = threading.Lock()
+
+        # Batches taken from ``batch`` which are still being sent
+        self.sending = 0
+        self.sent = threading.Condition(self.batch_lock)
+        self.flusher: threading.Thread | None = None
+
+    @property
+    def es(self):
+        """
+        Elasticsearch client, taken from the generator's resources on first
+        use when the index is created if it doesn't already exist.
+        """
+        if self._es is None:
+            with self.es_lock:
+                if self._es is None:
+                    es = self.resources.acquire(self.es_handle)
+
+                    if mapping := self.conf.index.mapping:
+                        if not es.indices.exists(self.conf.index.name):
+                            if isinstance(mapping, str):
+                                mapping = load_yaml(mapping)
+                            es.indices.create(self.conf.index.name, body=mapping)
+
+                    self._es = es
+
+        return self._es
+
+    def pop_batch(self) -> list[dict]:
+        """
+        Take the waiting updates, which count as being sent until passed to
+        ``send_batch``. Must be called holding ``batch_lock``.
+        """
+        actions, self.batch, self.batch_bytes = self.batch, [], 0
+
+        if actions:
+            self.sending += 1
+
+        return actions
+
+    def bulk(self, actions: list[dict]) -> None:
+        """
+        Send updates with the bulk API, reporting the documents which fail.
+
+        :param actions: bulk update actions
+        """
+        records = {action["_id"]: action["doc"] for action in actions}
+
+        try:
+            for okay, info in streaming_bulk(
+                self.es,
+                actions,
+                chunk_size=len(actions),
+                raise_on_error=False,
+                raise_on_exception=False,
+                yield_ok=False,
+                request_timeout=self.conf.request_timeout,
+            ):
+                if not okay:
+                    _, result = info.popitem()
+                    self.failed(records[result["_id"]], str(result.get("error")))
+
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            for data in records.values():
+                self.failed(data, repr(error))
+
+    def send_batch(self, actions: list[dict]) -> None:
+        """
+        Send updates taken with ``pop_batch`` and record the flush.
 
-        # Create the index, if it doesn't already exist
-        if mapping := self.conf.index.mapping:
-            if not self.es.indices.exists(self.conf.index.name):
-                if isinstance(mapping, str):
-                    mapping = load_yaml(mapping)
-                self.es.indices.create(self.conf.index.name, body=mapping)
+        :param actions: bulk update actions
+        """
+        name = type(self).__name__
+        start = time.perf_counter()
+
+        try:
+            self.bulk(actions)
+
+            duration = time.perf_counter() - start
+            self.timings.add("bulk_flush", name, duration)
+            BULK_FLUSH_SECONDS.observe(duration, output=name)
+            BULK_FLUSH_RECORDS.inc(len(actions), output=name)
+
+        finally:
+            with self.sent:
+                self.sending -= 1
+                self.sent.notify_all()
+
+    def flush_waiting(self) -> None:
+        """
+        Send updates which have waited ``batch_interval`` seconds, run in a
+        daemon thread.
+        """
+        delay = self.conf.batch_interval
+
+        while True:
+            time.sleep(delay)
+
+            with self.batch_lock:
+                age = time.monotonic() - self.batch_started
+
+                if self.batch and age >= self.conf.batch_interval:
+                    actions = self.pop_batch()
+                    delay = self.conf.batch_interval
+
+                else:
+                    actions = None
+                    delay = self.conf.batch_interval - age if self.batch else delay
+
+            if actions:
+                self.send_batch(actions)
 
     def export(self, data: dict, **kwargs) -> None:
+        if not self.conf.batch_size:
+            self.es.update(
+                index=self.conf.index.name,
+                id=data["id"],
+                body={"doc": data, "doc_as_upsert": True},
+                request_timeout=self.conf.request_timeout,
+            )
+            return
+
+        action = {
+            "_op_type": "update",
+            "_index": self.conf.index.name,
+            "_id": data["id"],
+            "doc": data,
+            "doc_as_upsert": True,
+        }
+        size = len(json.dumps(data, default=str))
+
+        with self.batch_lock:
+            if self.flusher is None:
+                self.flusher = threading.Thread(
+                    target=self.flush_waiting, name="elasticsearch-output", daemon=True
+                )
+                self.flusher.start()
+
+            if not self.batch:
+                self.batch_started = time.monotonic()
+
+            self.batch.append(action)
+            self.batch_bytes += size
+
+            if len(self.batch) >= self.conf.batch_size or self.batch_bytes >= self.conf.batch_bytes:
+                actions = self.pop_batch()
+
+            else:
+                actions = None
+
+        if actions:
+            self.send_batch(actions)
+
+    def finish(self) -> None:
+        with self.batch_lock:
+            actions = self.pop_batch()
+
+        if actions:
+            self.send_batch(actions)
 
-        self.es.update(
-            index=self.conf.index.name,
-            id=data["id"],
-            body={"doc": data, "doc_as_upsert": True},
-            request_timeout=self.conf.request_timeout,
-        )
+        # Wait for batches being sent by the background thread or other exports
+        with self.sent:
+            self.sent.wait_for(lambda: not self.sending)
@@ -6,6 +6,9 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from typing import Any, Literal
 from urllib.parse import urljoin
 
@@ -14,6 +17,7 @@ from httpx_auth import OAuth2AuthorizationCodePKCE, OAuth2ClientCredentials
 from pydantic import BaseModel, Field
 
 from stac_generator.core.output import Output
+from stac_generator.core.resources import ResourceHandle
 
 LOGGER = logging.getLogger(__name__)
 
@@ -58,8 +62,8 @@ class AuthorizationCode(AuthenticationFlow):
     )
 
 
-class STACFastAPIConf(BaseModel):
-    """STAC FastAPI config model."""
+class STACFastAPIClientConf(BaseModel):
+    """STAC FastAPI client config model."""
 
     api_url: str = Field(
         description="URL for API.",
@@ -76,12 +80,161 @@ class STACFastAPIConf(BaseModel):
         default=False,
         description="API certificate verifcation.",
     )
+    timeout: float = Field(
+        default=180,
+        description="Seconds to wait for the API.",
+    )
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2, requires the http2 extra.",
+    )
+    max_connections: int = Field(
+        default=100,
+        description="Maximum number of connections to the API.",
+    )
+    max_keepalive_connections: int = Field(
+        default=20,
+        description="Maximum number of idle connections kept open.",
+    )
+    keepalive_expiry: float = Field(
+        default=5,
+        description="Seconds an idle connection is kept open for.",
+    )
+
+
+class STACFastAPIConf(STACFastAPIClientConf):
+    """STAC FastAPI config model."""
+
+    workers: int = Field(
+        default=0,
+        description="Number of requests in flight at once, 0 to send each record before returning.",
+    )
 
 
-class STACFastAPIOutput(Output):
+class STACFastAPIClientMixin:
+    """
+    Pooled client and authentication for outputs to a STAC FastAPI, shared
+    by every request the output makes.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.auth = self.get_auth()
+        self.client_handle = ResourceHandle(
+            "http",
+            {
+                "verify": self.conf.verify,
+                "timeout": self.conf.timeout,
+                "http2": self.conf.http2,
+                "limits": {
+                    "max_connections": self.conf.max_connections,
+                    "max_keepalive_connections": self.conf.max_keepalive_connections,
+                    "keepalive_expiry": self.conf.keepalive_expiry,
+                },
+            },
+        )
+        self._client: Client | None = None
+        self.client_lock = threading.Lock()
+
+    def get_auth(self) -> OAuth2AuthorizationCodePKCE | OAuth2ClientCredentials | None:
+        """
+        Authentication for the API, shared by every request so tokens are reused.
+        """
+        match self.conf.authentication:
+
+            case ClientCredentials():
+                return OAuth2ClientCredentials(
+                    token_url=self.conf.authentication.token_url,
+                    client_id=self.conf.authentication.client_id,
+                    client_secret=self.conf.authentication.client_secret,
+                    **self.conf.authentication.kwargs,
+                )
+
+            case AuthorizationCode():
+                return OAuth2AuthorizationCodePKCE(
+                    authorization_url=self.conf.authentication.authorization_url,
+                    token_url=self.conf.authentication.token_url,
+                    client_id=self.conf.authentication.client_id,
+                    client_secret=self.conf.authentication.client_secret,
+                    **self.conf.authentication.kwargs,
+                )
+
+        return None
+
+    @property
+    def client(self) -> Client:
+        """
+        Pooled client for the API, taken from the generator's resources on first use.
+        """
+        if self._client is None:
+            with self.client_lock:
+                if self._client is None:
+                    self._client = self.resources.acquire(self.client_handle)
+
+        return self._client
+
+    def default_collection(self, collection: str, data: dict) -> dict:
+        """
+        Placeholder collection created for items posted to a collection that
+        doesn't exist yet.
+
+        :param collection: id of the collection
+        :param data: item being posted
+
+        :return: collection record
+        """
+        return {
+            "type": "Collection",
+            "id": collection,
+            "description": collection,
+            "stac_version": "0.1.0",
+            "stac_extensions": [],
+            "license": data.get("license", "other"),
+            "extent": {
+                "spatial": {"bbox": [[-180, -90, 180, 90]]},
+                "temporal": {"interval": [["1992-01-01T00:00:00Z", "2015-12-31T00:00:00Z"]]},
+            },
+            "links": data.get("links", [])
+            + [
+                {
+                    "rel": "self",
+                    "type": "application/geo+json",
+                    "href": f"{self.conf.api_url}/collections/{collection}",
+                },
+                {
+                    "rel": "parent",
+                    "type": "application/json",
+                    "href": f"{self.conf.api_url}/",
+                },
+                {
+                    "rel": "queryables",
+                    "type": "application/json",
+                    "href": f"{self.conf.api_url}/collections/{collection}/queryables",
+                },
+                {
+                    "rel": "items",
+                    "type": "application/geo+json",
+                    "href": f"{self.conf.api_url}/collections/cmip6/{collection}",
+                },
+                {
+                    "rel": "root",
+                    "type": "application/json",
+                    "href": self.conf.api_url,
+                },
+            ],
+        }
+
+
+class STACFastAPIOutput(STACFastAPIClientMixin, Output):
     """
     Output to a STAC FastAPI using the Transaction endpoint extension
 
+    A single pooled client and authentication are shared by every request.
+    With ``workers`` set requests are sent from a pool of threads, export
+    blocks while ``workers`` requests are in flight and records whose
+    request raises are sent to the failed outputs.
+
     **Plugin name:** ``stac_fastapi``
 
     Example Configuration:
@@ -90,9 +243,23 @@ class STACFastAPIOutput(Output):
             - name: stac_fastapi
               conf:
                 api_url: https://localhost
+                http2: true
+                workers: 16
     """
 
     config_class = STACFastAPIConf
+    thread_safe = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.pool = None
+        self.in_flight: set[Future] = set()
+        self.in_flight_changed = threading.Condition()
+
+        if self.conf.workers:
+            self.pool = ThreadPoolExecutor(self.conf.workers, thread_name_prefix="stac-fastapi")
+            self.slots = threading.BoundedSemaphore(self.conf.workers)
 
     def item(
         self,
@@ -115,52 +282,9 @@ class STACFastAPIOutput(Output):
             response_json = response.json()
 
             if response_json["description"] == f"Collection {collection} does not exist":
-                collection_data = {
-                    "type": "Collection",
-                    "id": collection,
-                    "description": collection,
-                    "stac_version": "0.1.0",
-                    "stac_extensions": [],
-                    "license": data.get("license", "other"),
-                    "extent": {
-                        "spatial": {"bbox": [[-180, -90, 180, 90]]},
-                        "temporal": {
-                            "interval": [["1992-01-01T00:00:00Z", "2015-12-31T00:00:00Z"]]
-                        },
-                    },
-                    "links": data.get("links", [])
-                    + [
-                        {
-                            "rel": "self",
-                            "type": "application/geo+json",
-                            "href": f"{self.conf.api_url}/collections/{collection}",
-                        },
-                        {
-                            "rel": "parent",
-                            "type": "application/json",
-                            "href": f"{self.conf.api_url}/",
-                        },
-                        {
-                            "rel": "queryables",
-                            "type": "application/json",
-                            "href": f"{self.conf.api_url}/collections/{collection}/queryables",
-                        },
-                        {
-                            "rel": "items",
-                            "type": "application/geo+json",
-                            "href": f"{self.conf.api_url}/collections/cmip6/{collection}",
-                        },
-                        {
-                            "rel": "root",
-                            "type": "application/json",
-                            "href": self.conf.api_url,
-                        },
-                    ],
-                }
-
                 response = client.post(
                     urljoin(self.conf.api_url, "collections"),
-                    json=collection_data,
+                    json=self.default_collection(collection, data),
                     auth=auth,
                     headers=self.conf.headers,
                 )
@@ -183,17 +307,17 @@ class STACFastAPIOutput(Output):
                     urljoin(self.conf.api_url, f"collections/{collection}/items/{data['id']}"),
                     json=data,
                     auth=auth,
+                    headers=self.conf.headers,
                 )
 
-                if response.is_error:
-                    print(
-                        f"FastAPI Output Item update failed with status code: {response.status_code} and response text: {response.text}",
-                    )
-
-        elif response.is_error:
-            print(
-                f"FastAPI Output failed to post to STAC Fastapi items endpoint returned status code: {response.status_code} and response text: {response.text} request data: {data}",
+        if response.is_error:
+            LOGGER.warning(
+                "FastAPI Output failed to export item %s with status code: %s and response text: %s",
+                data.get("id"),
+                response.status_code,
+                response.text,
             )
+            self.failed(data, f"{response.status_code}: {response.text}")
 
     def collection(self, data: dict, client: Client, auth: OAuth2ClientCredentials | None) -> None:
         response = client.post(urljoin(self.conf.api_url, "collections"), json=data, auth=auth)
@@ -224,34 +348,52 @@ class STACFastAPIOutput(Output):
                 data,
             )
 
-    def export(self, data: dict, **kwargs) -> None:
-        client = Client(
-            verify=self.conf.verify,
-            timeout=180,
-        )
+    def send(self, data: dict, generator_type: str) -> None:
+        """
+        Post a record to the API.
 
-        auth = None
-        match self.conf.authentication:
+        :param data: record to post
+        :param generator_type: ``item`` or ``collection``
+        """
+        if generator_type == "item":
+            self.item(data, self.client, self.auth)
 
-            case ClientCredentials():
-                auth = OAuth2ClientCredentials(
-                    token_url=self.conf.authentication.token_url,
-                    client_id=self.conf.authentication.client_id,
-                    client_secret=self.conf.authentication.client_secret,
-                    **self.conf.authentication.kwargs,
-                )
+        elif generator_type == "collection":
+            self.collection(data, self.client, self.auth)
 
-            case AuthorizationCode():
-                auth = OAuth2AuthorizationCodePKCE(
-                    authorization_url=self.conf.authentication.authorization_url,
-                    token_url=self.conf.authentication.token_url,
-                    client_id=self.conf.authentication.client_id,
-                    client_secret=self.conf.authentication.client_secret,
-                    **self.conf.authentication.kwargs,
-                )
+    def sent(self, data: dict, future: Future) -> None:
+        """
+        Release the slot held by a request sent from the pool and report the
+        record as failed if the request raised.
+
+        :param data: record sent
+        :param future: finished request
+        """
+        self.slots.release()
+
+        try:
+            if (error := future.exception()) is not None:
+                self.failed(data, repr(error))
+
+        finally:
+            with self.in_flight_changed:
+                self.in_flight.discard(future)
+                self.in_flight_changed.notify_all()
+
+    def export(self, data: dict, **kwargs) -> None:
+        if self.pool is None:
+            self.send(data, kwargs["GENERATOR_TYPE"])
+            return
+
+        self.slots.acquire()
+        future = self.pool.submit(self.send, data, kwargs["GENERATOR_TYPE"])
+
+        with self.in_flight_changed:
+            self.in_flight.add(future)
 
-        if kwargs["GENERATOR_TYPE"] == "item":
-            self.item(data, client, auth)
+        future.add_done_callback(partial(self.sent, data))
 
-        elif kwargs["GENERATOR_TYPE"] == "collection":
-            self.collection(data, client, auth)
+    def finish(self) -> None:
+        # Requests are in flight until their failures have been reported
+        with self.in_flight_changed:
+            self.in_flight_changed.wait_for(lambda: not self.in_flight)
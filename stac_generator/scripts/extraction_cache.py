@@ -0,0 +1,84 @@
+# encoding: utf-8
+"""
+Inspect and prune the persistent extraction cache.
+"""
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import time
+
+import click
+
+from stac_generator.core.extraction_cache import ExtractionCache
+
+
+@click.group()
+@click.option(
+    "--path",
+    "-p",
+    "path",
+    default="extraction_cache.db",
+    show_default=True,
+    help="Path of the extraction cache database.",
+)
+@click.pass_context
+def main(ctx, path):
+    ctx.obj = ExtractionCache(path)
+    ctx.call_on_close(ctx.obj.close)
+
+
+@main.command()
+@click.pass_obj
+def info(cache):
+    """Show the number and size of the cached results."""
+    stats = cache.info()
+
+    for name in ("oldest", "newest"):
+        if stats[name] is not None:
+            stats[name] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stats[name]))
+
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+
+
+@main.command()
+@click.option(
+    "--max-size",
+    "max_size",
+    type=int,
+    help="Delete the least recently used results over this many bytes.",
+)
+@click.option(
+    "--older-than",
+    "older_than",
+    type=float,
+    help="Delete results not used for this many days.",
+)
+@click.option(
+    "--all",
+    "clear",
+    is_flag=True,
+    help="Delete every result.",
+)
+@click.pass_obj
+def prune(cache, max_size, older_than, clear):
+    """Delete cached results."""
+    if clear:
+        max_size = 0
+
+    deleted = cache.prune(
+        max_size=max_size,
+        older_than=older_than * 86400 if older_than is not None else None,
+    )
+
+    if deleted:
+        cache.vacuum()
+
+    print(f"Deleted {deleted} results")
+
+
+if __name__ == "__main__":
+    main()
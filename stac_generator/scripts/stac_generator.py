@@ -6,14 +6,12 @@ __copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
 __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
-import cProfile
 import logging
+from importlib.metadata import entry_points
 
 import click
 import yaml
 
-from stac_generator.core.generator import Generator
-
 
 def setup_logging(conf):
     config = conf.get("logging", {})
@@ -35,25 +33,34 @@ def setup_logging(conf):
     "--prof",
     "-p",
     "prof",
-    help="Path for profile output file.",
+    help="Path for collapsed stack profile output file, for flamegraph tools.",
 )
-def main(conf, prof):
-    if prof:
-        if not prof.lower().endswith((".pstats")):
-            prof += ".pstats"
-        profiler = cProfile.Profile()
-        profiler.enable()
-
+@click.option(
+    "--prof-interval",
+    "prof_interval",
+    default=0.01,
+    show_default=True,
+    help="Seconds between profile samples.",
+)
+@click.option(
+    "--prof-tags/--no-prof-tags",
+    "prof_tags",
+    default=True,
+    show_default=True,
+    help="Tag profile samples with the generator stage and recipe key.",
+)
+def main(conf, prof, prof_interval, prof_tags):
     with open(conf, mode="r", encoding="utf-8") as reader:
         conf = yaml.safe_load(reader)
 
-    generator = Generator(conf)
+    if prof:
+        conf["profile"] = {"path": prof, "interval": prof_interval, "tags": prof_tags}
 
-    generator.run()
+    # The engine is loaded from the stac_generator.generator entry points
+    engine = entry_points(group="stac_generator.generator")[conf.get("engine", "generator")]
+    generator = engine.load()(conf)
 
-    if prof:
-        profiler.disable()
-        profiler.dump_stats(prof)
+    generator.run()
 
 
 if __name__ == "__main__":
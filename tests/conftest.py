@@ -0,0 +1,99 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import os
+
+import pytest
+
+from stac_generator.core.generator import Generator
+from stac_generator.core.input import Input
+from stac_generator.core.output import Output
+
+ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_recipes")
+
+# Matches recipe a.yaml
+URI = "/a/b/c/CMIP6.CMIP.MOHC.UKESM1-0-LL/historical.r1i1p1f2.Amon.tas.gn.v20190406"
+
+
+class ListInput(Input):
+    """
+    Yield the events given. The resume token is the index of the next event.
+    """
+
+    def __init__(self, events: list, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+
+    def run(self):
+        for index in range(self.resume_token or 0, len(self.events)):
+            self.checkpoint = index + 1
+            yield self.events[index]
+
+
+class ListOutput(Output):
+    """
+    Keep exported records in a list.
+    """
+
+    thread_safe = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.items = []
+
+    def export(self, data: dict, **kwargs) -> None:
+        self.items.append(data)
+
+
+def attach_output(generator, output, kind: str, client):
+    """
+    Make ``output`` the generator's output, with ``client`` registered as
+    the generator's resource of ``kind``.
+    """
+    generator.resources.factories[kind] = lambda **conf: client
+    generator.outputs = [output]
+
+    output.failure_callback = generator.output_failed
+    output.timings = generator.timings
+    output.resources = generator.resources
+
+    return generator, output
+
+
+@pytest.fixture
+def uri():
+    return URI
+
+
+@pytest.fixture
+def make_generator():
+    """
+    Build generators for the test recipes which output to ``ListOutput``
+    plugins, available as ``generator.outputs[0]`` and
+    ``generator.failed_outputs[0]``.
+    """
+    generators = []
+
+    def make(**conf):
+        generator = Generator({"generator": "item", "recipes_root": ROOT_PATH} | conf)
+        generator.outputs = [ListOutput()]
+        generator.failed_outputs = [ListOutput()]
+        generator.outputs[0].failure_callback = generator.output_failed
+
+        for output in generator.outputs + generator.failed_outputs:
+            output.timings = generator.timings
+            output.resources = generator.resources
+
+        generators.append(generator)
+
+        return generator
+
+    yield make
+
+    for generator in generators:
+        generator.executor.shutdown()
@@ -0,0 +1,95 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import asyncio
+
+import pytest
+from conftest import ROOT_PATH, ListInput, ListOutput
+
+from stac_generator.core.async_generator import (
+    AsyncGenerator,
+    to_async_input,
+    to_async_output,
+)
+from stac_generator.core.executor import SerialExecutor
+from stac_generator.core.input import AsyncBlockingInput
+
+
+def make_async_generator(events, **conf):
+    generator = AsyncGenerator(
+        {"generator": "item", "recipes_root": ROOT_PATH, "concurrency": 4} | conf
+    )
+    generator.inputs = [to_async_input(ListInput(events))]
+    generator.outputs = [to_async_output(ListOutput())]
+    generator.failed_outputs = [to_async_output(ListOutput())]
+
+    return generator
+
+
+def test_async_generator_outputs_events(uri):
+    generator = make_async_generator([{"uri": f"{uri}{index}"} for index in range(10)])
+
+    generator.run()
+
+    items = generator.outputs[0].output.items
+    assert sorted(item["version"] for item in items) == sorted(
+        f"v20190406{index}" for index in range(10)
+    )
+
+
+def test_async_generator_batches(uri):
+    generator = make_async_generator(
+        [[{"uri": f"{uri}{index}"} for index in range(5)], [{"uri": f"{uri}5"}]]
+    )
+
+    generator.run()
+
+    assert len(generator.outputs[0].output.items) == 6
+
+
+def test_async_generator_creates_no_worker_pool():
+    generator = make_async_generator([], executor="process", workers=4)
+
+    assert isinstance(generator.executor, SerialExecutor)
+
+
+def test_async_generator_raises_event_errors(uri):
+    events = [{"uri": f"{uri}{index}"} for index in range(10)]
+    generator = make_async_generator(events[:3] + [{"uri": "/unknown"}] + events[3:])
+
+    # No recipe matches the event, as with the synchronous generator the run fails
+    with pytest.raises(ValueError):
+        generator.run()
+
+
+class GatherInput(AsyncBlockingInput):
+    """
+    Blocking input processing all of its events at once.
+    """
+
+    def __init__(self, events, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+
+    async def run(self, process_method):
+        await asyncio.gather(*(process_method(body) for body in self.events))
+
+
+def test_blocking_inputs_limited_by_concurrency(uri):
+    generator = make_async_generator([], concurrency=2)
+    generator.inputs = [GatherInput([{"uri": f"{uri}{index}"} for index in range(10)])]
+    in_flight = []
+
+    async def aprocess_event(body):
+        in_flight.append(body)
+        assert len(in_flight) <= 2
+        await asyncio.sleep(0.01)
+        in_flight.remove(body)
+
+    generator.aprocess_event = aprocess_event
+    generator.run()
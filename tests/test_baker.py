@@ -7,11 +7,15 @@ __license__ = "BSD - see LICENSE file in top-level package directory"
 __contact__ = "richard.d.smith@stfc.ac.uk"
 
 import os
+import shutil
 from pathlib import Path
 
 import pytest
 
+from stac_generator.core import baker
 from stac_generator.core.baker import Recipes
+from stac_generator.core.memoize import MemoCache, Memoized
+from stac_generator.core.recipe_index import RecipeIndex
 
 ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_recipes")
 
@@ -35,3 +39,156 @@ def test_retrieve_remote_description(recipes):
     recipe = recipes.get("gc://a/b/c/d/e", "item")
 
     assert recipe.paths == [Path("/a/b/c"), Path("gc://a/b/c")]
+
+
+def test_retrieve_longest_prefix(recipes):
+
+    recipe = recipes.get("/a/b/x/y", "item")
+
+    assert recipe.paths == [Path("/a/b"), Path("gc://a/b")]
+
+
+def test_retrieve_sibling_files(recipes):
+
+    first = recipes.get("/a/b/c/d/e1", "item")
+    second = recipes.get("/a/b/c/d/e2", "item")
+
+    assert first is second
+    assert "/a/b/c/d" in recipes.indexes["item"].memo
+
+
+def test_retrieve_scheme_aware(recipes):
+
+    with pytest.raises(ValueError):
+        recipes.get("https://a/b/c", "item")
+
+    with pytest.raises(ValueError):
+        recipes.get("/x/a/b/c", "item")
+
+
+def test_recipe_index():
+
+    index = RecipeIndex()
+    index.add("https://host/bucket", "bucket")
+    index.add("https://host/bucket/prefix", "prefix")
+    index.add("/", "root")
+
+    assert index.find("https://host/bucket/prefix/object") == "prefix"
+    assert index.find("https://host/bucket/other/object") == "bucket"
+    assert index.find("https://other/bucket/object") is None
+    assert index.find("/any/file") == "root"
+
+    index.remove("https://host/bucket/prefix", "prefix")
+
+    assert index.find("https://host/bucket/prefix/object") == "bucket"
+
+
+def test_recipe_cache(tmp_path):
+
+    root = tmp_path / "recipes"
+    shutil.copytree(ROOT_PATH, root)
+    cache = str(tmp_path / "recipes.cache")
+
+    first = Recipes(str(root), cache=cache)
+
+    assert os.path.exists(cache)
+    assert first.pending
+
+    second = Recipes(str(root), cache=cache)
+
+    assert second.entries == first.entries
+    assert second.get("/a/b/c/d/e", "item").paths == [Path("/a/b/c"), Path("gc://a/b/c")]
+
+    recipe_file = root / "a.yaml"
+    recipe_file.write_text(recipe_file.read_text().replace("/a/b/c", "/a/b/d"))
+
+    third = Recipes(str(root), cache=cache)
+
+    assert third.get("/a/b/d/e", "item").paths[0] == Path("/a/b/d")
+
+
+def test_recipes_refresh(tmp_path):
+
+    root = tmp_path / "recipes"
+    shutil.copytree(ROOT_PATH, root)
+
+    recipes = Recipes(str(root))
+    maps = recipes.maps
+    old = recipes.get("/a/b/c/d/e", "item")
+
+    assert recipes.refresh() == set()
+    assert recipes.maps is maps
+
+    recipe_file = root / "a.yaml"
+    recipe_file.write_text(recipe_file.read_text().replace("/a/b/c", "/a/b/d"))
+
+    assert recipes.refresh() == {old.key}
+    assert recipes.get("/a/b/c/d/e", "item").paths == [Path("/a/b"), Path("gc://a/b")]
+    assert recipes.get("/a/b/d/e", "item").paths[0] == Path("/a/b/d")
+
+    # Lookups holding the previous maps are unaffected
+    assert recipes.load_recipe(old.key, "item", maps) is old
+
+    (root / "b.yaml").unlink()
+    recipes.refresh()
+
+    with pytest.raises(ValueError):
+        recipes.get("/a/b/x", "item")
+
+
+def test_recipes_refresh_skips_failed_file(tmp_path, monkeypatch):
+
+    root = tmp_path / "recipes"
+    shutil.copytree(ROOT_PATH, root)
+
+    recipes = Recipes(str(root))
+    old = recipes.get("/a/b/c/d/e", "item")
+
+    parsed = []
+    parse_recipe = baker.parse_recipe
+    monkeypatch.setattr(
+        baker, "parse_recipe", lambda file, stat: parsed.append(file) or parse_recipe(file, stat)
+    )
+
+    recipe_file = root / "a.yaml"
+    text = recipe_file.read_text()
+    recipe_file.write_text("paths: [")
+
+    assert recipes.refresh() == set()
+    assert recipes.refresh() == set()
+    assert parsed == [str(recipe_file)]
+    assert recipes.get("/a/b/c/d/e", "item") is old
+
+    recipe_file.write_text(text.replace("/a/b/c", "/a/b/d"))
+
+    assert recipes.refresh() == {old.key}
+    assert recipes.get("/a/b/d/e", "item").paths[0] == Path("/a/b/d")
+    assert not recipes.failed
+
+
+def test_memoized():
+    runs = []
+
+    def dataset(body):
+        runs.append(body["uri"])
+        body.pop("temporary")
+        body["properties"]["dataset"] = f"{body['source']}.{body['version']}"
+        return body
+
+    cache = MemoCache(maxsize=10, ttl=60)
+    memo = Memoized(cache, "dataset", "$source.$version", ("recipe", 0))
+
+    bodies = [
+        {"uri": f"/a/{index}.nc", "source": "s", "version": "v1", "temporary": 1, "properties": {}}
+        for index in range(3)
+    ]
+    bodies = [memo.run(dataset, body) for body in bodies]
+
+    assert runs == ["/a/0.nc"]
+    assert all(body["properties"] == {"dataset": "s.v1"} for body in bodies)
+    assert all("temporary" not in body for body in bodies)
+    assert bodies[1]["properties"] is not bodies[2]["properties"]
+
+    # Bodies missing a value for the key run the method
+    assert memo.run(lambda body: body | {"ran": True}, {"source": "s"})["ran"]
+    assert cache.stats()["dataset"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
@@ -0,0 +1,114 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+from conftest import ListInput, ListOutput
+from test_incremental import BufferOutput
+
+
+class BatchOutput(ListOutput):
+    """
+    Keep the size of every batch exported, optionally failing each export.
+    """
+
+    def __init__(self, fail: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail = fail
+        self.batches = []
+
+    def export_batch(self, data_list: list[dict], **kwargs) -> None:
+        if self.fail:
+            raise RuntimeError("rejected")
+
+        self.batches.append(len(data_list))
+        super().export_batch(data_list, **kwargs)
+
+
+def test_process_batch_matches_process_event(make_generator, uri):
+    bodies = [{"uri": f"{uri}{index}"} for index in range(5)]
+
+    generator = make_generator()
+    for body in bodies:
+        generator.process_event(dict(body))
+
+    batched = make_generator()
+    batched.outputs = [BatchOutput()]
+    batched.process_batch([dict(body) for body in bodies])
+
+    assert batched.outputs[0].items == generator.outputs[0].items
+    assert batched.outputs[0].batches == [5]
+
+
+def test_failed_batch_sent_to_failed_outputs(make_generator, uri):
+    generator = make_generator()
+    generator.outputs = [BatchOutput(fail=True)]
+
+    generator.process_batch([{"uri": f"{uri}{index}"} for index in range(3)])
+
+    failed = generator.failed_outputs[0].items
+    assert len(failed) == 3
+    assert all("rejected" in body["ERROR"] for body in failed)
+
+
+def test_bulk_output_batch_flushes_when_full(uri):
+    output = BufferOutput()
+    output.conf.cache_max_size = 3
+
+    output.run_batch([{"uri": f"{uri}{index}", "id": index} for index in range(7)])
+
+    assert len(output.items) == 6
+
+    output.clear_cache()
+
+    assert sorted(item["id"] for item in output.items) == list(range(7))
+
+
+def test_run_submits_batches(make_generator, uri):
+    generator = make_generator(batch_size=4)
+    generator.outputs = [BatchOutput()]
+    generator.inputs = [ListInput([{"uri": f"{uri}{index}"} for index in range(10)])]
+
+    generator.run()
+
+    assert generator.outputs[0].batches == [4, 4, 2]
+
+
+def test_incremental_batch_records_vectorized_events(make_generator, uri, tmp_path):
+    generator = make_generator(
+        incremental={"path": str(tmp_path / "state.db")}, vectorize={"min_batch_size": 2}
+    )
+    bodies = [{"uri": f"{uri}{index}", "fingerprint": "f1"} for index in range(4)]
+
+    generator.process_batch([dict(body) for body in bodies])
+    generator.finished()
+
+    assert generator.pipelines.get(generator.recipes.get(uri, "item")).vectorized.batches == 1
+
+    # The vectorized engine returns new bodies, each is still recorded as output
+    results = generator.extract_batch([dict(body) for body in bodies])
+
+    assert all(result.unchanged for result in results)
+
+
+def test_batch_keeps_uris_of_cached_extractions(make_generator, uri, tmp_path):
+    generator = make_generator(
+        extraction_cache={"path": str(tmp_path / "cache.db"), "methods": ["regex"]}
+    )
+    bodies = [{"uri": f"{uri}{index}", "fingerprint": "f1"} for index in range(4)]
+
+    generator.extract_batch([dict(body) for body in bodies])
+    results = generator.extract_batch([dict(body) for body in reversed(bodies)])
+
+    assert generator.extraction_cache.stats()["hits"] == 4
+    assert [(result.uri, result.fingerprint) for result in results] == [
+        (body["uri"], "f1") for body in reversed(bodies)
+    ]
+    assert [result.body["version"] for result in results] == [
+        f"v20190406{index}" for index in reversed(range(4))
+    ]
+
+    generator.extraction_cache.close()
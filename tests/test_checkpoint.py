@@ -0,0 +1,107 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import pytest
+from conftest import ListInput
+
+from stac_generator.core.checkpoint import CHECKPOINT_STORES
+
+
+class BrokenListInput(ListInput):
+    """
+    Yield the events given then fail, as if the run was killed.
+    """
+
+    def run(self):
+        yield from super().run()
+        raise RuntimeError("killed")
+
+
+def events(uri, name, count):
+    return [{"uri": f"{uri}{name}{index}"} for index in range(count)]
+
+
+def versions(generator):
+    return [item["version"] for item in generator.outputs[0].items]
+
+
+@pytest.mark.parametrize("store", ["file", "sqlite"])
+def test_store_saves_tokens(tmp_path, store):
+    path = str(tmp_path / "checkpoints")
+    checkpoints = CHECKPOINT_STORES[store](path)
+
+    checkpoints.save({"a": 1, "b": {"offset": 10}})
+    checkpoints.save({"a": 2})
+    checkpoints.close()
+
+    checkpoints = CHECKPOINT_STORES[store](path)
+
+    assert checkpoints.load("a") == 2
+    assert checkpoints.load("b") == {"offset": 10}
+    assert checkpoints.load("c") is None
+
+
+@pytest.mark.parametrize("store", ["file", "sqlite"])
+@pytest.mark.parametrize("concurrent_inputs", [False, True])
+def test_inputs_resume_from_their_checkpoints(
+    make_generator, uri, tmp_path, store, concurrent_inputs
+):
+    conf = {
+        "checkpoint": {"store": store, "path": str(tmp_path / "checkpoints")},
+        "concurrent_inputs": concurrent_inputs,
+    }
+
+    generator = make_generator(**conf)
+    generator.inputs = [ListInput(events(uri, "a", 3)), ListInput(events(uri, "b", 2))]
+    generator.run()
+
+    assert len(generator.outputs[0].items) == 5
+
+    # Each input continues after the last event it yielded
+    generator = make_generator(**conf)
+    generator.inputs = [ListInput(events(uri, "a", 5)), ListInput(events(uri, "b", 3))]
+    generator.run()
+
+    assert sorted(versions(generator)) == ["v20190406a3", "v20190406a4", "v20190406b2"]
+
+
+def test_checkpoint_key_configured(make_generator, uri, tmp_path):
+    conf = {"checkpoint": {"path": str(tmp_path / "checkpoints.json")}}
+
+    generator = make_generator(**conf)
+    generator.inputs = [ListInput(events(uri, "a", 2), checkpoint_key="manifest")]
+    generator.run()
+
+    # Keyed by name so the input can be moved without losing its position
+    generator = make_generator(**conf)
+    generator.inputs = [
+        ListInput(events(uri, "b", 1)),
+        ListInput(events(uri, "a", 3), checkpoint_key="manifest"),
+    ]
+    generator.run()
+
+    assert sorted(versions(generator)) == ["v20190406a2", "v20190406b0"]
+
+
+def test_resume_after_failed_run(make_generator, uri, tmp_path):
+    conf = {"checkpoint": {"path": str(tmp_path / "checkpoints.json"), "interval": 0}}
+
+    generator = make_generator(**conf)
+    generator.inputs = [BrokenListInput(events(uri, "a", 3), checkpoint_key="manifest")]
+
+    with pytest.raises(RuntimeError):
+        generator.run()
+
+    assert len(generator.outputs[0].items) == 3
+
+    # Positions committed while running are kept, nothing is output twice
+    generator = make_generator(**conf)
+    generator.inputs = [ListInput(events(uri, "a", 4), checkpoint_key="manifest")]
+    generator.run()
+
+    assert versions(generator) == ["v20190406a3"]
@@ -0,0 +1,231 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from conftest import attach_output
+from elasticsearch.serializer import JSONSerializer
+
+from stac_generator.plugins.bulk_outputs.elasticsearch import ElasticsearchBulkOutput
+from stac_generator.plugins.outputs.elasticsearch import ElasticsearchOutput
+
+
+class Elasticsearch:
+    """
+    Client recording the ids sent in each bulk request. ``statuses`` gives
+    the status of each attempt for a document, 200 once they run out.
+    """
+
+    transport = SimpleNamespace(serializer=JSONSerializer())
+
+    def __init__(self, statuses=None, started=None, release=None):
+        self.statuses = statuses or {}
+        self.started = started
+        self.release = release
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def bulk(self, body, **kwargs):
+        if self.started is not None:
+            self.started.set()
+            self.release.wait(10)
+
+        ids = [json.loads(line)["update"]["_id"] for line in body.splitlines()[::2]]
+        items = []
+
+        with self.lock:
+            self.requests.append(ids)
+
+            for _id in ids:
+                statuses = self.statuses.get(_id, [])
+                status = statuses.pop(0) if statuses else 200
+                items.append(
+                    {"update": {"_id": _id, "status": status, "error": f"status {status}"}}
+                )
+
+        return {"errors": any(item["update"]["status"] >= 300 for item in items), "items": items}
+
+
+def make_output(make_generator, client, **conf):
+    output = ElasticsearchOutput(conf={"index": {"name": "index"}} | conf)
+    return attach_output(make_generator(), output, "elasticsearch", client)
+
+
+def wait_for(condition, timeout=10):
+    end = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_batches_sent_by_size(make_generator):
+    client = Elasticsearch()
+    _, output = make_output(make_generator, client, batch_size=3, batch_interval=60)
+
+    for index in range(7):
+        output.export({"id": f"doc{index}"})
+
+    assert [len(ids) for ids in client.requests] == [3, 3]
+
+    output.finish()
+
+    assert [len(ids) for ids in client.requests] == [3, 3, 1]
+
+
+def test_batches_sent_by_bytes(make_generator):
+    client = Elasticsearch()
+    _, output = make_output(
+        make_generator, client, batch_size=100, batch_bytes=100, batch_interval=60
+    )
+
+    # Each update is about 60 bytes
+    for index in range(3):
+        output.export({"id": f"doc{index}", "text": "x" * 40})
+
+    assert [len(ids) for ids in client.requests] == [2]
+
+
+def test_batches_sent_by_interval(make_generator):
+    client = Elasticsearch()
+    _, output = make_output(make_generator, client, batch_size=100, batch_interval=0.05)
+
+    output.export({"id": "doc0"})
+    output.export({"id": "doc1"})
+
+    assert wait_for(lambda: client.requests)
+    assert client.requests == [["doc0", "doc1"]]
+
+
+def test_failed_documents_sent_to_failed_outputs(make_generator):
+    client = Elasticsearch(statuses={"doc1": [400]})
+    generator, output = make_output(make_generator, client, batch_size=3, batch_interval=60)
+
+    for index in range(3):
+        output.export({"id": f"doc{index}"})
+
+    failed = generator.failed_outputs[0].items
+    assert [data["id"] for data in failed] == ["doc1"]
+    assert failed[0]["ERROR"] == "status 400"
+
+
+def test_finish_waits_for_background_flush(make_generator):
+    started, release = threading.Event(), threading.Event()
+    client = Elasticsearch(statuses={"doc0": [400]}, started=started, release=release)
+    generator, output = make_output(make_generator, client, batch_size=100, batch_interval=0.05)
+
+    output.export({"id": "doc0"})
+
+    # The background thread has taken the batch and is sending it
+    assert started.wait(10)
+
+    finished = threading.Event()
+    finisher = threading.Thread(target=lambda: (output.finish(), finished.set()))
+    finisher.start()
+
+    assert not finished.wait(0.2)
+
+    release.set()
+    finisher.join(10)
+
+    assert finished.is_set()
+    assert [data["id"] for data in generator.failed_outputs[0].items] == ["doc0"]
+
+
+def test_updates_sent_singly_without_batch_size(make_generator):
+    updates = []
+    client = SimpleNamespace(update=lambda **kwargs: updates.append(kwargs["id"]))
+    _, output = make_output(make_generator, client)
+
+    output.export({"id": "doc0"})
+
+    assert updates == ["doc0"]
+
+
+class BarrierElasticsearch(Elasticsearch):
+    """
+    Client whose bulk requests each wait until ``parties`` are in flight.
+    """
+
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier = threading.Barrier(parties, timeout=10)
+
+    def bulk(self, body, **kwargs):
+        self.barrier.wait()
+        return super().bulk(body, **kwargs)
+
+
+def make_bulk_output(make_generator, client, **conf):
+    output = ElasticsearchBulkOutput(
+        conf={"index": {"name": "index"}, "cache_max_size": 100, "initial_backoff": 0} | conf
+    )
+    return attach_output(make_generator(), output, "elasticsearch", client)
+
+
+def docs(count, size=10):
+    return [{"id": f"doc{index}", "body": {"text": "x" * size}} for index in range(count)]
+
+
+def test_bulk_chunks_by_size_and_bytes(make_generator):
+    client = Elasticsearch()
+    _, output = make_bulk_output(make_generator, client, chunk_size=2)
+
+    output.export(docs(5))
+
+    assert [len(ids) for ids in client.requests] == [2, 2, 1]
+
+    # Each document counts its JSON and 100 bytes for its action
+    client = Elasticsearch()
+    _, output = make_bulk_output(make_generator, client, max_chunk_bytes=300)
+
+    output.export(docs(5, size=90))
+
+    assert [len(ids) for ids in client.requests] == [1, 1, 1, 1, 1]
+
+
+def test_bulk_rejections_retried(make_generator):
+    client = Elasticsearch({"doc1": [429, 429], "doc2": [429]})
+    generator, output = make_bulk_output(make_generator, client)
+
+    output.export(docs(3))
+
+    assert client.requests == [["doc0", "doc1", "doc2"], ["doc1", "doc2"], ["doc1"]]
+    assert not generator.failed_outputs[0].items
+
+
+def test_bulk_failures_sent_to_failed_outputs(make_generator):
+    client = Elasticsearch({"doc1": [429] * 5, "doc2": [400]})
+    generator, output = make_bulk_output(make_generator, client, max_retries=2)
+
+    output.export(docs(3))
+
+    # Rejections are retried until max_retries, other errors aren't retried
+    assert client.requests == [["doc0", "doc1", "doc2"], ["doc1"], ["doc1"]]
+
+    failed = {data["id"]: data["ERROR"] for data in generator.failed_outputs[0].items}
+    assert failed == {
+        "doc2": "status 400",
+        "doc1": "Rejected by Elasticsearch after 2 retries",
+    }
+
+
+def test_bulk_chunks_sent_in_parallel(make_generator):
+    # Every request waits until three are in flight at once
+    client = BarrierElasticsearch(3)
+    _, output = make_bulk_output(make_generator, client, chunk_size=2, thread_count=3)
+
+    output.export(docs(6))
+
+    assert sorted(_id for ids in client.requests for _id in ids) == [
+        f"doc{index}" for index in range(6)
+    ]
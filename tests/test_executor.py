@@ -0,0 +1,268 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from stac_generator.core import executor as executor_module
+from stac_generator.core.executor import extract_in_worker, init_worker
+from stac_generator.core.output import Output
+from stac_generator.plugins.inputs.rabbit_mq import RabbitMQInput
+
+
+@pytest.mark.parametrize("executor", ["serial", "process", "thread", "staged"])
+def test_executor_outputs_events(make_generator, uri, executor):
+    generator = make_generator(executor=executor, workers=2)
+
+    for index in range(10):
+        generator.executor.submit({"uri": f"{uri}{index}"})
+
+    generator.executor.submit_batch([{"uri": f"{uri}b{index}"} for index in range(5)])
+    generator.executor.drain()
+
+    items = generator.outputs[0].items
+    assert len(items) == 15
+    assert {item["version"] for item in items} == {f"v20190406{index}" for index in range(10)} | {
+        f"v20190406b{index}" for index in range(5)
+    }
+    assert all(item["id"] == "test_a" for item in items)
+
+
+def test_worker_generator_only_runs_extractions(make_generator, uri, tmp_path):
+    generator = make_generator(
+        incremental={"path": str(tmp_path / "state.db")},
+        extraction_cache={"path": str(tmp_path / "cache.db"), "methods": ["regex"]},
+    )
+    recipe = generator.recipes.get(uri, "item")
+
+    init_worker(generator.conf)
+    worker = executor_module.WORKER_GENERATOR
+
+    assert worker.recipes is None
+    assert worker.incremental is None
+    assert worker.executor is None
+
+    result, state = extract_in_worker({"uri": uri}, recipe, "f1", {(uri, "f1"): None})
+    generator.merge_state(state)
+
+    assert generator.extraction_cache.stats()["stored"] == 1
+
+    # Results looked up by the main process are applied without running the methods again
+    changes = generator.cached({"uri": uri}, recipe, "f1")
+    cached, state = extract_in_worker({"uri": uri}, recipe, "f1", {(uri, "f1"): changes})
+
+    assert cached.body == result.body
+    assert state["extraction_cache"] == {"stored": []}
+
+    generator.extraction_cache.close()
+
+
+def test_process_executor_calls_done_without_draining(make_generator, uri):
+    generator = make_generator(executor="process", workers=1)
+    done = threading.Event()
+
+    generator.executor.process({"uri": uri}, done=done.set)
+
+    assert done.wait(30)
+    assert generator.outputs[0].items[0]["source_id"] == "UKESM1-0-LL"
+
+
+class Channel:
+    """
+    Channel recording acknowledgements.
+    """
+
+    is_open = True
+
+    def __init__(self):
+        self.acked = threading.Event()
+
+    def basic_ack(self, delivery_tag):
+        self.acked.set()
+
+
+class Connection:
+    """
+    Connection running threadsafe callbacks straight away.
+    """
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+
+def test_rabbitmq_message_acked_with_process_executor(make_generator, uri):
+    generator = make_generator(executor="process", workers=1)
+
+    rabbit = RabbitMQInput(
+        conf={
+            "connection": {"user": "u", "password": "p", "host": "h", "vhost": "v"},
+            "exchange": {"name": "e"},
+        }
+    )
+    rabbit.process_method = generator.executor.process
+    channel = Channel()
+
+    # With a prefetch count of 1 no further message arrives until this one is acked
+    rabbit.callback(
+        channel,
+        SimpleNamespace(delivery_tag=1),
+        None,
+        json.dumps({"uri": uri}).encode("utf-8"),
+        Connection(),
+    )
+
+    assert channel.acked.wait(30)
+    assert len(generator.outputs[0].items) == 1
+
+
+class UnsafeOutput(Output):
+    """
+    Output recording whether export was ever entered by two threads at once.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.items = []
+        self.active = 0
+        self.overlapped = False
+
+    def export(self, data: dict, **kwargs) -> None:
+        self.active += 1
+        self.overlapped |= self.active > 1
+        time.sleep(0.001)
+        self.items.append(data)
+        self.active -= 1
+
+
+def test_thread_executor_keeps_uri_order(make_generator, uri):
+    generator = make_generator(executor="thread", workers=4)
+    generator.outputs = [UnsafeOutput()]
+
+    for sequence in range(40):
+        generator.executor.submit({"uri": f"{uri}{sequence % 4}", "sequence": sequence})
+
+    generator.executor.drain()
+
+    items = generator.outputs[0].items
+    assert len(items) == 40
+    assert not generator.outputs[0].overlapped
+
+    for lane in range(4):
+        sequences = [item["sequence"] for item in items if item["sequence"] % 4 == lane]
+        assert sequences == sorted(sequences)
+
+
+def test_process_executor_merges_worker_timings(make_generator, uri):
+    generator = make_generator(executor="process", workers=2, timings={})
+
+    for index in range(6):
+        generator.executor.submit({"uri": f"{uri}{index}"})
+
+    generator.executor.drain()
+
+    assert len(generator.outputs[0].items) == 6
+
+    # Extraction runs in the workers, its timings are sent back with the results
+    recipes = generator.timings.summaries(["recipe"])
+    assert [summary["count"] for summary in recipes] == [6]
+    assert generator.timings.summaries(["export"])[0]["count"] == 6
+
+
+def test_process_executor_keeps_state_in_main_process(make_generator, uri, tmp_path):
+    conf = {
+        "executor": "process",
+        "workers": 2,
+        "extraction_cache": {"path": str(tmp_path / "cache.db"), "methods": ["regex"]},
+    }
+    generator = make_generator(incremental={"path": str(tmp_path / "state.db")}, **conf)
+    batch = [{"uri": f"{uri}{index}", "fingerprint": "f1"} for index in (1, 2)]
+
+    generator.executor.submit({"uri": f"{uri}0", "fingerprint": "f1"})
+    generator.executor.submit_batch([dict(body) for body in batch])
+    generator.executor.drain()
+    generator.finished()
+
+    # Results stored by the workers are written by the main process
+    assert generator.extraction_cache.stats()["misses"] == 3
+    assert generator.extraction_cache.stats()["stored"] == 3
+
+    # Unchanged events are skipped without reaching the workers
+    generator.executor.submit({"uri": f"{uri}0", "fingerprint": "f1"})
+    generator.executor.submit_batch([dict(body) for body in batch])
+    generator.executor.drain()
+
+    assert generator.incremental.stats()["skipped"] == 3
+    assert len(generator.outputs[0].items) == 3
+
+    expected = generator.outputs[0].items
+    generator.incremental.close()
+    generator.extraction_cache.close()
+
+    # Results looked up by the main process are reused by the workers
+    generator = make_generator(**conf)
+    generator.executor.submit_batch(
+        [{"uri": f"{uri}{index}", "fingerprint": "f1"} for index in range(3)]
+    )
+    generator.executor.drain()
+
+    assert generator.extraction_cache.stats()["hits"] == 3
+    assert sorted(generator.outputs[0].items, key=str) == sorted(expected, key=str)
+
+    generator.extraction_cache.close()
+
+
+class BlockedOutput(Output):
+    """
+    Output which waits for ``release`` before exporting.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.items = []
+        self.release = threading.Event()
+
+    def export(self, data: dict, **kwargs) -> None:
+        self.release.wait(10)
+        self.items.append(data)
+
+
+def test_staged_executor_backpressure(make_generator, uri):
+    generator = make_generator(
+        executor="staged",
+        workers=1,
+        executor_kwargs={"extract_queue_size": 2, "output_queue_size": 2},
+    )
+    generator.outputs = [BlockedOutput()]
+    submitted = []
+
+    def submit():
+        for index in range(20):
+            generator.executor.submit({"uri": f"{uri}{index}"})
+            submitted.append(index)
+
+    thread = threading.Thread(target=submit, daemon=True)
+    thread.start()
+
+    try:
+        time.sleep(0.5)
+
+        # An event in each stage and full queues hold back the input
+        assert len(submitted) <= 6
+
+    finally:
+        generator.outputs[0].release.set()
+
+    thread.join(10)
+    generator.executor.drain()
+
+    assert len(generator.outputs[0].items) == 20
+    assert generator.executor.metrics()["queues"]["extract"]["put_wait"] > 0
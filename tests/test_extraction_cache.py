@@ -0,0 +1,124 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import os
+
+import pytest
+
+from stac_generator.core.extraction_cache import PUT_BATCH_SIZE, ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"), methods=["regex"])
+    yield cache
+    cache.close()
+
+
+def changes(size=10):
+    # Random bytes don't compress so every result stores about ``size`` bytes
+    return {"data": os.urandom(size)}, []
+
+
+def test_hit_and_miss(cache):
+    stored = changes()
+    cache.put("/a", "f1", "p1", stored)
+
+    assert cache.get("/a", "f1", "p1") == stored
+
+    # A changed source, changed methods or another uri isn't a hit
+    assert cache.get("/a", "f2", "p1") is None
+    assert cache.get("/a", "f1", "p2") is None
+    assert cache.get("/b", "f1", "p1") is None
+
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "stored": 1,
+        "evicted": 0,
+        "hit_rate": 0.25,
+    }
+
+
+def test_results_written_in_batches(cache):
+    def written():
+        return cache.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    stored = changes()
+    cache.put("/a", "f1", "p1", stored)
+
+    # Buffered results are still found
+    assert written() == 0
+    assert cache.get("/a", "f1", "p1") == stored
+    assert cache.get("/a", "f2", "p1") is None
+
+    for index in range(PUT_BATCH_SIZE - 1):
+        cache.put(f"/{index}", "f1", "p1", changes())
+
+    assert written() == PUT_BATCH_SIZE
+
+    cache.put("/b", "f1", "p1", changes())
+    cache.flush()
+
+    assert written() == PUT_BATCH_SIZE + 1
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.db"), max_size=3500)
+
+    for uri in ("/a", "/b", "/c"):
+        cache.put(uri, "f", "p", changes(1000))
+
+    assert cache.get("/a", "f", "p") is not None
+
+    cache.put("/d", "f", "p", changes(1000))
+
+    assert cache.get("/b", "f", "p") is None
+    assert all(cache.get(uri, "f", "p") for uri in ("/a", "/c", "/d"))
+    assert cache.stats()["evicted"] == 1
+    assert cache.info()["results"] == 3
+
+    cache.close()
+
+
+def test_prune(cache):
+    cache.put("/a", "f", "p", changes())
+    cache.put("/b", "f", "p", changes())
+
+    assert cache.prune(older_than=3600) == 0
+    assert cache.prune(max_size=0) == 2
+    assert cache.info()["results"] == 0
+
+
+def test_prefix_ends_after_last_cached_method(make_generator, uri):
+    recipe = make_generator().recipes.get(uri, "item")
+    cache = ExtractionCache(":memory:", methods=["default", "regex"])
+
+    assert cache.prefix(recipe.extraction_methods) == 2
+    assert ExtractionCache(":memory:").prefix(recipe.extraction_methods) == 0
+
+
+def test_generator_reuses_results_between_runs(make_generator, uri, tmp_path):
+    conf = {"extraction_cache": {"path": str(tmp_path / "cache.db"), "methods": ["regex"]}}
+
+    generator = make_generator(**conf)
+    expected = generator.extract({"uri": uri, "fingerprint": "f1"}).body
+    generator.extraction_cache.close()
+
+    generator = make_generator(**conf)
+
+    assert generator.extract({"uri": uri, "fingerprint": "f1"}).body == expected
+
+    # A changed source runs the extraction again
+    body = generator.extract({"uri": uri, "fingerprint": "f2"}).body
+    assert body == expected | {"fingerprint": "f2"}
+
+    assert generator.extraction_cache.stats()["hits"] == 1
+    assert generator.extraction_cache.stats()["misses"] == 1
+
+    generator.extraction_cache.close()
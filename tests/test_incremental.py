@@ -0,0 +1,119 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+from stac_generator.core.bulk_output import BulkOutput
+from stac_generator.core.incremental import (
+    IncrementalState,
+    get_fingerprint,
+    object_fingerprint,
+)
+
+
+class BufferOutput(BulkOutput):
+    """
+    Bulk output keeping flushed records, optionally reporting them failed.
+    """
+
+    thread_safe = True
+
+    def __init__(self, fail: bool = False, **kwargs):
+        super().__init__(conf={"cache_max_size": 100}, **kwargs)
+        self.fail = fail
+        self.items = []
+
+    def export(self, data_list: list) -> None:
+        for data in data_list:
+            if self.fail:
+                self.failed(data, "rejected")
+
+            else:
+                self.items.append(data)
+
+
+def make_incremental_generator(make_generator, path, output):
+    generator = make_generator(incremental={"path": str(path)})
+    generator.outputs = [output]
+    output.failure_callback = generator.output_failed
+
+    return generator
+
+
+def test_unchanged_events_skipped(make_generator, uri, tmp_path):
+    generator = make_incremental_generator(make_generator, tmp_path / "state.db", BufferOutput())
+
+    generator.executor.submit({"uri": uri, "fingerprint": "f1"})
+    generator.finished()
+    generator.executor.submit({"uri": uri, "fingerprint": "f1"})
+    generator.executor.submit({"uri": uri, "fingerprint": "f2"})
+    generator.finished()
+
+    assert len(generator.outputs[0].items) == 2
+    assert generator.incremental.stats() == {"skipped": 1, "recorded": 2}
+
+
+def test_records_committed_once_outputs_flush(make_generator, uri, tmp_path):
+    output = BufferOutput()
+    generator = make_incremental_generator(make_generator, tmp_path / "state.db", output)
+
+    generator.executor.submit({"uri": uri, "fingerprint": "f1"})
+
+    # Still buffered by the output
+    assert not output.items
+    assert not generator.extract({"uri": uri, "fingerprint": "f1"}).unchanged
+
+    generator.finished()
+
+    assert len(output.items) == 1
+    assert generator.extract({"uri": uri, "fingerprint": "f1"}).unchanged
+
+
+def test_failed_exports_not_committed(make_generator, uri, tmp_path):
+    generator = make_incremental_generator(
+        make_generator, tmp_path / "state.db", BufferOutput(fail=True)
+    )
+
+    generator.executor.submit({"uri": uri, "fingerprint": "f1"})
+    generator.finished()
+
+    assert generator.failed_outputs[0].items[0]["ERROR"] == "rejected"
+    assert not generator.extract({"uri": uri, "fingerprint": "f1"}).unchanged
+
+
+def test_forget_by_uri(tmp_path):
+    state = IncrementalState(str(tmp_path / "state.db"))
+    state.record("a", "f", "r", "item")
+    state.record("b", "f", "r", "item")
+    state.record("c", "f", "r", "other")
+    state.prepare()
+
+    assert state.uris("item") == ["a", "b"]
+
+    state.forget(["a"])
+    state.commit()
+
+    assert not state.unchanged("a", "f", "r")
+    assert state.unchanged("b", "f", "r")
+    assert state.unchanged("c", "f", "r")
+
+
+class S3Client:
+    """
+    boto3 client answering ``head_object`` for any key.
+    """
+
+    def head_object(self, Bucket, Key):  # pylint: disable=invalid-name
+        return {"ETag": '"abc"', "ContentLength": 10}
+
+
+def test_listed_objects_fingerprinted_as_if_fetched():
+    uri = "https://store/bucket/a/b.nc"
+
+    assert get_fingerprint({"uri": uri, "client": S3Client()}) == object_fingerprint('"abc"', 10)
+
+    # A fingerprint from the listing saves fetching the object's metadata
+    assert get_fingerprint({"uri": uri, "client": None, "fingerprint": "f"}) == "f"
@@ -0,0 +1,49 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import pickle
+
+from stac_generator.core.memoize import (
+    MemoCache,
+    Memoized,
+    apply_changes,
+    get_changes,
+    snapshot,
+)
+
+
+def add_dataset(body):
+    """
+    Method writing into a nested dictionary in place.
+    """
+    body["properties"]["dataset"] = "x"
+    body.pop("uri")
+
+    return body
+
+
+def test_changes_to_nested_values():
+    body = {"uri": "u", "properties": {"file": "a.nc", "keep": 1}}
+    changes = get_changes(snapshot(body), add_dataset(body))
+
+    changes = pickle.loads(pickle.dumps(changes))
+
+    assert apply_changes({"uri": "v", "properties": {"file": "b.nc"}}, changes) == {
+        "properties": {"file": "b.nc", "dataset": "x"}
+    }
+
+
+def test_memoized_keeps_nested_values_of_each_body():
+    memoized = Memoized(MemoCache(), "add_dataset", "$source", ("recipe", 0))
+
+    first = memoized.run(add_dataset, {"source": "s", "uri": "a", "properties": {"file": "a.nc"}})
+    second = memoized.run(add_dataset, {"source": "s", "uri": "b", "properties": {"file": "b.nc"}})
+
+    assert first["properties"] == {"file": "a.nc", "dataset": "x"}
+    assert second == {"source": "s", "properties": {"file": "b.nc", "dataset": "x"}}
+    assert memoized.cache.stats()["add_dataset"]["hits"] == 1
@@ -0,0 +1,96 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+from urllib.request import urlopen
+
+import pytest
+
+from stac_generator.core.metrics import Counter, Gauge, Histogram, MetricsServer, Registry
+
+
+@pytest.fixture
+def registry():
+    registry = Registry()
+    registry.enabled = True
+    return registry
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry()
+    counter = Counter("events_total", "Events.", registry=registry)
+
+    counter.inc()
+
+    assert counter.values == {}
+
+
+def test_counter_exposition(registry):
+    counter = Counter("events_total", "Events.", ("status",), registry=registry)
+
+    counter.inc(status="success")
+    counter.inc(2, status="success")
+    counter.inc(status="failed")
+
+    exposition = registry.exposition()
+
+    assert "# TYPE events_total counter" in exposition
+    assert 'events_total{status="success"} 3.0' in exposition
+    assert 'events_total{status="failed"} 1.0' in exposition
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = Histogram("duration_seconds", "Duration.", registry=registry, buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    exposition = registry.exposition()
+
+    assert 'duration_seconds_bucket{le="0.1"} 1' in exposition
+    assert 'duration_seconds_bucket{le="1.0"} 2' in exposition
+    assert 'duration_seconds_bucket{le="+Inf"} 3' in exposition
+    assert "duration_seconds_count 3" in exposition
+    assert "duration_seconds_sum 5.55" in exposition
+
+
+def test_gauge_function(registry):
+    Gauge("queue_depth", "Depth.", ("queue",), registry=registry, function=lambda: {("a",): 4})
+
+    assert 'queue_depth{queue="a"} 4.0' in registry.exposition()
+
+
+def test_merge_worker_state(registry):
+    worker = Registry()
+    worker.enabled = True
+
+    Counter("events_total", "Events.", registry=worker).inc(2)
+    Histogram("duration_seconds", "Duration.", registry=worker, buckets=(1.0,)).observe(0.5)
+
+    counter = Counter("events_total", "Events.", registry=registry)
+    histogram = Histogram("duration_seconds", "Duration.", registry=registry, buckets=(1.0,))
+    counter.inc()
+
+    registry.merge(worker.pop_state())
+
+    assert counter.values == {(): 3.0}
+    assert histogram.values == {(): [1, 0, 0.5]}
+    assert worker.pop_state() == {}
+
+
+def test_metrics_endpoint(registry):
+    Counter("events_total", "Events.", registry=registry).inc()
+
+    server = MetricsServer(registry, host="127.0.0.1", port=0).start()
+
+    try:
+        with urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert response.status == 200
+            assert "events_total 1.0" in response.read().decode("utf-8")
+
+    finally:
+        server.stop()
@@ -0,0 +1,53 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+from importlib.metadata import entry_points
+
+from stac_generator.core.pipeline import PipelineCache
+
+
+def run_per_step(body, recipe):
+    """
+    Run a recipe the way the generator did before pipelines were compiled,
+    loading and instantiating every extraction method for every event.
+    """
+    for conf in recipe.extraction_methods:
+        method = entry_points(group="extraction_methods")[conf.method].load()
+        body = method(conf)._run(body)
+
+    return body
+
+
+def test_compiled_pipeline_matches_per_step(make_generator, uri):
+    generator = make_generator()
+    recipe = generator.recipes.get(uri, "item")
+    bodies = [{"uri": f"{uri}{index}"} for index in range(5)]
+
+    expected = [run_per_step(dict(body), recipe) for body in bodies]
+    pipeline = generator.pipelines.get(recipe)
+
+    assert [pipeline.run(dict(body)) for body in bodies] == expected
+    assert pipeline.run_batch([dict(body) for body in bodies]) == (list(enumerate(expected)), [])
+
+    # Every event gets its own values, not those of the first event
+    assert len({body["version"] for body in expected}) == 5
+
+
+def test_pipeline_cache(make_generator, uri):
+    generator = make_generator()
+    recipe = generator.recipes.get(uri, "item")
+    pipelines = PipelineCache(entry_points(group="extraction_methods"))
+
+    first = pipelines.get(recipe)
+
+    assert pipelines.get(recipe) is first
+    assert pipelines.stats()["hits"] == 1
+
+    pipelines.invalidate(recipe.key)
+
+    assert pipelines.get(recipe) is not first
@@ -0,0 +1,214 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from stac_generator.core import resources
+from stac_generator.core.resources import ResourceHandle, ResourceRegistry
+
+
+class Client:
+    """
+    Resource recording whether it was closed.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    monkeypatch.setitem(resources.FACTORIES, "client", Client)
+
+
+def test_handles_share_resources(clients):
+    registry = ResourceRegistry()
+    handle = ResourceHandle("client", {"url": "a"})
+
+    first = registry.acquire(handle)
+
+    assert registry.acquire(ResourceHandle("client", {"url": "a"})) is first
+    assert registry.acquire(ResourceHandle("client", {"url": "b"})) is not first
+    assert registry.stats() == {"resources": 2, "created": 2, "reused": 1, "evicted": 0}
+
+
+def test_resources_created_outside_the_lock(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_client(**kwargs):
+        started.set()
+        release.wait(10)
+        return Client(**kwargs)
+
+    monkeypatch.setitem(resources.FACTORIES, "slow", slow_client)
+    monkeypatch.setitem(resources.FACTORIES, "client", Client)
+    registry = ResourceRegistry()
+    handle = ResourceHandle("slow")
+
+    with ThreadPoolExecutor(3) as pool:
+        first = pool.submit(registry.acquire, handle)
+        started.wait(10)
+        second = pool.submit(registry.acquire, handle)
+
+        # Other resources are acquired while the slow one is created
+        other = pool.submit(registry.acquire, ResourceHandle("client"))
+        assert isinstance(other.result(2), Client)
+        assert not second.done()
+
+        release.set()
+
+        assert first.result(10) is second.result(10)
+
+    assert registry.stats()["created"] == 2
+
+
+def test_failed_creation_raised_and_retried(monkeypatch):
+    calls = []
+
+    def flaky_client(**kwargs):
+        calls.append(kwargs)
+
+        if len(calls) == 1:
+            raise ConnectionError("unreachable")
+
+        return Client(**kwargs)
+
+    monkeypatch.setitem(resources.FACTORIES, "flaky", flaky_client)
+    registry = ResourceRegistry()
+    handle = ResourceHandle("flaky")
+
+    with pytest.raises(ConnectionError):
+        registry.acquire(handle)
+
+    assert isinstance(registry.acquire(handle), Client)
+    assert registry.stats() == {"resources": 1, "created": 1, "reused": 0, "evicted": 0}
+
+
+def test_handles_pickle():
+    handle = ResourceHandle("client", {"url": "a", "secret": "s"})
+
+    assert pickle.loads(pickle.dumps(handle)) == handle
+    assert "secret" not in repr(handle)
+
+
+def test_resources_in_use_are_not_evicted(clients):
+    registry = ResourceRegistry(ttl=0)
+    handle = ResourceHandle("client")
+
+    client = registry.acquire(handle)
+    registry.acquire(handle)
+    registry.release(handle)
+    registry.evict()
+
+    assert not client.closed
+
+    registry.release(handle)
+    time.sleep(0.01)
+    registry.evict()
+
+    assert client.closed
+    assert registry.stats()["evicted"] == 1
+    assert registry.acquire(handle) is not client
+
+
+def test_unused_resources_kept_for_ttl(clients):
+    registry = ResourceRegistry(ttl=60)
+
+    with registry.use(ResourceHandle("client")) as client:
+        pass
+
+    registry.evict()
+
+    assert not client.closed
+
+    registry.close()
+
+    assert client.closed
+
+
+def test_resolve_and_restore(clients):
+    registry = ResourceRegistry()
+    handle = ResourceHandle("client")
+    body = {"uri": "a", "client": handle}
+
+    acquired = registry.resolve(body)
+
+    assert isinstance(body["client"], Client)
+    assert registry.resources[handle.key].references == 1
+
+    # Extraction may return a new body holding the resource
+    extracted = dict(body)
+    registry.restore([extracted], acquired)
+
+    assert extracted["client"] == handle
+    assert registry.resources[handle.key].references == 0
+
+
+def test_extraction_methods_get_live_client(clients, make_generator, uri):
+    generator = make_generator()
+    handle = ResourceHandle("client")
+
+    extraction = generator.extract({"uri": uri, "client": handle})
+
+    assert not extraction.failed
+    assert generator.resources.resources[handle.key].references == 0
+
+    results = generator.extract_batch([{"uri": uri, "client": handle}])
+
+    assert not results[0].failed
+    assert generator.resources.resources[handle.key].references == 0
+
+
+class Catalog:
+    """
+    intake-esm catalog counting how many times it was opened.
+    """
+
+    opened = 0
+
+    def __init__(self, url, **kwargs):
+        Catalog.opened += 1
+        self.df = pd.DataFrame({"path": ["a.nc", "b.nc"], "var": ["tas", "pr"]})
+
+    def search(self, var):
+        catalog = object.__new__(Catalog)
+        catalog.df = self.df[self.df["var"] == var]
+        return catalog
+
+
+def test_shared_intake_esm_assets_open_catalog_once(monkeypatch):
+    # pylint: disable=import-outside-toplevel
+    from extraction_methods.core.types import Backend
+
+    from stac_generator.plugins.extraction_methods.intake_esm_assets import (
+        SharedIntakeESMAssets,
+    )
+
+    monkeypatch.setitem(resources.FACTORIES, "intake_esm", Catalog)
+    monkeypatch.setattr(ResourceRegistry, "current", ResourceRegistry())
+    Catalog.opened = 0
+
+    conf = Backend(
+        method="intake_esm_shared",
+        inputs={"input_term": "catalog.json", "search_kwargs": {"var": "$var"}},
+    )
+
+    assert list(SharedIntakeESMAssets(conf)._run({"var": "tas"})) == [{"href": "a.nc"}]
+    assert list(SharedIntakeESMAssets(conf)._run({"var": "pr"})) == [{"href": "b.nc"}]
+    assert Catalog.opened == 1
@@ -0,0 +1,96 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import itertools
+import logging
+import threading
+
+from conftest import ListInput
+
+from stac_generator.core.input import Input
+from stac_generator.core.scheduler import InputScheduler, InputSource
+
+
+class EndlessInput(Input):
+    """
+    Yield events until stopped.
+    """
+
+    def __init__(self, uri, **kwargs):
+        super().__init__(**kwargs)
+        self.uri = uri
+
+    def run(self):
+        for index in itertools.count():
+            yield {"uri": f"{self.uri}{index}"}
+
+
+class FailingInput(Input):
+    """
+    Yield some events then fail.
+    """
+
+    def __init__(self, uri, **kwargs):
+        super().__init__(**kwargs)
+        self.uri = uri
+
+    def run(self):
+        yield {"uri": self.uri}
+        raise RuntimeError("input failed")
+
+
+def test_inputs_shared_by_weight_and_priority():
+    scheduler = InputScheduler(None, [])
+    heavy = InputSource(ListInput([], weight=3))
+    light = InputSource(ListInput([], weight=1))
+    urgent = InputSource(ListInput([], priority=1))
+
+    picks = [scheduler.select([heavy, light]) for _ in range(8)]
+
+    assert picks.count(heavy) == 6
+    assert picks.count(light) == 2
+    assert scheduler.select([heavy, light, urgent]) is urgent
+
+
+def test_all_events_output_with_checkpoints(make_generator, uri):
+    generator = make_generator()
+    inputs = [
+        ListInput([{"uri": f"{uri}{name}{index}"} for index in range(20)], checkpoint_key=name)
+        for name in "ab"
+    ]
+
+    scheduler = InputScheduler(generator, inputs, queue_size=4)
+    scheduler.run()
+    generator.executor.drain()
+
+    assert len(generator.outputs[0].items) == 40
+    assert scheduler.checkpoints == {"a": 20, "b": 20}
+
+
+def test_failed_input_stops_the_others(make_generator, uri, caplog):
+    generator = make_generator()
+    scheduler = InputScheduler(generator, [EndlessInput(uri), FailingInput(uri)], queue_size=2)
+    errors = []
+
+    def run():
+        try:
+            scheduler.run()
+
+        except RuntimeError as error:
+            errors.append(error)
+
+    # The endless input would keep the scheduler running if it wasn't stopped
+    runner = threading.Thread(target=run)
+
+    with caplog.at_level(logging.ERROR):
+        runner.start()
+        runner.join(30)
+
+    assert not runner.is_alive()
+    assert str(errors[0]) == "input failed"
+    assert "Input FailingInput failed" in caplog.text
@@ -0,0 +1,212 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import threading
+
+import httpx
+from conftest import attach_output
+
+from stac_generator.core.resources import ResourceRegistry
+from stac_generator.plugins.bulk_outputs.stac_fastapi import STACFastAPIBulkOutput
+from stac_generator.plugins.outputs.stac_fastapi import STACFastAPIOutput
+
+API_URL = "http://stac/"
+
+
+class Client:
+    """
+    HTTP client recording requests, which fail for items listed in ``fail``
+    and wait for ``barrier`` when given. Every response has ``status``.
+    """
+
+    def __init__(self, fail=(), barrier=None, status=201):
+        self.fail = fail
+        self.barrier = barrier
+        self.status = status
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json=None, **kwargs):
+        if self.barrier is not None:
+            self.barrier.wait()
+
+        if json.get("id") in self.fail:
+            raise httpx.ConnectError("unreachable")
+
+        with self.lock:
+            self.requests.append(("POST", url, json))
+
+        return httpx.Response(self.status, json={})
+
+
+def item(index):
+    return {"id": f"item{index}", "collection": "c", "type": "Feature"}
+
+
+def make_output(make_generator, client, **conf):
+    output = STACFastAPIOutput(conf={"api_url": API_URL} | conf)
+    return attach_output(make_generator(), output, "http", client)
+
+
+def test_items_posted(make_generator):
+    client = Client()
+    _, output = make_output(make_generator, client)
+
+    output.export(item(0), GENERATOR_TYPE="item")
+
+    assert client.requests == [("POST", f"{API_URL}collections/c/items", item(0))]
+
+
+def test_workers_send_concurrently(make_generator):
+    # Every request waits until four are in flight at once
+    client = Client(barrier=threading.Barrier(4, timeout=10))
+    _, output = make_output(make_generator, client, workers=4)
+
+    for index in range(8):
+        output.export(item(index), GENERATOR_TYPE="item")
+
+    output.finish()
+
+    assert sorted(request[2]["id"] for request in client.requests) == [
+        f"item{index}" for index in range(8)
+    ]
+
+
+def test_failed_requests_sent_to_failed_outputs(make_generator):
+    client = Client(fail={"item1"})
+    generator, output = make_output(make_generator, client, workers=2)
+
+    for index in range(3):
+        output.export(item(index), GENERATOR_TYPE="item")
+
+    output.finish()
+
+    failed = generator.failed_outputs[0].items
+    assert [data["id"] for data in failed] == ["item1"]
+    assert "ConnectError" in failed[0]["ERROR"]
+    assert len(client.requests) == 2
+
+
+def test_error_responses_sent_to_failed_outputs(make_generator):
+    client = Client(status=500)
+    generator, output = make_output(make_generator, client)
+
+    output.export(item(0), GENERATOR_TYPE="item")
+
+    failed = generator.failed_outputs[0].items
+    assert [data["id"] for data in failed] == ["item0"]
+    assert failed[0]["ERROR"].startswith("500")
+
+
+def test_outputs_share_pooled_client():
+    resources = ResourceRegistry()
+    outputs = [STACFastAPIOutput(conf={"api_url": API_URL}) for _ in range(2)]
+
+    for output in outputs:
+        output.resources = resources
+
+    assert isinstance(outputs[0].client, httpx.Client)
+    assert outputs[0].client is outputs[1].client
+    assert resources.stats()["created"] == 1
+
+    resources.close()
+
+
+class BulkClient:
+    """
+    HTTP client recording requests and answering each with the next status
+    code queued for its method and path, 200 once none are left.
+    """
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+        self.requests = []
+
+    def request(self, method, url, json):
+        path = url.removeprefix(API_URL)
+        self.requests.append((method, path))
+
+        if (method, path) == ("POST", "collections/c/bulk_items") and json["items"].get("raise"):
+            raise httpx.ConnectError("unreachable")
+
+        statuses = self.statuses.get((method, path), [])
+        return httpx.Response(statuses.pop(0) if statuses else 200, json={})
+
+    def post(self, url, json=None, **kwargs):
+        return self.request("POST", url, json)
+
+    def put(self, url, json=None, **kwargs):
+        return self.request("PUT", url, json)
+
+
+def make_bulk_output(make_generator, client):
+    output = STACFastAPIBulkOutput(conf={"api_url": API_URL, "cache_max_size": 10})
+    return attach_output(make_generator(), output, "http", client)
+
+
+def test_bulk_items_sent_per_collection(make_generator):
+    client = BulkClient()
+    _, output = make_bulk_output(make_generator, client)
+
+    output.export([item(0), item(1), item(2) | {"collection": "d"}])
+
+    assert client.requests == [
+        ("POST", "collections/c/bulk_items"),
+        ("POST", "collections/d/bulk_items"),
+    ]
+
+
+def test_missing_collection_created_once(make_generator):
+    client = BulkClient({("POST", "collections/c/bulk_items"): [404]})
+    _, output = make_bulk_output(make_generator, client)
+
+    output.export([item(0)])
+    output.export([item(1)])
+
+    assert client.requests == [
+        ("POST", "collections/c/bulk_items"),
+        ("POST", "collections"),
+        ("POST", "collections/c/bulk_items"),
+        ("POST", "collections/c/bulk_items"),
+    ]
+
+
+def test_failed_bulk_request_posts_items_separately(make_generator):
+    client = BulkClient(
+        {
+            ("POST", "collections/c/bulk_items"): [500],
+            ("POST", "collections/c/items"): [409, 201, 400],
+            ("PUT", "collections/c/items/item0"): [200],
+        }
+    )
+    generator, output = make_bulk_output(make_generator, client)
+
+    output.export([item(0), item(1), item(2)])
+
+    # Existing items are replaced, items which still fail are reported
+    assert client.requests[1:] == [
+        ("POST", "collections/c/items"),
+        ("PUT", "collections/c/items/item0"),
+        ("POST", "collections/c/items"),
+        ("POST", "collections/c/items"),
+    ]
+
+    failed = generator.failed_outputs[0].items
+    assert [data["id"] for data in failed] == ["item2"]
+    assert failed[0]["ERROR"].startswith("Status code: 400")
+
+
+def test_bulk_request_errors_fail_the_collection(make_generator):
+    client = BulkClient()
+    generator, output = make_bulk_output(make_generator, client)
+
+    output.export([item(0) | {"id": "raise"}, item(1), item(2) | {"collection": "d"}])
+
+    failed = generator.failed_outputs[0].items
+    assert [data["id"] for data in failed] == ["raise", "item1"]
+    assert all("ConnectError" in data["ERROR"] for data in failed)
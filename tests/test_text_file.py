@@ -0,0 +1,182 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import bz2
+import gzip
+import json
+
+import pytest
+
+from stac_generator.core.deduplication import BloomDeduplication, load_deduplicator
+from stac_generator.plugins.inputs.text_file import TextFileInput
+
+
+def lines(uris):
+    return "".join(json.dumps({"uri": uri, "size": len(uri)}) + "\n" for uri in uris).encode()
+
+
+def write_lines(path, uris):
+    path.write_bytes(lines(uris))
+
+    return str(path)
+
+
+def make_input(path, **conf):
+    return TextFileInput(conf={"path": str(path)} | conf)
+
+
+@pytest.mark.parametrize(
+    "deduplicate, expected",
+    [
+        ("off", ["a", "b", "a", "c", "b"]),
+        ("exact", ["a", "b", "c"]),
+        ("bloom", ["a", "b", "c"]),
+    ],
+)
+def test_deduplicate_modes(tmp_path, deduplicate, expected):
+    path = write_lines(tmp_path / "uris.txt", ["a", "b", "a", "c", "b"])
+
+    events = list(make_input(path, deduplicate=deduplicate, bloom_capacity=100).run())
+
+    assert [event["uri"] for event in events] == expected
+
+
+def test_extra_terms(tmp_path):
+    path = write_lines(tmp_path / "uris.txt", ["abc"])
+
+    events = list(
+        make_input(path, extra_terms=[{"key": "size", "output_key": "file_size"}]).run()
+    )
+
+    assert events == [{"uri": "abc", "file_size": 3}]
+
+
+def test_unknown_deduplicate_mode():
+    with pytest.raises(KeyError):
+        load_deduplicator("fuzzy")
+
+
+def test_bloom_memory_fixed_by_capacity():
+    deduplicator = BloomDeduplication(capacity=10_000, false_positive_rate=0.01)
+    memory = deduplicator.memory()
+
+    seen = [deduplicator.seen(f"/data/file_{index}.nc") for index in range(10_000)]
+
+    # Memory doesn't grow with the number of keys and few unseen keys are dropped
+    assert deduplicator.memory() == memory < 20_000
+    assert sum(seen) < 300
+    assert all(deduplicator.seen(f"/data/file_{index}.nc") for index in range(10_000))
+
+
+def test_exact_memory_grows_with_keys():
+    deduplicator = load_deduplicator("exact")
+    memory = deduplicator.memory()
+
+    assert not any(deduplicator.seen(str(index)) for index in range(1000))
+    assert deduplicator.memory() > memory
+
+
+def resume(input_plugin, count):
+    """
+    Take ``count`` events then run a new input from the checkpoint reached.
+    """
+    events = input_plugin.run()
+    taken = [next(events)["uri"] for _ in range(count)]
+
+    resumed = make_input(input_plugin.conf.path, **input_plugin.conf.model_dump(exclude={"path"}))
+    resumed.resume_token = input_plugin.checkpoint
+
+    return taken, [event["uri"] for event in resumed.run()]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_chunked_files_yield_every_line(tmp_path, workers, ordered):
+    uris = [f"/data/{index:03}.nc" for index in range(200)]
+    (tmp_path / "a.txt").write_bytes(lines(uris[:120]))
+    (tmp_path / "b.txt").write_bytes(lines(uris[120:]))
+
+    input_plugin = make_input(tmp_path, workers=workers, ordered=ordered, chunk_size=256)
+    events = [event["uri"] for event in input_plugin.run()]
+
+    if ordered:
+        assert events == uris
+
+    else:
+        assert sorted(events) == uris
+
+    assert input_plugin.checkpoint == {
+        "file": str(tmp_path / "b.txt"),
+        "offset": (tmp_path / "b.txt").stat().st_size,
+    }
+
+
+def test_ordered_checkpoint_after_each_line(tmp_path):
+    uris = [f"/data/{index:03}.nc" for index in range(50)]
+    path = tmp_path / "uris.txt"
+    path.write_bytes(lines(uris))
+
+    taken, rest = resume(make_input(path, chunk_size=128), 17)
+
+    assert taken + rest == uris
+
+
+def test_unordered_checkpoint_after_whole_chunks(tmp_path):
+    uris = [f"/data/{index:03}.nc" for index in range(50)]
+    path = tmp_path / "uris.txt"
+    path.write_bytes(lines(uris))
+
+    input_plugin = make_input(path, chunk_size=128, ordered=False)
+    taken, rest = resume(input_plugin, 17)
+
+    # The checkpoint is the end of the last finished chunk, so lines of the
+    # chunk in progress are repeated but none are lost
+    offset = input_plugin.checkpoint["offset"]
+    assert 0 < offset < path.stat().st_size
+    assert set(taken + rest) == set(uris)
+    assert rest == uris[len(lines(uris)[:offset].splitlines()) :]
+
+
+def test_unordered_checkpoint_waits_for_earlier_chunks(tmp_path):
+    uris = [f"/data/{index:03}.nc" for index in range(400)]
+    path = tmp_path / "uris.txt"
+    data = lines(uris)
+    path.write_bytes(data)
+
+    input_plugin = make_input(path, chunk_size=128, ordered=False, workers=4)
+    yielded = set()
+
+    for event in input_plugin.run():
+        yielded.add(event["uri"])
+
+        if input_plugin.checkpoint is not None:
+            before = data[: input_plugin.checkpoint["offset"]].splitlines()
+            assert {json.loads(line)["uri"] for line in before} <= yielded
+
+    assert yielded == set(uris)
+
+
+@pytest.mark.parametrize("suffix, compress", [(".gz", gzip.compress), (".bz2", bz2.compress)])
+def test_compressed_files(tmp_path, suffix, compress):
+    uris = [f"/data/{index:03}.nc" for index in range(50)]
+    path = tmp_path / f"uris.txt{suffix}"
+    path.write_bytes(compress(lines(uris)))
+
+    taken, rest = resume(make_input(path, chunk_size=128), 23)
+
+    assert taken + rest == uris
+
+
+def test_zstandard_files(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+
+    uris = [f"/data/{index:03}.nc" for index in range(50)]
+    path = tmp_path / "uris.txt.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(lines(uris)))
+
+    assert [event["uri"] for event in make_input(path, chunk_size=128).run()] == uris
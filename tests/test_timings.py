@@ -0,0 +1,113 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import json
+
+from conftest import ListInput
+
+from stac_generator.core.timings import Timing, Timings
+
+
+def test_timing_summary():
+    timing = Timing()
+
+    for duration in range(1, 101):
+        timing.add(duration)
+
+    summary = timing.summary()
+
+    assert summary["count"] == 100
+    assert summary["total"] == 5050
+    assert summary["max"] == 100
+    assert (summary["p50"], summary["p90"], summary["p99"]) == (50, 90, 99)
+
+
+def test_timing_reservoir_bounded():
+    timing = Timing(reservoir_size=10)
+
+    for duration in range(1000):
+        timing.add(duration)
+
+    assert len(timing.samples) == 10
+    assert timing.count == 1000
+
+
+def test_disabled_timings_record_nothing():
+    timings = Timings(enabled=False)
+
+    timings.add("export", "ListOutput", 1.0)
+
+    assert list(timings.iterate("input", "list", [1, 2])) == [1, 2]
+    assert not timings.timings
+
+
+def test_pop_state_and_merge():
+    worker = Timings()
+    worker.add("recipe", "a", 1.0)
+    worker.add("recipe", "a", 3.0)
+
+    state = worker.pop_state()
+
+    assert not worker.timings
+
+    timings = Timings()
+    timings.add("recipe", "a", 2.0)
+    timings.merge(state)
+
+    summary = timings.summaries()[0]
+    assert (summary["count"], summary["total"], summary["max"]) == (3, 6.0, 3.0)
+
+
+def test_iterate_records_each_item():
+    timings = Timings()
+
+    assert list(timings.iterate("input", "list", range(3))) == [0, 1, 2]
+    assert timings.summaries()[0]["count"] == 3
+
+
+def test_report_ranks_slowest_first():
+    timings = Timings(top=2)
+    timings.add("export", "fast", 1.0)
+    timings.add("export", "slow", 5.0)
+    timings.add("mapping", "fastest", 0.5)
+    timings.add("recipe", "a", 2.0)
+
+    report = timings.report(executor={"workers": 1})
+
+    assert [summary["name"] for summary in report["stages"]] == ["slow", "fast"]
+    assert [summary["name"] for summary in report["recipes"]] == ["a"]
+    assert report["executor"] == {"workers": 1}
+
+
+def test_run_writes_json_report(make_generator, uri, tmp_path):
+    path = tmp_path / "report.json"
+    generator = make_generator(timings={"report": str(path)})
+    generator.inputs = [ListInput([{"uri": f"{uri}{index}"} for index in range(3)])]
+
+    generator.run()
+
+    report = json.loads(path.read_text())
+    stages = {(summary["stage"], summary["name"]): summary for summary in report["stages"]}
+
+    assert stages[("input", "ListInput")]["count"] == 3
+    assert stages[("export", "ListOutput")]["count"] == 3
+    assert report["recipes"][0]["count"] == 3
+    assert "pipeline_cache" in report
+
+
+def test_run_writes_text_report(make_generator, uri, tmp_path):
+    path = tmp_path / "report.txt"
+    generator = make_generator(timings={"report": str(path)})
+    generator.inputs = [ListInput([{"uri": uri}])]
+
+    generator.run()
+
+    report = path.read_text()
+
+    assert report.startswith("stages\nstage")
+    assert "recipe_methods" in report
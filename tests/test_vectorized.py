@@ -0,0 +1,121 @@
+# encoding: utf-8
+""" """
+__author__ = "Rhys Evans"
+__date__ = "18 Oct 2026"
+__copyright__ = "Copyright 2018 United Kingdom Research and Innovation"
+__license__ = "BSD - see LICENSE file in top-level package directory"
+__contact__ = "rhys.r.evans@stfc.ac.uk"
+
+import pytest
+from extraction_methods.core.extraction_method import ExtractionMethodConf
+from test_pipeline import run_per_step
+
+from stac_generator.core import vectorized
+from stac_generator.core.vectorized import Columns, Step, VectorizedRecipe, compile_recipe
+
+METHODS = [
+    {"method": "default", "inputs": {"defaults": {"type": "Feature", "tags": ["a"]}}},
+    {
+        "method": "regex",
+        "inputs": {"regex": r"\/(?P<model>[\w-]+)\/(?P<experiment>\w+)\.(?P<version>v\d+)"},
+    },
+    {
+        "method": "string_template",
+        "inputs": {"template": "{model}.{experiment}.{version}", "output_key": "id"},
+    },
+    {
+        "method": "lambda",
+        "inputs": {"function": "lambda v: v.upper()", "args": ["$version"], "output_key": "v"},
+    },
+    {"method": "remove", "inputs": {"keys": ["uri"]}},
+]
+
+
+class Recipe:
+    """
+    Recipe holding only extraction methods.
+    """
+
+    def __init__(self, methods):
+        self.extraction_methods = [ExtractionMethodConf(**method) for method in methods]
+
+
+def bodies(count):
+    return [{"uri": f"/data/UKESM1-0-LL/historical.v{index}"} for index in range(count)]
+
+
+@pytest.mark.parametrize("with_pandas", [True, False])
+def test_vectorized_matches_scalar(monkeypatch, with_pandas):
+    if not with_pandas:
+        monkeypatch.setattr(vectorized, "pandas", None)
+
+    recipe = Recipe(METHODS)
+    compiled = compile_recipe("key", recipe.extraction_methods)
+
+    assert compiled is not None
+    assert compiled.transform(bodies(20)) == [run_per_step(body, recipe) for body in bodies(20)]
+
+
+def test_test_recipe_vectorized(make_generator, uri):
+    generator = make_generator(vectorize={"min_batch_size": 2})
+    recipe = generator.recipes.get(uri, "item")
+    events = [{"uri": f"{uri}{index}"} for index in range(5)]
+
+    pipeline = generator.pipelines.get(recipe)
+    extracted, failed = pipeline.run_batch([dict(body) for body in events])
+
+    assert pipeline.vectorized.batches == 1
+    assert not failed
+    assert extracted == [
+        (index, run_per_step(dict(body), recipe)) for index, body in enumerate(events)
+    ]
+
+
+def test_unsupported_recipes_not_vectorized():
+    templated = Recipe([{"method": "default", "inputs": {"defaults": {"a": "$b"}}}])
+
+    assert compile_recipe("key", Recipe([{"method": "netcdf"}]).extraction_methods) is None
+    assert compile_recipe("key", templated.extraction_methods) is None
+
+
+class UpperStep(Step):
+    """
+    Step upper casing ``uri``, unlike the scalar pipeline in these tests.
+    """
+
+    def run(self, columns: Columns) -> None:
+        columns.set("uri", [value.upper() for value in columns.require("uri")])
+
+
+def test_every_event_validated_for_first_batches():
+    checked = []
+
+    def scalar(body):
+        checked.append(body["uri"])
+        return body
+
+    recipe = VectorizedRecipe("key", [], validate=2, validate_batches=2)
+
+    for _ in range(3):
+        assert recipe.run(bodies(5), scalar) == bodies(5)
+
+    assert len(checked) == 5 + 5 + 2
+    assert recipe.batches == 3
+
+
+def test_differing_results_disable_recipe():
+    recipe = VectorizedRecipe("key", [UpperStep({})])
+
+    assert recipe.run(bodies(5), lambda body: body) is None
+    assert not recipe.enabled
+    assert recipe.fallbacks == 1
+
+
+def test_steps_must_define_run():
+    class Incomplete(Step):
+        """
+        Step without ``run``.
+        """
+
+    with pytest.raises(TypeError):
+        Incomplete({})